@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# 多路会话共享的批量推理服务
+
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+from funasr.utils.postprocess_utils import rich_transcription_postprocess
+
+
+def pad_features(feats):
+    """将若干条 [T, D] 特征补零对齐为 [B, T_max, D]，返回 (padded, lengths)"""
+    lengths = torch.tensor([feat.shape[0] for feat in feats], dtype=torch.int32)
+    padded = torch.zeros(len(feats), int(lengths.max()), feats[0].shape[1], dtype=feats[0].dtype)
+    for i, feat in enumerate(feats):
+        padded[i, :feat.shape[0]] = feat
+    return padded, lengths
+
+
+class BatchInferenceServer:
+    """
+    多个 StreamingSTT 会话共享一个 SenseVoiceSmall 模型
+    - 各会话通过 submit()/infer() 提交特征，推理线程每一轮最多收集 max_batch_size 个请求，
+      最早的请求最多等待 max_wait 秒
+    - 同一轮中相同语言的请求补零对齐后做一次前向计算，结果按请求分发回各自的 Future
+    """
+
+    def __init__(self, model, kwargs, max_batch_size=16, max_wait=0.02, language="auto"):
+        self.model = model
+        self.kwargs = kwargs
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.language = language
+
+        self._cond = threading.Condition()
+        self._requests = []
+        self._running = False
+        self._thread = None
+
+        # 统计信息
+        self.batches = 0
+        self.items = 0
+
+    @property
+    def mean_batch_size(self):
+        return self.items / self.batches if self.batches else 0.0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, feat, language=None):
+        """提交一条特征（[T, D] 张量），返回结果文本的 Future"""
+        future = Future()
+        if feat.dim() == 3:
+            feat = feat[0]
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("推理服务未启动")
+            self._requests.append((feat, language or self.language, future))
+            self._cond.notify()
+        return future
+
+    def infer(self, feat, feat_len=None):
+        """阻塞版本的 submit，可直接作为 InferenceScheduler 的推理函数"""
+        return self.submit(feat).result()
+
+    def _collect(self):
+        """等待第一个请求，然后在 max_wait 内尽量凑满一批"""
+        with self._cond:
+            while self._running and not self._requests:
+                self._cond.wait()
+            if not self._requests:
+                return []
+            deadline = time.time() + self.max_wait
+            while self._running and len(self._requests) < self.max_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._requests[:self.max_batch_size]
+            self._requests = self._requests[self.max_batch_size:]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                break
+            # 模型一次前向只接受一种语言，按语言分组
+            groups = {}
+            for request in batch:
+                groups.setdefault(request[1], []).append(request)
+            for language, requests in groups.items():
+                self._run_batch(language, requests)
+
+    def _run_batch(self, language, requests):
+        feats = [request[0] for request in requests]
+        padded, lengths = pad_features(feats)
+
+        kwargs = dict(self.kwargs)
+        kwargs.update(data_type="fbank", key=[f"stream_{i}" for i in range(len(feats))])
+        try:
+            with torch.no_grad():
+                result = self.model.inference(
+                    data_in=padded,
+                    data_len=lengths,
+                    language=language,
+                    use_itn=False,
+                    ban_emo_unk=False,
+                    **kwargs
+                )
+            outputs = result[0] if result else []
+            for i, (_, _, future) in enumerate(requests):
+                text = outputs[i]["text"] if i < len(outputs) else ""
+                future.set_result(rich_transcription_postprocess(text))
+        except Exception as e:
+            for _, _, future in requests:
+                future.set_exception(e)
+
+        self.batches += 1
+        self.items += len(requests)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+离线批量转写录音文件
+
+遍历目录中的WAV文件（例如 StreamSTT / StreamingSTT 保存的 recordings/recording_<ts>.wav），
+用VAD在静音处切分长录音，每个工作进程持有一份模型，同一文件的片段按长度排序后分批推理。
+结果逐文件追加到JSONL，再次运行时跳过已成功转写的文件，中断后可以继续。
+
+示例:
+    python main.py --mode batch --input recordings --output transcripts.jsonl --workers 4
+    python -m STT.batch_transcribe --input recordings --workers 0 --device cuda:0
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+SAMPLE_RATE = 16000
+
+# 工作进程内的模型和特征前端，由 _init_worker 加载一次
+_worker = None
+
+
+def find_audio_files(root, extensions=(".wav",)):
+    """递归查找音频文件，按路径排序；root 也可以是单个文件"""
+    if os.path.isfile(root):
+        return [root]
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(extensions):
+                files.append(os.path.join(dirpath, name))
+    return sorted(files)
+
+
+def read_wav(path):
+    """读取16kHz 16-bit WAV，返回int16数组（多声道取平均）"""
+    with wave.open(path, 'rb') as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getsampwidth() != 2:
+            raise ValueError(f"需要16kHz 16-bit WAV，实际为 {wf.getframerate()}Hz {wf.getsampwidth() * 8}-bit")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        if wf.getnchannels() > 1:
+            samples = samples.reshape(-1, wf.getnchannels()).mean(axis=1).astype(np.int16)
+    return samples
+
+
+def file_key(path, root):
+    """结果记录中文件的标识：相对于输入目录的路径"""
+    return os.path.relpath(path, root) if os.path.isdir(root) else path
+
+
+def load_done(output):
+    """读取已有的JSONL结果，返回已成功转写的文件集合"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 上次中断时可能留下不完整的最后一行
+                continue
+            if not record.get("error"):
+                done.add(record["file"])
+    return done
+
+
+class SegmentTranscriber:
+    """持有模型、特征前端和VAD，转写语音片段和整个文件"""
+
+    def __init__(self, model_dir, device, backend, language, batch_size, max_segment, threads):
+        import torch
+        from STT.model_registry import get_model
+        from STT.frontend import load_frontend
+        from utils.vad import EnergyZcrVAD
+
+        if threads:
+            torch.set_num_threads(threads)
+        options = {"quantize": True, "intra_op_threads": threads} if backend == "onnx" else {}
+        self.model, self.kwargs = get_model(model_dir, device=device, backend=backend, **options)
+        self.frontend = load_frontend(self.kwargs['model_path'], fs=SAMPLE_RATE)
+        self.vad = EnergyZcrVAD(sample_rate=SAMPLE_RATE, max_segment=max_segment)
+        self.language = language
+        self.batch_size = batch_size
+
+    def features(self, samples):
+        feat, _ = self.frontend.lfr_cmvn(self.frontend.fbank(samples.astype(np.float32) / 32768))
+        return feat.astype(np.float32)
+
+    def infer(self, feats):
+        """对一批特征做一次前向，返回文本列表"""
+        import torch
+        from funasr.utils.postprocess_utils import rich_transcription_postprocess
+        from STT.batch_inference_server import pad_features
+
+        padded, lengths = pad_features([torch.from_numpy(feat) for feat in feats])
+        kwargs = dict(self.kwargs)
+        kwargs.update(data_type="fbank", key=[f"seg_{i}" for i in range(len(feats))])
+        with torch.no_grad():
+            result = self.model.inference(data_in=padded, data_len=lengths, language=self.language,
+                                          use_itn=True, ban_emo_unk=False, **kwargs)
+        outputs = result[0] if result else []
+        return [rich_transcription_postprocess(outputs[i]["text"]) if i < len(outputs) else ""
+                for i in range(len(feats))]
+
+    def transcribe_segments(self, feats):
+        """转写若干片段的特征，按长度排序后分批，减少补零带来的无效计算"""
+        texts = [""] * len(feats)
+        order = sorted(range(len(feats)), key=lambda i: feats[i].shape[0])
+        for b in range(0, len(order), self.batch_size):
+            batch = order[b:b + self.batch_size]
+            for i, text in zip(batch, self.infer([feats[i] for i in batch])):
+                texts[i] = text
+        return texts
+
+    def transcribe(self, path):
+        samples = read_wav(path)
+        spans = self.vad.find_segments(samples)
+        texts = self.transcribe_segments([self.features(samples[s:e]) for s, e in spans])
+
+        segments = [
+            {"start": round(s / SAMPLE_RATE, 2), "end": round(e / SAMPLE_RATE, 2), "text": text}
+            for (s, e), text in zip(spans, texts) if text
+        ]
+        return {
+            "duration": round(len(samples) / SAMPLE_RATE, 3),
+            "segments": segments,
+            "text": "".join(seg["text"] for seg in segments),
+        }
+
+
+def _init_worker(options):
+    global _worker
+    _worker = SegmentTranscriber(**options)
+
+
+def _transcribe_file(path, root):
+    """在工作进程中转写一个文件，异常转换为结果记录中的 error 字段"""
+    record = {"file": file_key(path, root), "pid": os.getpid()}
+    start = time.perf_counter()
+    try:
+        record.update(_worker.transcribe(path))
+        record["error"] = None
+    except Exception as e:
+        record.update(duration=0.0, segments=[], text="", error=str(e))
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    record["rtf"] = round(record["seconds"] / record["duration"], 4) if record["duration"] else None
+    return record
+
+
+def run(input_path, output, workers=2, model_dir="iic/SenseVoiceSmall", device="cpu", backend="torch",
+        language="auto", batch_size=8, max_segment=30.0, threads=None):
+    """转写 input_path 下的所有WAV文件，追加写入 output，返回汇总统计"""
+    files = find_audio_files(input_path)
+    done = load_done(output)
+    pending = [f for f in files if file_key(f, input_path) not in done]
+    print(f"共 {len(files)} 个文件，已完成 {len(files) - len(pending)} 个，待转写 {len(pending)} 个")
+
+    summary = {"files": 0, "errors": 0, "audio_seconds": 0.0, "compute_seconds": 0.0}
+    if not pending:
+        return summary
+
+    options = dict(model_dir=model_dir, device=device, backend=backend, language=language,
+                   batch_size=batch_size, max_segment=max_segment, threads=threads)
+    start = time.perf_counter()
+    with open(output, 'a', encoding='utf-8') as out:
+        def write(record):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            summary["files"] += 1
+            summary["audio_seconds"] += record["duration"]
+            summary["compute_seconds"] += record["seconds"]
+            if record["error"]:
+                summary["errors"] += 1
+                print(f"[{summary['files']}/{len(pending)}] {record['file']}: 出错 {record['error']}")
+            else:
+                print(f"[{summary['files']}/{len(pending)}] {record['file']}: "
+                      f"{record['duration']:.1f}s 音频，耗时 {record['seconds']:.2f}s")
+
+        if workers <= 0:
+            # 在当前进程中转写（例如单张GPU）
+            _init_worker(options)
+            for path in pending:
+                write(_transcribe_file(path, input_path))
+        else:
+            # spawn 启动的工作进程各自加载一份模型，避免 fork 已初始化的 torch 线程池
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(options,)) as executor:
+                futures = [executor.submit(_transcribe_file, path, input_path) for path in pending]
+                for future in as_completed(futures):
+                    write(future.result())
+
+    elapsed = time.perf_counter() - start
+    summary["wall_seconds"] = elapsed
+    summary["rtf"] = elapsed / summary["audio_seconds"] if summary["audio_seconds"] else None
+    summary["files_per_sec"] = summary["files"] / elapsed
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离线批量转写录音文件')
+    parser.add_argument('--input', default=os.path.join(ROOT, "recordings"), help='录音目录或单个WAV文件')
+    parser.add_argument('--output', default="transcripts.jsonl", help='结果JSONL文件，已存在时跳过已完成的文件')
+    parser.add_argument('--workers', type=int, default=2, help='工作进程数，每个进程加载一份模型；0 表示在当前进程中运行')
+    parser.add_argument('--threads', type=int, default=None, help='每个工作进程的推理线程数')
+    parser.add_argument('--batch-size', type=int, default=8, help='每次前向计算的片段数')
+    parser.add_argument('--max-segment', type=float, default=30.0, help='切分后片段的最长时长(秒)')
+    parser.add_argument('--model-dir', default="iic/SenseVoiceSmall")
+    parser.add_argument('--device', default=os.getenv("SENSEVOICE_DEVICE", "cpu"))
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default=os.getenv("SENSEVOICE_BACKEND", "torch"))
+    parser.add_argument('--language', default="auto")
+    args = parser.parse_args(argv)
+
+    summary = run(args.input, args.output, workers=args.workers, model_dir=args.model_dir, device=args.device,
+                  backend=args.backend, language=args.language, batch_size=args.batch_size,
+                  max_segment=args.max_segment, threads=args.threads)
+    if summary["files"]:
+        print(f"\n完成 {summary['files']} 个文件（失败 {summary['errors']} 个），"
+              f"音频 {summary['audio_seconds'] / 60:.1f} 分钟，耗时 {summary['wall_seconds']:.1f}s")
+        if summary["rtf"] is not None:
+            print(f"实时率(RTF) {summary['rtf']:.4f}，{summary['files_per_sec']:.2f} 文件/秒")
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# SenseVoice 的特征前端（fbank -> LFR -> CMVN），与 SenseVoice 源码中 utils/frontend.py 的 WavFrontend 等价
+#
+# 仓库中没有 SenseVoice 源码时使用这里的实现。funasr 自带的 WavFrontend 是 torch 模块，
+# 没有 IncrementalFrontend 所需的 opts / lfr_m / lfr_n / cmvn 属性，因此不能直接替代。
+
+import importlib.util
+import os
+
+import numpy as np
+import kaldi_native_fbank as knf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class WavFrontend:
+    """SenseVoiceSmall 使用的特征前端：80维fbank，7帧拼接、6帧跳帧，再做CMVN"""
+
+    def __init__(self, cmvn_file=None, fs=16000, window="hamming", n_mels=80, frame_length=25,
+                 frame_shift=10, lfr_m=7, lfr_n=6, dither=0.0, **kwargs):
+        opts = knf.FbankOptions()
+        opts.frame_opts.samp_freq = fs
+        opts.frame_opts.dither = dither
+        opts.frame_opts.window_type = window
+        opts.frame_opts.frame_shift_ms = float(frame_shift)
+        opts.frame_opts.frame_length_ms = float(frame_length)
+        opts.mel_opts.num_bins = n_mels
+        opts.energy_floor = 0
+        opts.frame_opts.snip_edges = True
+        opts.mel_opts.debug_mel = False
+        self.opts = opts
+
+        self.lfr_m = lfr_m
+        self.lfr_n = lfr_n
+        self.cmvn_file = cmvn_file
+        self.cmvn = self.load_cmvn(cmvn_file) if cmvn_file else None
+
+    def fbank(self, waveform):
+        """[-1, 1] 范围的音频 -> (fbank特征, 帧数)"""
+        waveform = np.asarray(waveform, dtype=np.float32) * 32768.0
+        fbank_fn = knf.OnlineFbank(self.opts)
+        fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
+        frames = fbank_fn.num_frames_ready
+        mat = np.empty([frames, self.opts.mel_opts.num_bins], dtype=np.float32)
+        for i in range(frames):
+            mat[i, :] = fbank_fn.get_frame(i)
+        return mat, np.array(frames, dtype=np.int32)
+
+    def lfr_cmvn(self, feat):
+        if self.lfr_m != 1 or self.lfr_n != 1:
+            feat = self.apply_lfr(feat, self.lfr_m, self.lfr_n)
+        if self.cmvn is not None:
+            feat = self.apply_cmvn(feat)
+        return feat, np.array(feat.shape[0], dtype=np.int32)
+
+    @staticmethod
+    def apply_lfr(inputs, lfr_m, lfr_n):
+        """拼帧：左侧用第一帧补齐 (lfr_m-1)//2 帧，结尾不足 lfr_m 帧时用最后一帧补齐"""
+        T = inputs.shape[0]
+        T_lfr = int(np.ceil(T / lfr_n))
+        left_padding = np.tile(inputs[0], ((lfr_m - 1) // 2, 1))
+        inputs = np.vstack((left_padding, inputs))
+        T = T + (lfr_m - 1) // 2
+        outputs = []
+        for i in range(T_lfr):
+            if lfr_m <= T - i * lfr_n:
+                outputs.append(inputs[i * lfr_n:i * lfr_n + lfr_m].reshape(1, -1))
+            else:
+                frame = inputs[i * lfr_n:].reshape(-1)
+                padding = np.tile(inputs[-1], lfr_m - (T - i * lfr_n))
+                outputs.append(np.hstack((frame, padding)).reshape(1, -1))
+        return np.vstack(outputs).astype(np.float32)
+
+    def apply_cmvn(self, inputs):
+        dim = inputs.shape[1]
+        return ((inputs + self.cmvn[0:1, :dim]) * self.cmvn[1:2, :dim]).astype(np.float32)
+
+    @staticmethod
+    def load_cmvn(cmvn_file):
+        """读取 am.mvn（Kaldi nnet 格式）中的 <AddShift> 和 <Rescale> 参数"""
+        with open(cmvn_file, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        means, variances = [], []
+        for i, line in enumerate(lines):
+            items = line.split()
+            if not items or i + 1 >= len(lines):
+                continue
+            following = lines[i + 1].split()
+            if not following or following[0] != "<LearnRateCoef>":
+                continue
+            if items[0] == "<AddShift>":
+                means = following[3:len(following) - 1]
+            elif items[0] == "<Rescale>":
+                variances = following[3:len(following) - 1]
+        return np.array([means, variances], dtype=np.float64)
+
+
+def get_wav_frontend_class():
+    """优先使用 SenseVoice 源码中的 WavFrontend，仓库中没有源码时使用本模块的实现"""
+    try:
+        from STT.SenseVoice.utils.frontend import WavFrontend as SourceFrontend
+        return SourceFrontend
+    except ImportError:
+        pass
+    # 按文件路径加载，不把 SenseVoice 目录加入 sys.path：其中的 utils 包与仓库根目录的 utils 同名
+    source_file = os.path.join(ROOT, "STT", "SenseVoice", "utils", "frontend.py")
+    if os.path.isfile(source_file):
+        spec = importlib.util.spec_from_file_location("_sensevoice_frontend", source_file)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.WavFrontend
+    return WavFrontend
+
+
+def load_frontend(model_path, fs=16000):
+    """按模型目录中的 am.mvn 创建特征前端"""
+    return get_wav_frontend_class()(cmvn_file=f"{model_path}/am.mvn", fs=fs)
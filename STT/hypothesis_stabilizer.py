@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# 流式识别中间结果的稳定前缀提交
+
+from dataclasses import dataclass
+
+
+def common_prefix_length(texts):
+    """多个字符串的最长公共前缀长度"""
+    if not texts:
+        return 0
+    shortest = min(len(t) for t in texts)
+    for i in range(shortest):
+        c = texts[0][i]
+        if any(t[i] != c for t in texts[1:]):
+            return i
+    return shortest
+
+
+def _is_word_char(c):
+    # 只有空格分词的文字（拉丁字母、数字）需要按词边界提交，中文每个字都可以单独提交
+    return c.isascii() and c.isalnum()
+
+
+@dataclass
+class StableUpdate:
+    """一次更新的结果"""
+    committed: str  # 本次新提交的文本，可以直接交给下游
+    stable: str     # 本段话语到目前为止已提交的全部文本
+    unstable: str   # 尚未稳定、之后可能被修改的尾部
+
+    @property
+    def text(self):
+        return self.stable + self.unstable
+
+
+class HypothesisStabilizer:
+    """
+    跟踪同一段话语的连续中间结果，只提交不会再变化的前缀
+    - 最近 agreement 个中间结果的最长公共前缀视为稳定，超出已提交部分的内容被提交
+    - 提交的文本不会撤回：模型之后修改了已提交的部分时只计入 revisions，
+      新结果在已提交长度之后的部分作为不稳定尾部，继续按长度对齐提交
+    - 提交不会停在英文单词中间，避免把 "hel" 这样的半个词交给下游
+    - finalize() 用最终结果提交剩余部分，并开始新的一段话语
+    """
+
+    def __init__(self, agreement=2):
+        if agreement < 1:
+            raise ValueError("agreement 至少为1")
+        self.agreement = agreement
+        self.stable = ""
+        self._history = []
+
+        # 统计信息
+        self.updates = 0
+        self.revisions = 0  # 新结果与已提交文本不一致的次数
+
+    def update(self, hypothesis):
+        """加入一个中间结果，返回 StableUpdate"""
+        hypothesis = hypothesis.strip()
+        self.updates += 1
+        if common_prefix_length([self.stable, hypothesis]) < len(self.stable):
+            self.revisions += 1
+
+        self._history.append(hypothesis)
+        del self._history[:-self.agreement]
+
+        committed = ""
+        if len(self._history) >= self.agreement:
+            agreed = common_prefix_length(self._history)
+            end = self._word_boundary(hypothesis, agreed)
+            if end > len(self.stable):
+                committed = hypothesis[len(self.stable):end]
+                self.stable += committed
+        return StableUpdate(committed, self.stable, hypothesis[len(self.stable):])
+
+    def finalize(self, text=None):
+        """
+        话语结束：以最终结果提交剩余部分，返回本次新提交的文本，并重置状态
+        最终结果为空或比已提交的部分还短时（例如最终推理只看到了结尾的静音），改用最近的中间结果
+        """
+        text = (text or "").strip()
+        if len(text) < len(self.stable) or not text:
+            text = self._history[-1].strip() if self._history else text
+        if common_prefix_length([self.stable, text]) < len(self.stable):
+            self.revisions += 1
+        committed = text[len(self.stable):]
+        self.reset()
+        return committed
+
+    def reset(self):
+        self.stable = ""
+        self._history = []
+
+    @staticmethod
+    def _word_boundary(hypothesis, end):
+        """end 落在英文单词中间（或结果末尾尚未结束的单词）时退回到这个词的开头"""
+        if 0 < end and _is_word_char(hypothesis[end - 1]) and (end == len(hypothesis) or _is_word_char(hypothesis[end])):
+            while end > 0 and _is_word_char(hypothesis[end - 1]):
+                end -= 1
+        return end
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# 增量特征提取：只为新到达的音频计算 fbank，并增量完成 LFR 拼帧和 CMVN
+
+import numpy as np
+import kaldi_native_fbank as knf
+
+
+class IncrementalFrontend:
+    """
+    与 WavFrontend（fbank -> LFR -> CMVN）等价的增量特征提取器
+
+    - kaldi_native_fbank.OnlineFbank 自身会保留帧之间的重叠样本，
+      每块音频只计算新产生的 fbank 帧
+    - LFR 帧在所需的 lfr_m 个 fbank 帧都到齐后计算一次并缓存，
+      结尾不完整的 LFR 帧（最多 ceil(lfr_m / lfr_n) 个）在取特征时按 WavFrontend 的方式补齐
+    - 只保留最近 max_samples 个样本对应的 LFR 帧，每块音频的计算量与缓冲区长度无关
+    """
+
+    def __init__(self, frontend, max_samples=32000):
+        self.opts = frontend.opts
+        self.fs = int(self.opts.frame_opts.samp_freq)
+        self.lfr_m = getattr(frontend, "lfr_m", 7)
+        self.lfr_n = getattr(frontend, "lfr_n", 6)
+        cmvn = getattr(frontend, "cmvn", None)
+        self.cmvn = None if cmvn is None else np.asarray(cmvn, dtype=np.float32)
+
+        self.n_mels = self.opts.mel_opts.num_bins
+        self.dim = self.n_mels * self.lfr_m
+        self.left_padding = (self.lfr_m - 1) // 2
+
+        hop = int(self.fs * self.opts.frame_opts.frame_shift_ms / 1000)
+        self.max_frames = int(np.ceil(max_samples / hop / self.lfr_n))
+        # 预留一倍空间做滚动，外加结尾不完整帧的位置
+        self._tail_slots = int(np.ceil(self.lfr_m / self.lfr_n)) + 1
+        self._buf = np.zeros((2 * self.max_frames + self._tail_slots, self.dim), dtype=np.float32)
+        self._scratch = np.empty(0, dtype=np.float32)
+
+        self.reset()
+
+    def reset(self):
+        """开始新的一段音频"""
+        self._fbank = knf.OnlineFbank(self.opts)
+        self._consumed = 0             # 已从 OnlineFbank 取出的 fbank 帧数
+        self._frames = np.empty((0, self.n_mels), dtype=np.float32)  # 尚未用完的（含左侧补齐的）fbank 帧
+        self._num_fbank = 0            # 累计 fbank 帧数（不含补齐）
+        self._num_lfr = 0              # 已完成的 LFR 帧数
+        self._start = 0
+        self._end = 0
+
+    def accept_waveform(self, samples):
+        """输入一块 [-1, 1] 范围的 float 音频"""
+        samples = np.asarray(samples, dtype=np.float32)
+        # 在预分配的缓冲区中缩放，避免每块音频分配新数组
+        if len(self._scratch) < len(samples):
+            self._scratch = np.empty(len(samples), dtype=np.float32)
+        scaled = self._scratch[:len(samples)]
+        np.multiply(samples, 32768.0, out=scaled)
+        self._fbank.accept_waveform(self.fs, scaled)
+
+        ready = self._fbank.num_frames_ready
+        if ready == self._consumed:
+            return
+        new = np.array([self._fbank.get_frame(i) for i in range(self._consumed, ready)], dtype=np.float32)
+        # 已取出的帧不再需要，释放 OnlineFbank 内部的存储
+        self._fbank.pop(ready - self._consumed)
+        self._consumed = ready
+
+        if self._num_fbank == 0 and self.left_padding:
+            # 与 WavFrontend.apply_lfr 一致：用第一帧在左侧补齐
+            self._num_fbank = len(new)
+            new = np.vstack((np.tile(new[0], (self.left_padding, 1)), new))
+        else:
+            self._num_fbank += len(new)
+        self._frames = np.vstack((self._frames, new)) if len(self._frames) else new
+        self._emit_complete()
+
+    def _emit_complete(self):
+        """计算所有所需帧都已到齐的 LFR 帧"""
+        count = (len(self._frames) - self.lfr_m) // self.lfr_n + 1 if len(self._frames) >= self.lfr_m else 0
+        if count <= 0:
+            return
+        # 向量化拼帧：第 i 个 LFR 帧由 _frames[i*n : i*n+m] 拼接而成
+        index = np.arange(count)[:, None] * self.lfr_n + np.arange(self.lfr_m)[None, :]
+        lfr = self._frames[index].reshape(count, self.dim)
+        self._frames = self._frames[count * self.lfr_n:]
+        self._num_lfr += count
+        self._append(self._apply_cmvn(lfr))
+
+    def _apply_cmvn(self, feat):
+        if self.cmvn is None:
+            return feat
+        return (feat + self.cmvn[0, :self.dim]) * self.cmvn[1, :self.dim]
+
+    def _append(self, rows):
+        rows = rows[-self.max_frames:]
+        if self._end + len(rows) > 2 * self.max_frames:
+            # 空间用完时把最近的帧挪到开头，均摊后每帧只复制一次
+            keep = self._end - self._start
+            keep = min(keep, self.max_frames - len(rows))
+            self._buf[:keep] = self._buf[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._buf[self._end:self._end + len(rows)] = rows
+        self._end += len(rows)
+        self._start = max(self._start, self._end - self.max_frames)
+
+    def get_features(self):
+        """
+        返回 (feat, feat_len)：最近缓冲区内的特征，结尾不完整的 LFR 帧已补齐
+        feat 是内部缓冲区的视图，下一次 accept_waveform 之后可能被覆盖
+        """
+        total = int(np.ceil(self._num_fbank / self.lfr_n))
+        tail = total - self._num_lfr
+        for k in range(tail):
+            # 与 WavFrontend.apply_lfr 一致：不足 lfr_m 帧时用最后一帧补齐
+            frames = self._frames[k * self.lfr_n:]
+            if len(frames) < self.lfr_m:
+                frames = np.vstack((frames, np.tile(frames[-1], (self.lfr_m - len(frames), 1))))
+            else:
+                frames = frames[:self.lfr_m]
+            self._buf[self._end + k] = self._apply_cmvn(frames.reshape(-1))
+        start = max(self._start, self._end + tail - self.max_frames)
+        feat = self._buf[start:self._end + tail]
+        return feat, feat.shape[0]
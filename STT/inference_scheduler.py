@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# 流式识别的推理调度：按固定节奏出中间结果，端点处立即出最终结果
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+PARTIAL = "partial"
+FINAL = "final"
+
+
+@dataclass
+class TranscriptEvent:
+    """识别结果事件，放入 StreamingSTT.result_queue"""
+    kind: str            # PARTIAL 或 FINAL
+    text: str
+    utterance_id: int    # 同一段话语的中间结果和最终结果共享同一个编号
+    submitted_at: float  # 推理请求提交的时间（time.time()）
+    latency: float       # 从提交到得到结果的耗时（秒）
+    audio_end: float = None  # 提交时已接收音频的时长（秒），由调用方提供
+    committed: str = ""      # 本次新稳定下来的文本（由 HypothesisStabilizer 填写），可以直接交给下游
+    unstable: str = ""       # 尚未稳定、之后可能被修改的尾部
+
+    @property
+    def is_final(self):
+        return self.kind == FINAL
+
+    def __str__(self):
+        return self.text
+
+
+class InferenceScheduler:
+    """
+    在单独的线程中执行推理请求
+    - 中间结果请求只保留最新的一个：推理线程忙时到达的新请求会替换尚未执行的旧请求
+    - 最终结果请求不会被丢弃，并优先于中间结果执行；
+      某段话语的最终结果提交后，该话语尚未执行的中间结果请求直接作废
+    - partial_interval 控制中间结果的最小间隔，避免每个音频块都做一次完整推理
+    """
+
+    def __init__(self, infer_fn, on_event, partial_interval=0.5):
+        self.infer_fn = infer_fn
+        self.on_event = on_event
+        self.partial_interval = partial_interval
+
+        self._cond = threading.Condition()
+        self._pending_partial = None
+        self._finals = deque()
+        self._finalized = -1
+        self._last_partial_time = 0.0
+        self._running = False
+        self._thread = None
+
+        # 统计信息
+        self.partial_runs = 0
+        self.final_runs = 0
+        self.dropped_partials = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """停止调度线程；已提交的最终结果请求会先执行完"""
+        with self._cond:
+            self._running = False
+            self._pending_partial = None
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def partial_due(self):
+        """距离上一次中间结果请求是否已超过 partial_interval"""
+        return time.time() - self._last_partial_time >= self.partial_interval
+
+    def submit_partial(self, feat, feat_len, utterance_id, audio_end=None):
+        with self._cond:
+            self._last_partial_time = time.time()
+            if self._pending_partial is not None:
+                self.dropped_partials += 1
+            self._pending_partial = (PARTIAL, feat, feat_len, utterance_id, time.time(), audio_end)
+            self._cond.notify()
+
+    def submit_final(self, feat, feat_len, utterance_id, audio_end=None):
+        with self._cond:
+            if self._pending_partial is not None and self._pending_partial[3] <= utterance_id:
+                self._pending_partial = None
+                self.dropped_partials += 1
+            self._finalized = max(self._finalized, utterance_id)
+            self._finals.append((FINAL, feat, feat_len, utterance_id, time.time(), audio_end))
+            self._cond.notify()
+
+    def _next_request(self):
+        with self._cond:
+            while self._running and not self._finals and self._pending_partial is None:
+                self._cond.wait()
+            if self._finals:
+                return self._finals.popleft()
+            if not self._running:
+                return None
+            request, self._pending_partial = self._pending_partial, None
+            return request
+
+    def _run(self):
+        while True:
+            request = self._next_request()
+            if request is None:
+                break
+            kind, feat, feat_len, utterance_id, submitted_at, audio_end = request
+            if kind == PARTIAL and utterance_id <= self._finalized:
+                # 该话语已经结束，中间结果不再有意义
+                self.dropped_partials += 1
+                continue
+
+            try:
+                text = self.infer_fn(feat, feat_len)
+            except Exception as e:
+                print(f"推理时出错: {e}")
+                text = ""
+
+            if kind == FINAL:
+                self.final_runs += 1
+            else:
+                self.partial_runs += 1
+            self.on_event(TranscriptEvent(kind, text, utterance_id, submitted_at, time.time() - submitted_at, audio_end))
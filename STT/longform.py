@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+长音频转写（内存占用与文件长度无关）
+
+用 np.memmap 只映射WAV data块中当前处理的一段，按块用VAD找出语音片段，
+片段凑满一批就推理并以生成器的方式逐条给出带时间戳的结果。
+同一时刻内存中只有一个扫描块和一批片段的特征，一小时的课堂录音也可以在小内存机器上处理。
+VAD 的扫描状态在块之间延续，按块切分的结果与一次性切分整个文件相同，可以用 --check-spans 检查。
+
+示例:
+    python main.py --mode longform --input lecture.wav --output lecture.jsonl
+    python main.py --mode longform --input lecture.wav --check-spans
+"""
+
+import argparse
+import itertools
+import json
+import os
+import resource
+import struct
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+from STT.batch_transcribe import SAMPLE_RATE, SegmentTranscriber
+from utils.vad import EnergyZcrVAD, SegmentScan
+
+
+class WavMemmap:
+    """
+    16-bit PCM WAV文件的内存映射读取器
+    - 解析RIFF块结构定位data块，支持data块前有LIST等其他块的文件
+    - 录音中断导致文件头中data长度为0或超出文件大小时，以文件实际大小为准
+    - read() 每次只映射所需的一段并返回副本，读完即解除映射，常驻内存不随已读长度增长
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+            if riff != b'RIFF' or wave_id != b'WAVE':
+                raise ValueError(f"{path}: 不是WAV文件")
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path}: 缺少data块")
+                chunk_id, chunk_size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = struct.unpack('<HHIIHH', f.read(16))
+                    f.seek(chunk_size - 16 + (chunk_size & 1), os.SEEK_CUR)
+                elif chunk_id == b'data':
+                    self.offset = f.tell()
+                    file_size = os.fstat(f.fileno()).st_size
+                    if chunk_size == 0 or self.offset + chunk_size > file_size:
+                        chunk_size = file_size - self.offset
+                    break
+                else:
+                    f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+        if fmt is None:
+            raise ValueError(f"{path}: 缺少fmt块")
+        audio_format, self.channels, self.sample_rate, _, _, bits = fmt
+        if audio_format not in (1, 0xFFFE) or bits != 16:
+            raise ValueError(f"{path}: 需要16-bit PCM WAV")
+        self.num_samples = chunk_size // (2 * self.channels)
+
+    @property
+    def duration(self):
+        return self.num_samples / self.sample_rate
+
+    def read(self, start, end):
+        """返回 [start, end) 范围样本的int16单声道副本（多声道取平均）"""
+        end = min(end, self.num_samples)
+        if end <= start:
+            return np.empty(0, dtype=np.int16)
+        mapped = np.memmap(self.path, dtype=np.int16, mode='r',
+                           offset=self.offset + start * 2 * self.channels,
+                           shape=((end - start) * self.channels,))
+        if self.channels > 1:
+            samples = mapped.reshape(-1, self.channels).mean(axis=1).astype(np.int16)
+        else:
+            samples = np.array(mapped)
+        del mapped
+        return samples
+
+
+def iter_speech_spans(wav, vad, block_seconds=60.0):
+    """
+    按块扫描整个文件，依次给出 (start, end, samples)，start/end 为文件中的绝对样本位置
+    VAD 的扫描状态在块之间延续（utils.vad.SegmentScan），结果与一次性切分整个文件相同，
+    跨越块边界的话语不会被切断；samples 为这个片段的音频（单独映射读取，最长 max_segment）
+    """
+    frame = vad.frame_length
+    # 块长取整到帧长，块边界与整文件切分时的帧边界对齐
+    block = max(1, int(block_seconds * wav.sample_rate) // frame) * frame
+    scan = SegmentScan(vad)
+    for base in range(0, wav.num_samples, block):
+        for start, end in scan.feed(wav.read(base, base + block)):
+            yield start, end, wav.read(start, end)
+    for start, end in scan.finish():
+        yield start, end, wav.read(start, end)
+
+
+def check_spans(path, vad, block_seconds=60.0):
+    """比较按块扫描与一次性切分整个文件得到的片段，返回 (片段数, 不一致的片段列表)；需要把整个文件读入内存"""
+    wav = WavMemmap(path)
+    blockwise = [(start, end) for start, end, _ in iter_speech_spans(wav, vad, block_seconds)]
+    whole = vad.find_segments(wav.read(0, wav.num_samples))
+    mismatched = [(a, b) for a, b in itertools.zip_longest(blockwise, whole) if a != b]
+    return len(whole), mismatched
+
+
+def transcribe_longform(path, transcriber, block_seconds=60.0):
+    """逐条生成 {"start", "end", "text"}（时间单位为秒），片段凑满 batch_size 条后推理一次"""
+    wav = WavMemmap(path)
+    if wav.sample_rate != SAMPLE_RATE:
+        raise ValueError(f"{path}: 需要{SAMPLE_RATE}Hz WAV，实际为 {wav.sample_rate}Hz")
+
+    pending = []
+
+    def flush():
+        texts = transcriber.transcribe_segments([feat for _, _, feat in pending])
+        results = [
+            {"start": round(start / SAMPLE_RATE, 2), "end": round(end / SAMPLE_RATE, 2), "text": text}
+            for (start, end, _), text in zip(pending, texts) if text
+        ]
+        pending.clear()
+        return results
+
+    for start, end, samples in iter_speech_spans(wav, transcriber.vad, block_seconds):
+        pending.append((start, end, transcriber.features(samples)))
+        if len(pending) >= transcriber.batch_size:
+            yield from flush()
+    if pending:
+        yield from flush()
+
+
+def format_timestamp(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:05.2f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='长音频转写（内存映射，内存占用与文件长度无关）')
+    parser.add_argument('--input', required=True, help='16kHz 16-bit WAV文件')
+    parser.add_argument('--output', default=None, help='将片段写入JSONL文件')
+    parser.add_argument('--block-seconds', type=float, default=60.0, help='每次映射和扫描的音频时长(秒)')
+    parser.add_argument('--batch-size', type=int, default=8, help='每次前向计算的片段数')
+    parser.add_argument('--max-segment', type=float, default=30.0, help='片段的最长时长(秒)')
+    parser.add_argument('--threads', type=int, default=None, help='推理线程数')
+    parser.add_argument('--model-dir', default="iic/SenseVoiceSmall")
+    parser.add_argument('--device', default=os.getenv("SENSEVOICE_DEVICE", "cpu"))
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default=os.getenv("SENSEVOICE_BACKEND", "torch"))
+    parser.add_argument('--language', default="auto")
+    parser.add_argument('--check-spans', action='store_true',
+                        help='只检查按块扫描与一次性切分整个文件的片段是否一致（不加载模型）')
+    args = parser.parse_args(argv)
+
+    if args.check_spans:
+        vad = EnergyZcrVAD(sample_rate=SAMPLE_RATE, max_segment=args.max_segment)
+        total, mismatched = check_spans(args.input, vad, args.block_seconds)
+        for blockwise, whole in mismatched:
+            print(f"不一致: 按块 {blockwise}，整文件 {whole}")
+        print(f"{total} 个片段，{len(mismatched)} 个不一致")
+        sys.exit(1 if mismatched else 0)
+
+    transcriber = SegmentTranscriber(model_dir=args.model_dir, device=args.device, backend=args.backend,
+                                     language=args.language, batch_size=args.batch_size,
+                                     max_segment=args.max_segment, threads=args.threads)
+    duration = WavMemmap(args.input).duration
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else None
+    start = time.perf_counter()
+    count = 0
+    try:
+        for segment in transcribe_longform(args.input, transcriber, args.block_seconds):
+            count += 1
+            print(f"[{format_timestamp(segment['start'])} - {format_timestamp(segment['end'])}] {segment['text']}")
+            if out:
+                out.write(json.dumps(segment, ensure_ascii=False) + "\n")
+                out.flush()
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    # Linux 上 ru_maxrss 的单位为KB
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\n{count} 个片段，音频 {duration / 60:.1f} 分钟，耗时 {elapsed:.1f}s，"
+          f"实时率(RTF) {elapsed / duration:.4f}，峰值内存 {peak_rss:.0f}MB")
+    if args.output:
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
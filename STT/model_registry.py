@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# 进程内共享的模型注册表：每个模型只加载一次，加载后立即预热
+
+import os
+import threading
+import time
+
+import torch
+
+from STT.onnx_backend import OnnxSenseVoice
+
+# 预热使用约1秒音频对应的特征（LFR后每帧60ms）
+WARMUP_FRAMES = 17
+FEATURE_DIM = 560
+
+
+def _load_sensevoice():
+    """SenseVoiceSmall 模型类：优先使用仓库中的 SenseVoice 源码，没有时使用 funasr 自带的实现"""
+    try:
+        from STT.SenseVoice.model import SenseVoiceSmall
+    except ImportError:
+        try:
+            from model import SenseVoiceSmall
+        except ImportError:
+            from funasr.models.sense_voice.model import SenseVoiceSmall
+    return SenseVoiceSmall
+
+
+def _from_pretrained(model_dir, device, **options):
+    """加载模型，返回 (model, kwargs)；funasr 中的模型类没有 from_pretrained 时经 AutoModel 构建"""
+    model_class = _load_sensevoice()
+    if hasattr(model_class, "from_pretrained"):
+        return model_class.from_pretrained(model=model_dir, device=device, **options)
+    from funasr import AutoModel
+    return AutoModel.build_model(model=model_dir, device=device, **options)
+
+
+def default_device():
+    return os.getenv("SENSEVOICE_DEVICE", "cuda:0" if torch.cuda.is_available() else "cpu")
+
+
+class ModelRegistry:
+    """
+    按 (模型目录, 设备, 后端, 选项) 缓存已加载的模型
+    - 同一进程内的所有会话和线程共享同一个模型实例，只用于推理，不应修改
+    - 不同模型可以并行加载，同一模型的并发请求只会触发一次加载
+    - 加载后用空白特征做一次推理预热，避免第一句话的识别变慢
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._key_locks = {}
+        self._timings = {}
+
+    def get(self, model_dir="iic/SenseVoiceSmall", device=None, backend=None, warmup=True, **options):
+        """返回 (model, kwargs)，与 SenseVoiceSmall.from_pretrained 的返回值一致"""
+        device = device or default_device()
+        backend = backend or os.getenv("SENSEVOICE_BACKEND", "torch")
+        key = (model_dir, device, backend, tuple(sorted(options.items())))
+
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 等待锁期间其他线程可能已经加载完成
+            if key in self._models:
+                return self._models[key]
+
+            print(f"正在加载模型 {model_dir}（后端: {backend}，设备: {device}）...")
+            start = time.perf_counter()
+            model, kwargs = self._load(model_dir, device, backend, options)
+            load_seconds = time.perf_counter() - start
+
+            warmup_seconds = 0.0
+            if warmup:
+                start = time.perf_counter()
+                self._warmup(model, kwargs)
+                warmup_seconds = time.perf_counter() - start
+            print(f"模型加载完成，加载 {load_seconds:.2f}s，预热 {warmup_seconds:.2f}s")
+
+            with self._lock:
+                self._models[key] = (model, kwargs)
+                self._timings[key] = {"load_seconds": load_seconds, "warmup_seconds": warmup_seconds}
+            return model, kwargs
+
+    def timings(self):
+        """返回各模型的加载和预热耗时"""
+        with self._lock:
+            return {
+                f"{model_dir}|{device}|{backend}": dict(timing)
+                for (model_dir, device, backend, _), timing in self._timings.items()
+            }
+
+    def clear(self):
+        """释放所有已缓存的模型"""
+        with self._lock:
+            self._models.clear()
+            self._key_locks.clear()
+            self._timings.clear()
+
+    @staticmethod
+    def _load(model_dir, device, backend, options):
+        if backend == "onnx":
+            model = OnnxSenseVoice(model_dir, **options)
+            return model, model.kwargs
+        if backend != "torch":
+            raise ValueError(f"未知的推理后端: {backend}")
+        model, kwargs = _from_pretrained(model_dir, device, **options)
+        model.eval()
+        return model, kwargs
+
+    @staticmethod
+    def _warmup(model, kwargs):
+        feat = torch.zeros(1, WARMUP_FRAMES, FEATURE_DIM)
+        feat_len = torch.tensor([WARMUP_FRAMES], dtype=torch.int32)
+        call_kwargs = dict(kwargs)
+        call_kwargs.update(data_type="fbank", key=["warmup"])
+        try:
+            with torch.no_grad():
+                model.inference(data_in=feat, data_len=feat_len, language="auto",
+                                use_itn=False, ban_emo_unk=False, **call_kwargs)
+        except Exception as e:
+            print(f"模型预热失败: {e}")
+
+
+_registry = ModelRegistry()
+
+
+def get_model(model_dir="iic/SenseVoiceSmall", device=None, backend=None, warmup=True, **options):
+    """从进程级注册表获取共享模型"""
+    return _registry.get(model_dir, device=device, backend=backend, warmup=warmup, **options)
+
+
+def model_timings():
+    """返回进程内各模型的加载和预热耗时"""
+    return _registry.timings()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# SenseVoiceSmall 的 ONNX Runtime 后端（支持动态 int8 量化）
+
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+
+# 与 SenseVoiceSmall 中的 lid_dict / textnorm_dict 保持一致
+LANGUAGE_IDS = {"auto": 0, "zh": 3, "en": 4, "yue": 7, "ja": 11, "ko": 12, "nospeech": 13}
+TEXTNORM_IDS = {"withitn": 14, "woitn": 15}
+BLANK_ID = 0
+
+FP32_MODEL = "model.onnx"
+INT8_MODEL = "model_int8.onnx"
+TOKENIZER_MODEL = "chn_jpn_yue_eng_ko_spectok.bpe.model"
+
+
+def resolve_model_dir(model_dir):
+    """将 iic/SenseVoiceSmall 这样的模型ID解析为本地目录（必要时从ModelScope下载）"""
+    if os.path.isdir(model_dir):
+        return model_dir
+    from modelscope import snapshot_download
+    return snapshot_download(model_dir)
+
+
+def export_onnx(model_dir="iic/SenseVoiceSmall", quantize=True):
+    """
+    导出 ONNX 模型，并可选地做动态 int8 量化
+    返回 (fp32模型路径, int8模型路径或None)
+    """
+    model_dir = resolve_model_dir(model_dir)
+    fp32_path = Path(model_dir) / FP32_MODEL
+    if not fp32_path.exists():
+        from funasr import AutoModel
+        print("正在导出 ONNX 模型...")
+        model = AutoModel(model=model_dir, device="cpu", disable_update=True)
+        model.export(type="onnx", quantize=False)
+        print(f"ONNX 模型已导出: {fp32_path}")
+
+    int8_path = None
+    if quantize:
+        int8_path = Path(model_dir) / INT8_MODEL
+        if not int8_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            print("正在进行动态 int8 量化...")
+            quantize_dynamic(
+                model_input=str(fp32_path),
+                model_output=str(int8_path),
+                op_types_to_quantize=["MatMul"],
+                per_channel=True,
+                weight_type=QuantType.QInt8
+            )
+            print(f"量化模型已保存: {int8_path}")
+    return fp32_path, int8_path
+
+
+class OnnxSenseVoice:
+    """
+    ONNX Runtime 版本的 SenseVoiceSmall
+    inference() 的参数和返回值与 torch 版一致（输入为 fbank 特征），可以直接替换
+    """
+
+    def __init__(self, model_dir="iic/SenseVoiceSmall", quantize=True, intra_op_threads=None, inter_op_threads=1):
+        import onnxruntime as ort
+        import sentencepiece as spm
+
+        self.model_dir = resolve_model_dir(model_dir)
+        fp32_path, int8_path = export_onnx(self.model_dir, quantize=quantize)
+        self.model_file = str(int8_path if quantize else fp32_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+        self.session = ort.InferenceSession(self.model_file, sess_options=options, providers=["CPUExecutionProvider"])
+
+        self.tokenizer = spm.SentencePieceProcessor()
+        self.tokenizer.load(str(Path(self.model_dir) / TOKENIZER_MODEL))
+
+        # 与 SenseVoiceSmall.from_pretrained 返回的 kwargs 保持兼容
+        self.kwargs = {"model_path": self.model_dir}
+
+    def eval(self):
+        return self
+
+    @staticmethod
+    def _to_batch(data_in, data_len):
+        """把张量、数组或特征列表统一成补零后的 [B, T, D] 数组和长度数组"""
+        if isinstance(data_in, (list, tuple)):
+            feats = [np.asarray(f.cpu() if torch.is_tensor(f) else f, dtype=np.float32) for f in data_in]
+            feats = [f[0] if f.ndim == 3 else f for f in feats]
+            lengths = np.array([f.shape[0] for f in feats], dtype=np.int32)
+            batch = np.zeros((len(feats), lengths.max(), feats[0].shape[1]), dtype=np.float32)
+            for i, f in enumerate(feats):
+                batch[i, :f.shape[0]] = f
+            return batch, lengths
+
+        batch = np.asarray(data_in.cpu() if torch.is_tensor(data_in) else data_in, dtype=np.float32)
+        if batch.ndim == 2:
+            batch = batch[None]
+        if data_len is None:
+            lengths = np.full(batch.shape[0], batch.shape[1], dtype=np.int32)
+        else:
+            lengths = np.asarray(data_len.cpu() if torch.is_tensor(data_len) else data_len, dtype=np.int32).reshape(-1)
+        return batch, lengths
+
+    def inference(self, data_in, data_len=None, language="auto", use_itn=False, key=None, **kwargs):
+        speech, lengths = self._to_batch(data_in, data_len)
+        batch_size = speech.shape[0]
+        language_ids = np.full(batch_size, LANGUAGE_IDS.get(language, 0), dtype=np.int32)
+        textnorm_ids = np.full(batch_size, TEXTNORM_IDS["withitn" if use_itn else "woitn"], dtype=np.int32)
+
+        ctc_logits, encoder_out_lens = self.session.run(None, {
+            "speech": speech,
+            "speech_lengths": lengths,
+            "language": language_ids,
+            "textnorm": textnorm_ids,
+        })
+
+        if key is None:
+            key = [f"onnx_{i}" for i in range(batch_size)]
+        results = []
+        for i in range(batch_size):
+            # CTC 贪心解码：取最大概率、合并连续重复、去掉空白符
+            ids = ctc_logits[i, :int(encoder_out_lens[i])].argmax(axis=-1)
+            if len(ids):
+                ids = ids[np.insert(ids[1:] != ids[:-1], 0, True)]
+            ids = [int(t) for t in ids if t != BLANK_ID]
+            results.append({"key": key[i], "text": self.tokenizer.decode(ids)})
+        return results, {}
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# 并发识别工作池，按提交顺序交付识别结果
+
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import speech_recognition as sr
+
+# 进程池模式下每个工作进程持有的识别后端
+_worker_backend = None
+
+
+def _init_worker(backend):
+    global _worker_backend
+    _worker_backend = backend
+
+
+def _recognize(backend, segment, rate, sample_width):
+    """识别一个片段，返回 (文本, 错误信息)；异常在工作线程/进程内转换为返回值"""
+    if backend is None:
+        backend = _worker_backend
+    try:
+        return backend.recognize_pcm(segment, rate, sample_width), None
+    except sr.UnknownValueError:
+        return "", None
+    except sr.RequestError as e:
+        return "", f"语音识别服务错误: {e}"
+    except Exception as e:
+        return "", f"识别语音时出错: {e}"
+
+
+class OrderedRecognitionPool:
+    """
+    用线程池或进程池同时识别多个片段
+    - 结果按提交顺序通过 on_result(seq, text) 交付，慢请求不会打乱文本顺序
+    - 同时在途的片段数不超过 max_pending，超过时 submit 阻塞，形成背压
+    """
+
+    def __init__(self, backend, on_result, workers=2, executor="thread", max_pending=None):
+        if executor == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            self._task_backend = backend
+        elif executor == "process":
+            # 后端在每个工作进程初始化时传入一次，而不是每个任务都序列化
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,))
+            self._task_backend = None
+        else:
+            raise ValueError(f"未知的执行器类型: {executor}")
+
+        self.on_result = on_result
+        self._slots = threading.Semaphore(max_pending or workers * 2)
+        self._lock = threading.Lock()
+        self._results = {}
+        self._next_submit = 0
+        self._next_deliver = 0
+
+    def submit(self, segment, rate=16000, sample_width=2):
+        """提交一个片段，返回其序号"""
+        self._slots.acquire()
+        with self._lock:
+            seq = self._next_submit
+            self._next_submit += 1
+        future = self._executor.submit(_recognize, self._task_backend, segment, rate, sample_width)
+        future.add_done_callback(lambda f, seq=seq: self._on_done(seq, f))
+        return seq
+
+    @property
+    def pending(self):
+        """已提交但尚未交付的片段数"""
+        return self._next_submit - self._next_deliver
+
+    def close(self, wait=True):
+        """关闭工作池；wait 为 True 时等待所有在途片段交付"""
+        self._executor.shutdown(wait=wait)
+
+    def _on_done(self, seq, future):
+        try:
+            text, error = future.result()
+        except Exception as e:
+            text, error = "", f"识别语音时出错: {e}"
+        if error:
+            print(error)
+
+        with self._lock:
+            self._results[seq] = text
+            # 交付所有已按顺序就绪的结果
+            while self._next_deliver in self._results:
+                ready = self._results.pop(self._next_deliver)
+                try:
+                    self.on_result(self._next_deliver, ready)
+                finally:
+                    self._next_deliver += 1
+                    self._slots.release()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# 可插拔的语音识别后端
+
+import speech_recognition as sr
+
+
+def pcm_to_audio_data(pcm_bytes, sample_rate=16000, sample_width=2):
+    """将内存中的PCM字节直接包装为AudioData，无需写入临时WAV文件"""
+    return sr.AudioData(pcm_bytes, sample_rate, sample_width)
+
+
+class RecognizerBackend:
+    """识别后端基类
+
+    子类实现 recognize(audio_data)，返回识别出的文本。
+    无法识别时抛出 sr.UnknownValueError，服务出错时抛出 sr.RequestError，
+    与 SpeechRecognition 自带的识别函数保持一致。
+    """
+
+    name = "base"
+
+    def __init__(self, language="zh-CN"):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, audio_data):
+        raise NotImplementedError
+
+    def recognize_pcm(self, pcm_bytes, sample_rate=16000, sample_width=2):
+        """直接识别内存中的PCM数据"""
+        return self.recognize(pcm_to_audio_data(pcm_bytes, sample_rate, sample_width))
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google 在线识别（原有的默认行为）"""
+
+    name = "google"
+
+    def recognize(self, audio_data):
+        return self.recognizer.recognize_google(audio_data, language=self.language)
+
+
+class WhisperBackend(RecognizerBackend):
+    """本地 Whisper 离线识别，不依赖网络"""
+
+    name = "whisper"
+
+    # Whisper 使用语言全称而不是 zh-CN 这样的区域代码
+    LANGUAGE_MAP = {"zh-CN": "chinese", "zh": "chinese", "en-US": "english", "en": "english"}
+
+    def __init__(self, language="zh-CN", model="base"):
+        super().__init__(language)
+        self.model = model
+
+    def recognize(self, audio_data):
+        language = self.LANGUAGE_MAP.get(self.language, self.language)
+        return self.recognizer.recognize_whisper(audio_data, model=self.model, language=language).strip()
+
+
+class SphinxBackend(RecognizerBackend):
+    """PocketSphinx 离线识别，需要安装对应语言包"""
+
+    name = "sphinx"
+
+    def recognize(self, audio_data):
+        return self.recognizer.recognize_sphinx(audio_data, language=self.language)
+
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    WhisperBackend.name: WhisperBackend,
+    SphinxBackend.name: SphinxBackend,
+}
+
+
+def create_backend(backend="google", **kwargs):
+    """根据名称创建识别后端；传入后端实例时原样返回"""
+    if isinstance(backend, RecognizerBackend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的识别后端: {backend}，可选: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](**kwargs)
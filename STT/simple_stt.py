@@ -1,42 +1,88 @@
-import queue
 import threading
 import time
-import numpy as np
-import pyaudio
-import wave
 import os
 import speech_recognition as sr
-from datetime import datetime
 from pathlib import Path
+from STT.recognizer_backends import create_backend
+from utils.audio_capture import AudioCapture
+from utils.ring_buffer import ByteRingBuffer
+from utils.recording_writer import WavStreamWriter
+from utils.vad import AdaptiveEnergyDetector, EnergyZcrVAD
+from STT.transcript_stitcher import TranscriptStitcher
+from STT.recognition_pool import OrderedRecognitionPool
 
 class StreamSTT:
     """简化版的流式语音识别"""
     
-    def __init__(self, energy_threshold=4000, pause_threshold=0.8):
-        """初始化语音识别器"""
+    def __init__(self, energy_threshold=4000, pause_threshold=0.8, backend="google", language="zh-CN",
+                 history_seconds=30, segmentation="vad", window_seconds=2.0, overlap_seconds=0.5,
+                 workers=1, executor="thread", max_queue_seconds=10, audio_input=None, adaptive_threshold=True,
+                 on_result=None):
+        """初始化语音识别器
+
+        backend 可以是后端名称（google/whisper/sphinx）或 RecognizerBackend 实例
+        history_seconds 为内存中保留的最近音频时长，完整录音直接流式写入磁盘
+        segmentation 为切分方式：vad 按语音边界切分话语，fixed 按 window_seconds 固定时长切分，
+        overlap 为相邻窗口共享 overlap_seconds 音频的重叠窗口，识别结果经拼接去重
+        workers/executor 为并发识别的工作数和执行器类型（thread/process），结果按顺序拼接
+        max_queue_seconds 为音频队列最多缓存的时长，识别跟不上时丢弃最旧的音频
+        audio_input 为输入设备（utils.audio_capture 中的 FileInput/SyntheticInput 等），默认使用麦克风
+        adaptive_threshold 为 True 时语音检测阈值跟随噪声底变化，energy_threshold 仅用于统计对比
+        on_result(seq, text) 在每个片段按顺序识别完成时调用（包括识别为空的片段）
+        """
         self.recognizer = sr.Recognizer()
         self.recognizer.energy_threshold = energy_threshold  # 能量阈值，用于检测语音
         self.recognizer.pause_threshold = pause_threshold    # 停顿阈值，用于检测语音结束
         
+        # 识别后端，默认使用Google在线识别
+        self.backend = create_backend(backend, language=language)
+        
+        # 话语切分：能量阈值和停顿阈值同样作用于VAD
+        if segmentation not in ("vad", "fixed", "overlap"):
+            raise ValueError(f"未知的切分方式: {segmentation}")
+        if segmentation == "overlap" and not 0 < overlap_seconds < window_seconds:
+            raise ValueError("overlap_seconds 必须大于0且小于 window_seconds")
+        self.segmentation = segmentation
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds if segmentation == "overlap" else 0.0
+        self.detector = AdaptiveEnergyDetector(sample_rate=16000, fixed_threshold=energy_threshold) if adaptive_threshold else None
+        self.vad = EnergyZcrVAD(sample_rate=16000, energy_threshold=energy_threshold, hangover=pause_threshold,
+                                detector=self.detector)
+        
+        # 识别统计：调用识别后端的次数、跳过的纯静音片段数
+        self.recognizer_calls = 0
+        self.skipped_silence = 0
+        
+        # 并发识别配置
+        self.workers = workers
+        self.executor = executor
+        self.recognition_pool = None
+        
         # 创建录音文件存储目录
         self.recordings_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / "recordings"
         if not self.recordings_dir.exists():
             self.recordings_dir.mkdir(parents=True)
         
-        # 初始化PyAudio
-        self.audio = pyaudio.PyAudio()
-        self.stream = None
-        self.frames = []
+        # 回调模式的音频采集引擎（16kHz、16-bit单声道，每块1024帧）
+        self.capture = AudioCapture(audio_input, sample_rate=16000, chunk_size=1024, dtype="int16")
+        self.capture.add_callback(self._on_audio_chunk)
         
-        # 创建音频队列
-        self.audio_queue = queue.Queue()
+        # 最近音频的环形缓冲区，内存占用固定
+        self.capture_buffer = ByteRingBuffer(int(history_seconds * 16000 * 2))
+        self.recording_writer = None
+        self.recording_path = None
         
-        # 当前识别的文本
+        # 识别线程的有界音频队列，每次开始监听时订阅，识别跟不上时丢弃最旧的音频块
+        self.max_queue_chunks = max(1, int(max_queue_seconds * 16000 / 1024))
+        self.audio_subscription = None
+        
+        # 当前识别的文本，由拼接器累积；只有重叠窗口模式需要去除重叠部分
         self.current_text = ""
+        self.stitcher = TranscriptStitcher(max_overlap=30 if segmentation == "overlap" else 0)
+        self.on_result = on_result
         
         # 控制标志
         self.is_listening = False
-        self.listen_thread = None
         self.recognize_thread = None
     
     def start_listening(self):
@@ -47,165 +93,141 @@ class StreamSTT:
         self.is_listening = True
         print("开始监听麦克风输入...")
         
-        # 启动监听线程
-        self.listen_thread = threading.Thread(target=self._listen_microphone)
-        self.listen_thread.daemon = True
-        self.listen_thread.start()
+        # 生成唯一的录音文件名
+        timestamp = int(time.time())
+        self.recording_path = self.recordings_dir / f"recording_{timestamp}.wav"
+        print(f"录音文件将保存至: {self.recording_path}")
+        
+        # 开始录音，音频由后台线程增量写入磁盘
+        self.capture_buffer.clear()
+        self.recording_writer = WavStreamWriter(
+            self.recording_path,
+            channels=1,
+            sample_width=self.capture.sample_width,
+            sample_rate=self.capture.sample_rate
+        ).start()
+        
+        # 先订阅再启动采集，识别线程从第一块音频开始处理
+        self.audio_subscription = self.capture.subscribe(self.max_queue_chunks)
         
         # 启动识别线程
         self.recognize_thread = threading.Thread(target=self._recognize_speech)
         self.recognize_thread.daemon = True
         self.recognize_thread.start()
+        
+        # 启动采集，音频块由采集引擎的回调推送
+        self.capture.start()
     
     def stop_listening(self):
         """停止监听"""
+        if not self.is_listening:
+            return
         self.is_listening = False
         
-        # 等待线程结束
-        if self.listen_thread and self.listen_thread.is_alive():
-            self.listen_thread.join(timeout=2)
+        # 停止采集会立即唤醒识别线程，识别线程处理完剩余音频后退出
+        self.capture.stop()
         
         if self.recognize_thread and self.recognize_thread.is_alive():
             self.recognize_thread.join(timeout=2)
         
-        # 关闭音频流
-        if self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
-        
-        # 关闭PyAudio
-        self.audio.terminate()
+        # 关闭录音文件（回填WAV文件头）
+        self.recording_writer.close()
+        if self.recording_writer.data_size:
+            print(f"录音已保存: {self.recording_path}")
+        else:
+            os.remove(self.recording_path)
         
         print("已停止监听")
     
+    @property
+    def dropped_chunks(self):
+        """本次监听中识别跟不上、被丢弃的音频块数"""
+        return self.audio_subscription.dropped_chunks if self.audio_subscription else 0
+    
+    def get_detection_stats(self):
+        """语音检测统计：噪声底、阈值、与固定阈值相比少触发的音频块数和误触发率"""
+        return self.detector.stats() if self.detector is not None else {}
+    
     def get_text(self):
         """获取当前识别的文本"""
         return self.current_text
     
-    def _listen_microphone(self):
-        """监听麦克风输入，将音频数据放入队列"""
-        # 设置音频参数
-        FORMAT = pyaudio.paInt16
-        CHANNELS = 1
-        RATE = 16000
-        CHUNK = 1024
-        
-        # 打开音频流
-        self.stream = self.audio.open(
-            format=FORMAT,
-            channels=CHANNELS,
-            rate=RATE,
-            input=True,
-            frames_per_buffer=CHUNK
-        )
-        
-        # 生成唯一的录音文件名
-        timestamp = int(time.time())
-        recording_path = self.recordings_dir / f"recording_{timestamp}.wav"
-        print(f"录音文件将保存至: {recording_path}")
-        
-        # 开始录音
-        self.frames = []
-        
-        try:
-            while self.is_listening:
-                # 读取音频数据
-                data = self.stream.read(CHUNK, exception_on_overflow=False)
-                
-                # 将数据放入队列
-                self.audio_queue.put(data)
-                
-                # 保存数据用于录音文件
-                self.frames.append(data)
-        except Exception as e:
-            print(f"监听麦克风时出错: {e}")
-        finally:
-            # 保存录音文件
-            if self.frames:
-                wf = wave.open(str(recording_path), 'wb')
-                wf.setnchannels(CHANNELS)
-                wf.setsampwidth(self.audio.get_sample_size(FORMAT))
-                wf.setframerate(RATE)
-                wf.writeframes(b''.join(self.frames))
-                wf.close()
-                print(f"录音已保存: {recording_path}")
+    def get_recent_audio(self, seconds=None):
+        """获取最近 seconds 秒的PCM数据（默认为缓冲区中的全部数据）"""
+        nbytes = None if seconds is None else int(seconds * 16000 * 2)
+        return self.capture_buffer.read_latest(nbytes)
+    
+    def _on_audio_chunk(self, data):
+        """在采集线程中调用：保存最近的音频，并交给后台线程写入录音文件"""
+        if data is None:
+            return
+        self.capture_buffer.write(data)
+        self.recording_writer.write(data)
     
     def _recognize_speech(self):
-        """从音频队列中识别语音"""
-        # 设置音频参数
-        FORMAT = pyaudio.paInt16
-        CHANNELS = 1
+        """从采集订阅中取出音频，切分成话语片段后提交给识别工作池"""
         RATE = 16000
+        SAMPLE_WIDTH = 2  # 16-bit
+        window_bytes = int(self.window_seconds * RATE * SAMPLE_WIDTH)
+        overlap_bytes = int(self.overlap_seconds * RATE * SAMPLE_WIDTH)
+        
+        # fixed/overlap 模式下的音频缓冲区
+        buffer = bytearray()
+        self.vad.reset()
+        
+        # 识别工作池，结果按片段顺序回调 _on_recognized
+        self.recognition_pool = OrderedRecognitionPool(
+            self.backend,
+            self._on_recognized,
+            workers=self.workers,
+            executor=self.executor
+        )
         
-        # 创建临时WAV文件用于识别
-        temp_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / "temp"
-        if not temp_dir.exists():
-            temp_dir.mkdir(parents=True)
-        
-        # 上次识别的时间
-        last_recognition_time = time.time()
-        
-        # 音频缓冲区
-        buffer = []
-        
-        while self.is_listening:
+        # 有新音频时立即被唤醒；采集停止（或输入结束）后读完剩余音频即退出循环
+        for audio_data in self.audio_subscription:
             try:
-                # 从队列获取音频数据
-                try:
-                    audio_data = self.audio_queue.get(timeout=0.5)
-                    buffer.append(audio_data)
-                except queue.Empty:
+                if self.segmentation == "vad":
+                    # 在语音边界处得到完整的话语，静音不会产生片段
+                    for segment in self.vad.process(audio_data):
+                        self._recognize_segment(segment, RATE, SAMPLE_WIDTH)
                     continue
                 
-                # 每隔一段时间进行一次识别
-                current_time = time.time()
-                if current_time - last_recognition_time > 2.0:  # 每2秒识别一次
-                    # 如果缓冲区有足够的数据
-                    if buffer:
-                        # 创建临时WAV文件
-                        temp_file = temp_dir / f"temp_{int(time.time())}.wav"
-                        
-                        # 将缓冲区数据写入临时文件
-                        with wave.open(str(temp_file), 'wb') as wf:
-                            wf.setnchannels(CHANNELS)
-                            wf.setsampwidth(2)  # 16-bit
-                            wf.setframerate(RATE)
-                            wf.writeframes(b''.join(buffer))
-                        
-                        # 使用SpeechRecognition识别
-                        try:
-                            with sr.AudioFile(str(temp_file)) as source:
-                                audio = self.recognizer.record(source)
-                                text = self.recognizer.recognize_google(audio, language='zh-CN')
-                                
-                                # 如果识别成功，更新当前文本
-                                if text:
-                                    # 累积识别结果
-                                    if not self.current_text:
-                                        self.current_text = text
-                                    else:
-                                        # 避免重复添加相同的文本
-                                        if text not in self.current_text[-len(text):]:
-                                            self.current_text += " " + text
-                                    
-                                    print(f"识别到: {text}")
-                        except sr.UnknownValueError:
-                            # 无法识别语音
-                            pass
-                        except sr.RequestError as e:
-                            print(f"语音识别服务错误: {e}")
-                        
-                        # 删除临时文件
-                        try:
-                            os.remove(temp_file)
-                        except:
-                            pass
-                        
-                        # 清空缓冲区
-                        buffer = []
-                    
-                    # 更新识别时间
-                    last_recognition_time = current_time
+                # fixed/overlap 模式：按固定时长切分，overlap 模式保留窗口末尾作为下一窗口的开头
+                if self.detector is not None:
+                    # 每块新音频只经过自适应检测器一次（更新噪声底和统计），窗口的语音检查只读取阈值
+                    self.detector.is_speech(audio_data)
+                buffer += audio_data
+                if len(buffer) >= window_bytes:
+                    segment = bytes(buffer)
+                    buffer = buffer[len(buffer) - overlap_bytes:] if overlap_bytes else bytearray()
+                    if self.vad.contains_speech(segment):
+                        self._recognize_segment(segment, RATE, SAMPLE_WIDTH)
+                    else:
+                        self.skipped_silence += 1
             
             except Exception as e:
-                print(f"识别语音时出错: {e}")
\ No newline at end of file
+                print(f"识别语音时出错: {e}")
+        
+        # 停止监听时识别最后一段未结束的话语
+        segment = self.vad.flush() if self.segmentation == "vad" else bytes(buffer)
+        if segment and len(segment) > overlap_bytes and self.vad.contains_speech(segment):
+            self._recognize_segment(segment, RATE, SAMPLE_WIDTH)
+        
+        # 等待在途的片段识别完成
+        self.recognition_pool.close(wait=True)
+    
+    def _recognize_segment(self, segment, rate, sample_width):
+        """提交一个话语片段进行识别（直接在内存中识别，不经过临时WAV文件）"""
+        self.recognizer_calls += 1
+        self.recognition_pool.submit(segment, rate, sample_width)
+    
+    def _on_recognized(self, seq, text):
+        """按片段顺序接收识别结果并累积到当前文本"""
+        if self.detector is not None:
+            self.detector.record_result(text)
+        if self.on_result is not None:
+            self.on_result(seq, text)
+        # 如果识别成功，拼接到当前文本（重叠窗口模式下去掉与已有文本重叠的开头）
+        if text and self.stitcher.add(text):
+            self.current_text = self.stitcher.text
+            print(f"识别到: {text}")
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+WebSocket 流式语音识别服务
+
+客户端连接 ws://<host>:<port>/ws/asr?language=auto&format=int16 后：
+- 以二进制消息发送16kHz单声道PCM（int16 或 float32）
+- 服务端以JSON返回识别结果:
+  {"type": "partial" | "final", "text": ..., "utterance_id": ..., "audio_end": ..., "latency": ...}
+- 发送文本消息 {"type": "end"} 表示音频结束，服务端给出剩余的最终结果后发送 {"type": "done"} 并关闭连接
+
+所有会话共享一个模型，推理请求经 BatchInferenceServer 合并成批；
+每个连接的音频队列有上限，识别跟不上时服务端暂停读取该连接，由TCP把背压传回客户端；
+同时在线的会话数超过 max_sessions 时新连接以 1013 关闭。
+
+示例:
+    python main.py --mode stt --port 8000 --max-sessions 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import numpy as np
+import torch
+import uvicorn
+from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+from STT.batch_inference_server import BatchInferenceServer
+from STT.frontend import load_frontend
+from STT.incremental_frontend import IncrementalFrontend
+from STT.inference_scheduler import InferenceScheduler
+from STT.model_registry import get_model
+from utils.vad import EnergyZcrVAD
+
+SAMPLE_RATE = 16000
+
+
+def control_type(text):
+    """文本控制消息的类型；不是JSON对象的消息返回 None，按无效消息忽略"""
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return None
+    return message.get("type") if isinstance(message, dict) else None
+
+
+class StreamSession:
+    """
+    一个连接的识别状态：增量特征、端点检测和推理调度
+    端点按已接收音频的时长判断（而不是墙钟时间），客户端以任意速度发送音频结果都一致
+    """
+
+    def __init__(self, server, frontend, on_event, language="auto", partial_interval=0.5,
+                 endpoint_silence=0.8, max_utterance=20.0, energy_threshold=300):
+        self.server = server
+        self.language = language
+        self.features = IncrementalFrontend(frontend, max_samples=int(max_utterance * SAMPLE_RATE))
+        self.vad = EnergyZcrVAD(sample_rate=SAMPLE_RATE, energy_threshold=energy_threshold)
+        self.scheduler = InferenceScheduler(self._infer, on_event, partial_interval)
+
+        self.endpoint_samples = int(endpoint_silence * SAMPLE_RATE)
+        self.max_utterance_samples = int(max_utterance * SAMPLE_RATE)
+        self.utterance_id = 0
+        self.received_samples = 0
+        self.in_speech = False
+        self.silence_samples = 0
+        self.utterance_samples = 0
+
+    def _infer(self, feat, feat_len):
+        return self.server.submit(feat, self.language).result()
+
+    def start(self):
+        self.scheduler.start()
+
+    def accept(self, samples):
+        """处理一块 [-1, 1] 范围的float32音频"""
+        self.received_samples += len(samples)
+        self.features.accept_waveform(samples)
+        self.utterance_samples += len(samples)
+
+        if self.vad.contains_speech(samples):
+            self.in_speech = True
+            self.silence_samples = 0
+            if self.utterance_samples >= self.max_utterance_samples:
+                # 话语过长时强制结束，保证特征缓冲区覆盖整段话语
+                self._submit(final=True)
+            elif self.scheduler.partial_due():
+                self._submit(final=False)
+            return
+
+        self.silence_samples += len(samples)
+        if self.in_speech:
+            if self.silence_samples >= self.endpoint_samples:
+                self._submit(final=True)
+        elif self.silence_samples >= self.endpoint_samples:
+            # 话语开始前的静音只保留最近一小段，避免最终推理时计算大量静音帧
+            self.features.reset()
+            self.utterance_samples = 0
+            self.silence_samples = 0
+
+    def finish(self):
+        """音频结束：提交未结束话语的最终推理，等待已提交的最终结果全部返回"""
+        if self.in_speech:
+            self._submit(final=True)
+        self.scheduler.stop()
+
+    def _submit(self, final):
+        feat, feat_len = self.features.get_features()
+        audio_end = self.received_samples / SAMPLE_RATE
+        if feat_len:
+            # 特征缓冲区会被后续音频覆盖，提交前需要复制
+            feat = torch.from_numpy(feat.copy()).unsqueeze(0)
+            if final:
+                self.scheduler.submit_final(feat, feat_len, self.utterance_id, audio_end)
+            else:
+                self.scheduler.submit_partial(feat, feat_len, self.utterance_id, audio_end)
+        if final:
+            self.utterance_id += 1
+            self.in_speech = False
+            self.silence_samples = 0
+            self.utterance_samples = 0
+            self.features.reset()
+
+
+class PcmDecoder:
+    """
+    将二进制消息转换为float32样本
+    客户端按任意字节数分帧发送时，消息长度不一定是样本宽度的整数倍，
+    不足一个样本的字节留到下一条消息再拼接
+    """
+
+    def __init__(self, sample_format):
+        self.dtype = np.float32 if sample_format == "float32" else np.int16
+        self.width = np.dtype(self.dtype).itemsize
+        self._pending = b""
+
+    def decode(self, data):
+        if self._pending:
+            data = self._pending + data
+        usable = len(data) - len(data) % self.width
+        self._pending = data[usable:]
+        samples = np.frombuffer(data, dtype=self.dtype, count=usable // self.width)
+        if self.dtype == np.float32:
+            return samples
+        return samples.astype(np.float32) / 32768
+
+
+def create_app(model_dir="iic/SenseVoiceSmall", device=None, backend=None, max_sessions=16,
+               max_batch_size=16, max_wait=0.02, max_queue_chunks=50, partial_interval=0.5,
+               endpoint_silence=0.8, energy_threshold=300):
+    """创建识别服务；模型在服务启动时加载一次，所有连接共享"""
+    state = {"active_sessions": 0, "rejected_sessions": 0}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        model, kwargs = get_model(model_dir, device=device, backend=backend)
+        state["server"] = BatchInferenceServer(model, kwargs, max_batch_size=max_batch_size,
+                                               max_wait=max_wait).start()
+        state["frontend"] = load_frontend(kwargs["model_path"], fs=SAMPLE_RATE)
+        state["sessions"] = asyncio.Semaphore(max_sessions)
+        yield
+        state["server"].stop()
+
+    app = FastAPI(title="SenseVoice 流式识别服务", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        server = state["server"]
+        return {
+            "active_sessions": state["active_sessions"],
+            "max_sessions": max_sessions,
+            "rejected_sessions": state["rejected_sessions"],
+            "batches": server.batches,
+            "mean_batch_size": server.mean_batch_size,
+        }
+
+    @app.websocket("/ws/asr")
+    async def asr(websocket: WebSocket, language: str = "auto", sample_format: str = Query("int16", alias="format")):
+        await websocket.accept()
+        sessions = state["sessions"]
+        if sessions.locked():
+            state["rejected_sessions"] += 1
+            await websocket.send_json({"type": "error", "message": "在线会话数已达上限，请稍后重试"})
+            await websocket.close(code=1013)
+            return
+        if sample_format not in ("int16", "float32"):
+            await websocket.send_json({"type": "error", "message": f"不支持的音频格式: {sample_format}"})
+            await websocket.close(code=1003)
+            return
+
+        async with sessions:
+            state["active_sessions"] += 1
+            try:
+                await _serve(websocket, language, sample_format)
+            finally:
+                state["active_sessions"] -= 1
+
+    async def _serve(websocket, language, sample_format):
+        loop = asyncio.get_running_loop()
+        audio = asyncio.Queue(maxsize=max_queue_chunks)
+        events = asyncio.Queue()
+        session = StreamSession(
+            state["server"], state["frontend"],
+            on_event=lambda event: loop.call_soon_threadsafe(events.put_nowait, event),
+            language=language, partial_interval=partial_interval,
+            endpoint_silence=endpoint_silence, energy_threshold=energy_threshold
+        )
+        session.start()
+
+        async def receive():
+            try:
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        break
+                    if message.get("bytes"):
+                        # 队列满时在这里等待，不再读取socket，背压经TCP传回客户端
+                        await audio.put(message["bytes"])
+                    elif message.get("text") and control_type(message["text"]) == "end":
+                        break
+            finally:
+                await audio.put(None)
+
+        async def process():
+            decoder = PcmDecoder(sample_format)
+            while True:
+                data = await audio.get()
+                if data is None:
+                    break
+                samples = decoder.decode(data)
+                if len(samples):
+                    # fbank 和 LFR 在线程中计算，不阻塞其他连接
+                    await asyncio.to_thread(session.accept, samples)
+            # 等待最终结果在线程中完成，期间不阻塞事件循环
+            await asyncio.to_thread(session.finish)
+            events.put_nowait(None)
+
+        async def send():
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                await websocket.send_json({
+                    "type": event.kind,
+                    "text": event.text,
+                    "utterance_id": event.utterance_id,
+                    "audio_end": event.audio_end,
+                    "latency": round(event.latency, 4),
+                })
+            await websocket.send_json({"type": "done"})
+            await websocket.close()
+
+        tasks = [asyncio.create_task(coro) for coro in (receive(), process(), send())]
+        try:
+            await asyncio.gather(*tasks)
+        except (WebSocketDisconnect, RuntimeError):
+            # 客户端提前断开，丢弃剩余结果
+            pass
+        finally:
+            # 无论以何种方式结束都停止会话的调度线程，不留下后台线程
+            for task in tasks:
+                task.cancel()
+            session.scheduler.stop(timeout=0)
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WebSocket 流式语音识别服务')
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-sessions', type=int, default=16, help='同时在线的会话数上限')
+    parser.add_argument('--max-batch-size', type=int, default=16, help='合并推理的最大批大小')
+    parser.add_argument('--max-wait', type=float, default=0.02, help='凑批的最长等待时间(秒)')
+    parser.add_argument('--max-queue-chunks', type=int, default=50, help='每个连接缓存的音频消息数上限')
+    parser.add_argument('--partial-interval', type=float, default=0.5, help='中间结果的最小间隔(秒)')
+    parser.add_argument('--endpoint-silence', type=float, default=0.8, help='判定一句话结束的静音时长(秒)')
+    parser.add_argument('--model-dir', default="iic/SenseVoiceSmall")
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--backend', choices=['torch', 'onnx'], default=None)
+    args = parser.parse_args(argv)
+
+    app = create_app(model_dir=args.model_dir, device=args.device, backend=args.backend,
+                     max_sessions=args.max_sessions, max_batch_size=args.max_batch_size,
+                     max_wait=args.max_wait, max_queue_chunks=args.max_queue_chunks,
+                     partial_interval=args.partial_interval, endpoint_silence=args.endpoint_silence)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
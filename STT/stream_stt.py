@@ -6,15 +6,21 @@ import os
 import time
 import numpy as np
 import torch
-import pyaudio
 import threading
 import queue
-import wave
 from pathlib import Path
-from model import SenseVoiceSmall
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 from utils.stream_processor import StreamProcessor
 from utils.frontend import WavFrontend
+from STT.hypothesis_stabilizer import HypothesisStabilizer
+from STT.incremental_frontend import IncrementalFrontend
+from STT.inference_scheduler import InferenceScheduler
+from STT.model_registry import get_model
+from utils.audio_capture import AudioCapture
+from utils.denoise import SpectralGateDenoiser
+from utils.recording_writer import create_recording_writer
+from utils.ring_buffer import FloatRingBuffer
+from utils.vad import AdaptiveEnergyDetector
 
 class StreamingSTT:
     """流式语音识别类"""
@@ -29,16 +35,30 @@ class StreamingSTT:
         energy_threshold=300,  # 语音检测阈值
         silence_timeout=2.0,  # 静音超时时间(秒)
         language="auto",  # 语言选择
+        partial_interval=0.5,  # 中间结果的最小间隔(秒)
+        inference_server=None,  # 共享的 BatchInferenceServer，多个会话共用一个模型
+        backend=None,  # 推理后端: torch 或 onnx（int8量化），默认读取 SENSEVOICE_BACKEND
+        intra_op_threads=None,  # ONNX Runtime 算子内线程数
+        inter_op_threads=1,  # ONNX Runtime 算子间线程数
+        recording_format="wav",  # 录音格式: wav 或 flac（无损压缩）
+        ring_seconds=5.0,  # 采集环形缓冲区的容量(秒)
+        audio_input=None,  # 输入设备（utils.audio_capture 的 FileInput/SyntheticInput 等），默认使用麦克风
+        adaptive_threshold=True,  # 语音检测阈值跟随噪声底变化，energy_threshold 仅用于统计对比
+        denoise=False,  # 在特征提取前做频谱门限降噪
+        speech_gate=0.5,  # 降噪器估计的语音概率低于该值时不视为语音，不触发推理
+        max_utterance=20.0,  # 单句话语的最长时长(秒)，超过时强制结束，特征缓存覆盖整段话语
     ):
-        # 设置设备
-        if device is None:
-            device = os.getenv("SENSEVOICE_DEVICE", "cuda:0" if torch.cuda.is_available() else "cpu")
-        
-        print(f"正在加载模型，使用设备: {device}...")
-        # 加载模型
-        self.model, self.kwargs = SenseVoiceSmall.from_pretrained(model=model_dir, device=device)
-        self.model.eval()
-        print("模型加载完成")
+        self.inference_server = inference_server
+        backend = backend or os.getenv("SENSEVOICE_BACKEND", "torch")
+        if inference_server is not None:
+            # 使用共享推理服务中的模型，不再单独加载
+            self.model, self.kwargs = inference_server.model, inference_server.kwargs
+        elif backend == "onnx":
+            # 从进程级注册表获取共享模型，同一进程内只加载和预热一次
+            self.model, self.kwargs = get_model(model_dir, backend="onnx", quantize=True,
+                                                intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads)
+        else:
+            self.model, self.kwargs = get_model(model_dir, device=device, backend="torch")
         
         # 创建前端处理器
         self.frontend = WavFrontend(
@@ -54,11 +74,23 @@ class StreamingSTT:
             buffer_size=buffer_size
         )
         
+        # 增量特征提取：每块音频只计算新增的特征帧；话语开始前的静音定期丢弃，
+        # 缓存保留整段话语（最长 max_utterance 秒）的特征，最终推理解码的是整句话而不是结尾的静音
+        self.feature_cache = IncrementalFrontend(self.frontend, max_samples=int(max_utterance * sample_rate))
+        self.max_utterance_samples = int(max_utterance * sample_rate)
+        self.preroll_samples = buffer_size  # 话语开始前最多保留的静音
+        self.utterance_samples = 0  # 特征缓存中的样本数
+        
         # 设置参数
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
         self.energy_threshold = energy_threshold
+        self.detector = AdaptiveEnergyDetector(sample_rate=sample_rate) if adaptive_threshold else None
+        self.denoiser = SpectralGateDenoiser(sample_rate=sample_rate) if denoise else None
+        self.speech_gate = speech_gate
+        self.gated_chunks = 0  # 能量判为语音、但语音概率过低而跳过的音频块数
         self.silence_timeout = silence_timeout
+        self.silence_timeout_samples = int(silence_timeout * sample_rate)
         self.language = language
         
         # 状态变量
@@ -67,12 +99,30 @@ class StreamingSTT:
         self.current_text = ""
         self.is_speaking = False
         
-        # 创建音频队列
-        self.audio_queue = queue.Queue()
+        # 回调模式的音频采集引擎，采集线程直接把音频写入环形缓冲区
+        self.capture = AudioCapture(audio_input, sample_rate=sample_rate, chunk_size=chunk_size, dtype="float32")
+        self.capture.add_callback(self._on_audio_chunk)
+        self.input_ended = False
         
-        # 创建结果队列
+        # 采集线程与处理线程之间的预分配环形缓冲区，处理线程直接读取缓冲区视图，不复制音频块
+        self.audio_ring = FloatRingBuffer(int(ring_seconds * sample_rate), block_size=chunk_size)
+        self.overwritten_chunks = 0  # 处理过程中被采集线程覆盖的音频块数
+        
+        # 创建结果队列，元素为 TranscriptEvent（中间结果/最终结果）
         self.result_queue = queue.Queue()
         
+        # 推理调度器：限制中间结果的推理频率，端点处立即做最终推理
+        self.scheduler = InferenceScheduler(self._run_inference, self._on_transcript, partial_interval)
+        self.utterance_id = 0
+        # 跟踪当前话语的中间结果，为每个事件标出已稳定和仍可能变化的部分
+        self.stabilizer = HypothesisStabilizer()
+        self._stabilizer_utterance = None
+        self.processed_samples = 0  # 本次监听已处理的样本数，用于标记结果对应的音频位置
+        
+        # 录音由后台线程写入，采集线程只负责读取麦克风
+        self.recording_format = recording_format
+        self.recording_writer = None
+        
         # 创建录音目录
         self.recordings_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / "recordings"
         if not self.recordings_dir.exists():
@@ -86,17 +136,36 @@ class StreamingSTT:
             return
         
         self.is_listening = True
+        self.input_ended = False
+        self.processed_samples = 0
+        self.utterance_samples = 0
         self.current_text = ""
+        self.gated_chunks = 0
+        self.overwritten_chunks = 0
+        if self.denoiser is not None:
+            self.denoiser.reset()
+        self.stabilizer.reset()
+        self._stabilizer_utterance = None
+        
+        # 创建录音文件，写入和格式转换都在后台线程中完成
+        timestamp = int(time.time())
+        self.recording_writer = create_recording_writer(
+            self.recordings_dir / f"recording_{timestamp}",
+            format=self.recording_format,
+            sample_rate=self.sample_rate
+        ).start()
+        print(f"录音文件将保存至: {self.recording_writer.path}")
+        
+        # 启动推理调度线程
+        self.scheduler.start()
         
         # 启动音频处理线程
         self.processing_thread = threading.Thread(target=self._process_audio_stream)
         self.processing_thread.daemon = True
         self.processing_thread.start()
         
-        # 启动麦克风监听线程
-        self.listening_thread = threading.Thread(target=self._listen_microphone)
-        self.listening_thread.daemon = True
-        self.listening_thread.start()
+        # 启动采集，音频块由采集引擎的回调推送
+        self.capture.start()
         
         print("开始监听麦克风输入...")
     
@@ -107,68 +176,61 @@ class StreamingSTT:
         
         self.is_listening = False
         
-        # 等待线程结束
-        if hasattr(self, 'listening_thread') and self.listening_thread.is_alive():
-            self.listening_thread.join(timeout=1)
+        # 停止采集，并立即唤醒等待数据的处理线程
+        self.capture.stop()
+        self.audio_ring.notify()
         
         if hasattr(self, 'processing_thread') and self.processing_thread.is_alive():
             self.processing_thread.join(timeout=1)
         
+        # 写完剩余数据并关闭录音文件
+        self.recording_writer.close()
+        print(f"录音已保存: {self.recording_writer.path}")
+        
+        # 等待已提交的最终推理完成后停止调度线程
+        self.scheduler.stop(timeout=5)
+        
         # 重置处理器状态
         self.stream_processor.reset()
+        self._reset_features()
+        self.audio_ring.reset()
         print("已停止监听")
     
-    def _listen_microphone(self):
-        """监听麦克风并将音频数据添加到队列"""
-        # 初始化PyAudio
-        p = pyaudio.PyAudio()
+    def _on_audio_chunk(self, data):
+        """在采集线程中调用：把音频块写入环形缓冲区和录音文件"""
+        if data is None:
+            # 输入结束（例如文件读完），唤醒处理线程处理剩余音频
+            self.input_ended = True
+            self.audio_ring.notify()
+            return
         
-        # 打开音频流
-        stream = p.open(
-            format=pyaudio.paFloat32,
-            channels=1,
-            rate=self.sample_rate,
-            input=True,
-            frames_per_buffer=self.chunk_size
-        )
+        # 零拷贝地把采集到的字节视为float32数组
+        audio_data = np.frombuffer(data, dtype=np.float32)
         
-        # 创建录音文件
-        timestamp = int(time.time())
-        recording_path = self.recordings_dir / f"recording_{timestamp}.wav"
-        wf = wave.open(str(recording_path), 'wb')
-        wf.setnchannels(1)
-        wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(self.sample_rate)
+        # 复制进环形缓冲区（整条链路上唯一的一次复制）
+        self.audio_ring.write(audio_data)
         
-        print(f"录音文件将保存至: {recording_path}")
-        
-        try:
-            while self.is_listening:
-                # 读取音频数据
-                data = stream.read(self.chunk_size, exception_on_overflow=False)
-                
-                # 转换为numpy数组
-                audio_data = np.frombuffer(data, dtype=np.float32)
-                
-                # 添加到队列
-                self.audio_queue.put(audio_data)
-                
-                # 保存到WAV文件 (需要转换为int16格式)
-                wf.writeframes((audio_data * 32767).astype(np.int16).tobytes())
-                
-        finally:
-            # 关闭流和PyAudio
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-            
-            # 关闭录音文件
-            wf.close()
-            print(f"录音已保存: {recording_path}")
+        # 同一个只读视图交给后台线程写入录音文件
+        self.recording_writer.write(audio_data)
+    
+    def get_recording_stats(self):
+        """获取录音统计：输入溢出次数、环形缓冲区的溢出样本数和被覆盖的音频块数、写入积压和丢弃的音频块数"""
+        stats = {"input_overflows": self.capture.input_overflows, "ring_overruns": self.audio_ring.overruns,
+                 "overwritten_chunks": self.overwritten_chunks}
+        if self.recording_writer is not None:
+            stats.update(self.recording_writer.stats())
+        return stats
+    
+    def get_detection_stats(self):
+        """语音检测统计：噪声底、阈值、与固定阈值相比少触发的音频块数和误触发率，以及降噪器跳过的音频块数"""
+        stats = self.detector.stats() if self.detector is not None else {}
+        if self.denoiser is not None:
+            stats.update({"gated_chunks": self.gated_chunks, "denoise": self.denoiser.stats()})
+        return stats
     
     def get_feature_for_model(self):
-        """获取用于模型的特征"""
-        feat, feat_len = self.stream_processor.process_buffer()
+        """获取用于模型的特征（由增量特征缓存提供，不再重新计算整个缓冲区）"""
+        feat, feat_len = self.feature_cache.get_features()
         
         # 转换为torch张量
         if feat.size > 0:
@@ -178,80 +240,163 @@ class StreamingSTT:
         else:
             return torch.tensor([]), torch.tensor([])
     
+    def _run_inference(self, feat, feat_len):
+        """对一段特征做一次完整推理，返回后处理后的文本"""
+        if self.inference_server is not None:
+            # 交给共享推理服务，与其他会话的请求合并成一批
+            return self.inference_server.submit(feat, self.language).result()
+        
+        with torch.no_grad():
+            result = self.model.inference(
+                data_in=feat,
+                data_len=feat_len,
+                language=self.language,
+                use_itn=False,
+                ban_emo_unk=False,
+                **self.kwargs
+            )
+        if result and len(result[0]) > 0:
+            return rich_transcription_postprocess(result[0][0]["text"])
+        return ""
+    
+    def _on_transcript(self, event):
+        """接收调度器产生的识别结果事件"""
+        if event.utterance_id != self._stabilizer_utterance:
+            self.stabilizer.reset()
+            self._stabilizer_utterance = event.utterance_id
+        if event.is_final:
+            stable = self.stabilizer.stable
+            event.committed = self.stabilizer.finalize(event.text or None)
+            if not event.text or len(event.text) < len(stable):
+                # 最终结果为空或比已提交的部分还短，以中间结果为准
+                event.text = stable + event.committed
+            if self.detector is not None:
+                self.detector.record_result(event.text)
+            if event.text:
+                self.current_text = event.text
+                print(f"最终识别结果: {event.text}")
+            self.result_queue.put(event)
+            return
+        update = self.stabilizer.update(event.text)
+        event.committed, event.unstable = update.committed, update.unstable
+        # 文本相同但有新内容稳定下来时也需要通知下游
+        if event.text and (event.text != self.current_text or event.committed):
+            self.current_text = event.text
+            self.result_queue.put(event)
+            print(f"识别结果: {update.stable}[{update.unstable}]")
+    
+    def _submit_inference(self, final):
+        """复制当前特征并提交推理请求"""
+        feat, feat_len = self.get_feature_for_model()
+        if feat.size(0) == 0:
+            return
+        # 特征缓存会被后续音频覆盖，提交前需要复制
+        feat = feat.clone()
+        audio_end = self.processed_samples / self.sample_rate
+        if final:
+            self.scheduler.submit_final(feat, feat_len, self.utterance_id, audio_end)
+        else:
+            self.scheduler.submit_partial(feat, feat_len, self.utterance_id, audio_end)
+    
+    def _reset_features(self):
+        """丢弃特征缓存，开始新的话语"""
+        self.feature_cache.reset()
+        self.utterance_samples = 0
+    
     def _process_audio_stream(self):
-        """处理音频流并进行识别"""
-        silence_start_time = None
+        """
+        处理音频流，按节奏提交中间结果推理，端点处提交最终推理
+        端点按静音的音频时长判断（而不是墙钟时间），以任意速度回放文件时分句结果都一致
+        """
+        silence_samples = 0
         is_speech_detected = False
         
         while self.is_listening:
             try:
-                # 从队列获取音频数据
-                audio_data = self.audio_queue.get(timeout=0.5)
+                # 等待采集线程写满一块数据；停止监听或输入结束时会被立即唤醒
+                if not self.audio_ring.wait(self.chunk_size, timeout=0.5):
+                    if self.input_ended:
+                        break
+                    continue
                 
-                # 添加到处理器缓冲区
-                self.stream_processor.add_chunk(audio_data)
+                # 直接读取环形缓冲区中的视图；容量是 chunk_size 的整数倍，视图不会跨越末尾
+                first, second = self.audio_ring.peek(self.chunk_size)
+                audio_data = first if len(second) == 0 else np.concatenate((first, second))
+                
+                # 添加到处理器缓冲区，并增量计算这一块音频的特征；处理完成后才释放这段缓冲区
+                raw_samples = len(audio_data)
+                try:
+                    if self.denoiser is not None:
+                        # 降噪输出为新数组，比输入延迟 hop_length 个样本
+                        audio_data = self.denoiser.process(audio_data)
+                    self.stream_processor.add_chunk(audio_data)
+                    self.feature_cache.accept_waveform(audio_data)
+                    
+                    # 检测是否有语音
+                    speech = self.stream_processor.is_speech_detected(self.energy_threshold)
+                    if self.detector is not None:
+                        # 自适应阈值的判决，固定阈值的判决只用于统计少触发的推理
+                        speech = self.detector.is_speech(audio_data, fixed=speech)
+                    if speech and self.denoiser is not None and not self.denoiser.is_speech(self.speech_gate):
+                        # 风扇、人声嘈杂等噪声能通过能量判决，但语音频带的信噪比很低，不值得做一次推理
+                        speech = False
+                        self.gated_chunks += 1
+                finally:
+                    if self.audio_ring.overwritten():
+                        # 处理跟不上采集，这一块在读取过程中可能已被新音频覆盖
+                        self.overwritten_chunks += 1
+                    self.audio_ring.advance(raw_samples)
+                    self.processed_samples += raw_samples
+                    self.utterance_samples += raw_samples
                 
-                # 检测是否有语音
-                if self.stream_processor.is_speech_detected(self.energy_threshold):
+                if speech:
                     # 有语音，更新时间戳
                     self.last_speech_time = time.time()
-                    silence_start_time = None
+                    silence_samples = 0
                     
                     if not is_speech_detected:
                         print("检测到语音...")
                         is_speech_detected = True
                     
-                    # 获取特征并进行识别
-                    feat, feat_len = self.get_feature_for_model()
-                    
-                    if feat.size(0) > 0:
-                        # 进行识别
-                        with torch.no_grad():
-                            result = self.model.inference(
-                                data_in=feat,
-                                data_len=feat_len,
-                                language=self.language,
-                                use_itn=False,
-                                ban_emo_unk=False,
-                                **self.kwargs
-                            )
-                            
-                            if result and len(result[0]) > 0:
-                                text = rich_transcription_postprocess(result[0][0]["text"])
-                                if text and text != self.current_text:
-                                    self.current_text = text
-                                    self.result_queue.put(text)
-                                    print(f"识别结果: {text}")
+                    if self.utterance_samples >= self.max_utterance_samples:
+                        # 话语过长时强制结束，保证特征缓存覆盖整段话语
+                        self._submit_inference(final=True)
+                        self.utterance_id += 1
+                        self._reset_features()
+                    # 按 partial_interval 的节奏请求中间结果
+                    elif self.scheduler.partial_due():
+                        self._submit_inference(final=False)
                 
                 else:
                     # 没有语音，检查是否超时
                     if is_speech_detected:
-                        if silence_start_time is None:
-                            silence_start_time = time.time()
-                        elif time.time() - silence_start_time > self.silence_timeout:
+                        silence_samples += raw_samples
+                        if silence_samples > self.silence_timeout_samples:
                             print("检测到静音，结束当前识别")
                             is_speech_detected = False
+                            silence_samples = 0
                             
-                            # 最终识别结果
-                            if self.current_text:
-                                print(f"最终识别结果: {self.current_text}")
-                                # 重置当前文本
-                                self.current_text = ""
+                            # 端点处立即对整段话语做最终推理
+                            self._submit_inference(final=True)
+                            self.utterance_id += 1
                             
                             # 重置处理器状态，准备下一次识别
                             self.stream_processor.reset()
+                            self._reset_features()
+                    elif self.utterance_samples >= self.preroll_samples:
+                        # 话语开始前的静音只保留最近一小段，避免推理时计算大量静音帧
+                        self._reset_features()
                 
-                # 标记任务完成
-                self.audio_queue.task_done()
-                
-            except queue.Empty:
-                # 队列为空，继续等待
-                continue
             except Exception as e:
                 print(f"处理音频时出错: {e}")
+        
+        # 停止监听时，未结束的话语也给出最终结果
+        if is_speech_detected:
+            self._submit_inference(final=True)
+            self.utterance_id += 1
     
     def get_result(self, timeout=None):
-        """获取识别结果"""
+        """获取识别结果事件（TranscriptEvent），可通过 event.is_final 区分中间结果和最终结果"""
         try:
             return self.result_queue.get(timeout=timeout)
         except queue.Empty:
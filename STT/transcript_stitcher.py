@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+# 重叠窗口识别结果的拼接
+
+
+def edit_distance(a, b):
+    """计算两个字符串的编辑距离（Levenshtein）"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,              # 删除
+                current[j - 1] + 1,           # 插入
+                previous[j - 1] + (ca != cb)  # 替换
+            ))
+        previous = current
+    return previous[-1]
+
+
+def find_overlap(previous, new, max_overlap=30, min_overlap=2, max_error_ratio=0.25):
+    """
+    查找 previous 的结尾与 new 的开头之间最长的近似重叠
+    重叠部分允许少量识别差异（编辑距离不超过重叠长度的 max_error_ratio）
+    返回 new 中非重叠部分的起始下标，没有重叠时返回0
+    """
+    longest = min(len(previous), len(new) + 1, max_overlap)
+    for k in range(longest, min_overlap - 1, -1):
+        suffix = previous[-k:]
+        allowed = int(k * max_error_ratio)
+        best = None
+        # 两次识别在窗口边缘可能多出或缺少一个字，前缀长度允许相差1
+        for j in (k, k - 1, k + 1):
+            if j < min_overlap or j > len(new):
+                continue
+            distance = edit_distance(suffix, new[:j])
+            if distance <= allowed and (best is None or distance < best[0]):
+                best = (distance, j)
+        if best is not None:
+            return best[1]
+    return 0
+
+
+class TranscriptStitcher:
+    """
+    将连续窗口的识别结果拼接为完整文本
+    max_overlap 为0时直接追加（窗口之间没有重叠），
+    否则去掉新结果中与已有文本重叠的开头部分
+    """
+
+    def __init__(self, max_overlap=30, separator=" ", min_overlap=2, max_error_ratio=0.25):
+        self.max_overlap = max_overlap
+        self.separator = separator
+        self.min_overlap = min_overlap
+        self.max_error_ratio = max_error_ratio
+        self.text = ""
+
+    def add(self, hypothesis):
+        """加入一个新窗口的识别结果，返回实际追加到文本中的部分"""
+        hypothesis = hypothesis.strip()
+        if not hypothesis:
+            return ""
+        if not self.text:
+            self.text = hypothesis
+            return hypothesis
+
+        start = 0
+        if self.max_overlap:
+            start = find_overlap(self.text, hypothesis, self.max_overlap, self.min_overlap, self.max_error_ratio)
+        tail = hypothesis[start:].strip()
+        if not tail:
+            return ""
+        # 有重叠时新文本是已有文本的直接延续，不需要分隔符
+        appended = tail if start else self.separator + tail
+        self.text += appended
+        return appended
+
+    def reset(self):
+        self.text = ""
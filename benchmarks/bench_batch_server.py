@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+BatchInferenceServer 吞吐量基准测试
+
+每个模拟会话按 --interval 的节奏提交约2秒音频对应的特征，
+依次扫描不同的会话数，对比 max_batch_size=1（逐条推理）与批量推理的吞吐量和延迟。
+
+示例:
+    python benchmarks/bench_batch_server.py --sessions 1 2 4 8 16 --duration 10
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import torch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "STT", "SenseVoice"))
+from STT.batch_inference_server import BatchInferenceServer
+from STT.model_registry import get_model
+
+
+def session_worker(server, frames, dim, interval, deadline, latencies, errors):
+    """模拟一个会话：定时提交特征并记录每次请求的延迟"""
+    rng = np.random.default_rng()
+    while time.time() < deadline:
+        feat = torch.from_numpy(rng.standard_normal((frames, dim)).astype(np.float32))
+        start = time.time()
+        try:
+            server.submit(feat).result()
+            latencies.append(time.time() - start)
+        except Exception:
+            errors.append(1)
+        time.sleep(max(0.0, interval - (time.time() - start)))
+
+
+def run(model, kwargs, sessions, max_batch_size, args):
+    server = BatchInferenceServer(model, kwargs, max_batch_size=max_batch_size, max_wait=args.max_wait).start()
+    latencies, errors = [], []
+    deadline = time.time() + args.duration
+    threads = [
+        threading.Thread(target=session_worker, args=(server, args.frames, args.dim, args.interval, deadline, latencies, errors))
+        for _ in range(sessions)
+    ]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    server.stop()
+
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "sessions": sessions,
+        "max_batch_size": max_batch_size,
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "mean_batch": server.mean_batch_size,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量推理服务吞吐量基准测试')
+    parser.add_argument('--model-dir', default="iic/SenseVoiceSmall")
+    parser.add_argument('--device', default=os.getenv("SENSEVOICE_DEVICE", "cpu"))
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--max-batch-size', type=int, default=16)
+    parser.add_argument('--max-wait', type=float, default=0.02, help='凑批的最长等待时间(秒)')
+    parser.add_argument('--interval', type=float, default=0.5, help='每个会话的请求间隔(秒)')
+    parser.add_argument('--duration', type=float, default=10.0, help='每组测试的时长(秒)')
+    parser.add_argument('--frames', type=int, default=34, help='每条请求的特征帧数（34帧约为2秒音频）')
+    parser.add_argument('--dim', type=int, default=560)
+    args = parser.parse_args()
+
+    model, kwargs = get_model(args.model_dir, device=args.device, backend="torch")
+
+    print(f"{'会话数':>6} {'批大小上限':>10} {'请求/秒':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'平均批':>8} {'错误':>6}")
+    for sessions in args.sessions:
+        for max_batch_size in (1, args.max_batch_size):
+            r = run(model, kwargs, sessions, max_batch_size, args)
+            print(f"{r['sessions']:>6} {r['max_batch_size']:>10} {r['requests_per_sec']:>10.1f} "
+                  f"{r['p50_ms']:>10.1f} {r['p95_ms']:>10.1f} {r['mean_batch']:>8.2f} {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+采集链路的内存分配基准测试
+
+模拟 StreamingSTT 从 PyAudio 到特征前端的每块音频处理，用 tracemalloc 统计每秒音频产生的新分配：
+- queue: 旧链路，np.frombuffer -> queue.Queue -> 缩放后送入前端，录音端 astype(int16) 转换
+- ring:  新链路，np.frombuffer -> FloatRingBuffer 视图 -> 预分配缓冲区缩放，录音端复用转换缓冲区
+PyAudio 每次 read() 返回的 bytes 两条链路都一样，不计入统计。
+
+示例:
+    python benchmarks/bench_capture_alloc.py --seconds 30
+"""
+
+import argparse
+import os
+import queue
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from utils.recording_writer import BackgroundRecordingWriter, to_pcm16
+from utils.ring_buffer import FloatRingBuffer
+
+
+def make_chunks(seconds, sample_rate, chunk_size):
+    """预先生成模拟 PyAudio 返回的 float32 字节块"""
+    rng = np.random.default_rng(0)
+    n = int(seconds * sample_rate / chunk_size)
+    return [(rng.standard_normal(chunk_size) * 0.1).astype(np.float32).tobytes() for _ in range(n)]
+
+
+def measure(step, chunks):
+    """逐块执行 step，返回 (累计分配字节数, 耗时秒)；每块取 tracemalloc 峰值减去基线"""
+    allocated = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for data in chunks:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        step(data)
+        allocated += tracemalloc.get_traced_memory()[1] - baseline
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return allocated, elapsed
+
+
+def queue_path(chunk_size):
+    q = queue.Queue()
+
+    def step(data):
+        audio = np.frombuffer(data, dtype=np.float32)
+        q.put(audio)
+        chunk = q.get()
+        scaled = chunk * 32768.0
+        pcm = to_pcm16(audio)
+        return scaled, pcm
+
+    return step
+
+
+def ring_path(chunk_size):
+    ring = FloatRingBuffer(chunk_size * 50, block_size=chunk_size)
+    scratch = np.empty(chunk_size, dtype=np.float32)
+    # 只用转换逻辑，不启动写入线程
+    writer = BackgroundRecordingWriter(os.devnull)
+
+    def step(data):
+        audio = np.frombuffer(data, dtype=np.float32)
+        ring.write(audio)
+        first, _ = ring.peek(chunk_size)
+        np.multiply(first, 32768.0, out=scratch)
+        pcm = writer._convert(audio)
+        ring.advance(len(first))
+        return scratch, pcm
+
+    return step
+
+
+def main():
+    parser = argparse.ArgumentParser(description='采集链路内存分配基准测试')
+    parser.add_argument('--seconds', type=float, default=30.0, help='模拟的音频时长(秒)')
+    parser.add_argument('--sample-rate', type=int, default=16000)
+    parser.add_argument('--chunk-size', type=int, default=1600)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.seconds, args.sample_rate, args.chunk_size)
+    audio_seconds = len(chunks) * args.chunk_size / args.sample_rate
+
+    print(f"{'链路':>6} {'分配(KB/音频秒)':>16} {'每块耗时(us)':>14}")
+    for name, factory in (("queue", queue_path), ("ring", ring_path)):
+        step = factory(args.chunk_size)
+        step(chunks[0])  # 让预分配的缓冲区先就位
+        allocated, elapsed = measure(step, chunks)
+        print(f"{name:>6} {allocated / 1024 / audio_seconds:>16.1f} {elapsed / len(chunks) * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+频谱门限降噪（utils.denoise.SpectralGateDenoiser）对推理次数和识别结果的影响
+
+按 StreamingSTT 的判决逻辑逐块模拟（不加载模型）：能量判决为语音时按 partial_interval
+提交中间结果推理，静音超过 silence_timeout 时提交最终推理；开启降噪时先降噪，
+语音概率低于 --speech-gate 的块不视为语音。对每个WAV文件分别在
+- clean: 原始录音
+- fan:   加入低频为主的稳态噪声（风扇、空调）
+- babble: 加入由其他录音叠加成的人声嘈杂
+三种条件下统计每分钟的推理次数；文件前后补 --pad 秒的静音（加噪后即为纯噪声段）。
+
+加 --model-dir 时用 SenseVoice 转写 clean 条件下判决出的各段话语，
+以不降噪的结果为参照计算降噪后的字错误率，验证干净录音上识别结果不受影响。
+
+示例:
+    python benchmarks/bench_denoise.py speech_files/*.wav --snr 10 5
+    python benchmarks/bench_denoise.py speech_files/*.wav --model-dir iic/SenseVoiceSmall
+"""
+
+import argparse
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from STT.transcript_stitcher import edit_distance
+from utils.denoise import SpectralGateDenoiser
+from utils.vad import AdaptiveEnergyDetector, frame_energy_zcr, to_int16
+
+SAMPLE_RATE = 16000
+CHUNK = 1600
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: 需要16kHz 16-bit WAV")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        if wf.getnchannels() > 1:
+            samples = samples.reshape(-1, wf.getnchannels()).mean(axis=1)
+    return samples.astype(np.float32) / 32768
+
+
+def fan_noise(n, rng):
+    """积分白噪声得到低频为主的噪声，再叠加电机的嗡声"""
+    noise = np.cumsum(rng.standard_normal(n))
+    noise -= np.convolve(noise, np.ones(400) / 400, mode='same')  # 去掉漂移
+    t = np.arange(n) / SAMPLE_RATE
+    hum = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((100, 200, 300), 1))
+    noise = noise / (np.std(noise) + 1e-9) + 0.5 * hum
+    return noise.astype(np.float32)
+
+
+def babble_noise(n, sources, rng, talkers=6):
+    """随机截取多段录音叠加成人声嘈杂"""
+    noise = np.zeros(n, dtype=np.float32)
+    for _ in range(talkers):
+        source = sources[rng.integers(len(sources))]
+        repeated = np.tile(source, n // len(source) + 2)
+        offset = rng.integers(len(source))
+        noise += repeated[offset:offset + n]
+    return noise
+
+
+def add_noise(speech, noise, snr_db):
+    """按语音的RMS把噪声缩放到给定信噪比"""
+    active = speech[np.abs(speech) > 1e-4]
+    speech_rms = np.sqrt(np.mean(active ** 2)) if len(active) else 1e-3
+    noise_rms = np.sqrt(np.mean(noise ** 2)) + 1e-12
+    return np.clip(speech + noise * speech_rms / noise_rms / 10 ** (snr_db / 20), -1, 1).astype(np.float32)
+
+
+def simulate(samples, args, denoise):
+    """
+    逐块模拟 StreamingSTT 的推理触发，返回统计和话语片段
+    时间按音频时长计算，与实际的处理速度无关
+    """
+    detector = AdaptiveEnergyDetector(sample_rate=SAMPLE_RATE)
+    denoiser = SpectralGateDenoiser(sample_rate=SAMPLE_RATE) if denoise else None
+    partial_chunks = int(args.partial_interval * SAMPLE_RATE / CHUNK)
+    silence_chunks = int(args.silence_timeout * SAMPLE_RATE / CHUNK)
+
+    stats = {"partials": 0, "finals": 0, "gated_chunks": 0, "denoise_seconds": 0.0}
+    segments, output = [], []
+    in_speech, start, silence, since_partial = False, 0, 0, partial_chunks
+
+    def end_utterance(index):
+        stats["finals"] += 1
+        segments.append((start, index * CHUNK))
+
+    for index in range(len(samples) // CHUNK):
+        chunk = samples[index * CHUNK:(index + 1) * CHUNK]
+        if denoiser is not None:
+            t = time.perf_counter()
+            chunk = denoiser.process(chunk)
+            stats["denoise_seconds"] += time.perf_counter() - t
+        output.append(chunk)
+
+        energy, _ = frame_energy_zcr(to_int16(chunk), detector.frame_length)
+        speech = detector.is_speech(chunk, fixed=bool(np.any(energy > args.energy_threshold)))
+        if speech and denoiser is not None and not denoiser.is_speech(args.speech_gate):
+            speech = False
+            stats["gated_chunks"] += 1
+
+        if speech:
+            if not in_speech:
+                in_speech, start = True, index * CHUNK
+            silence = 0
+            since_partial += 1
+            if since_partial >= partial_chunks:
+                stats["partials"] += 1
+                since_partial = 0
+        elif in_speech:
+            silence += 1
+            if silence > silence_chunks:
+                end_utterance(index)
+                in_speech, since_partial = False, partial_chunks
+    if in_speech:
+        end_utterance(len(samples) // CHUNK)
+
+    minutes = len(samples) / SAMPLE_RATE / 60
+    stats["inferences_per_minute"] = (stats["partials"] + stats["finals"]) / minutes
+    stats["segments"] = segments
+    stats["audio"] = np.concatenate(output) if output else samples[:0]
+    return stats
+
+
+def transcribe(transcriber, audio, segments):
+    feats = [transcriber.features(to_int16(audio[start:end])) for start, end in segments if end > start]
+    return "".join(transcriber.transcribe_segments(feats)) if feats else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='频谱门限降噪对推理次数和识别结果的影响')
+    parser.add_argument('wavs', nargs='+', help='16kHz 16-bit WAV文件（干净录音）')
+    parser.add_argument('--snr', type=float, nargs='+', default=[10.0], help='加噪的信噪比(dB)')
+    parser.add_argument('--pad', type=float, default=3.0, help='文件前后补充的静音/噪声时长(秒)')
+    parser.add_argument('--energy-threshold', type=float, default=300)
+    parser.add_argument('--speech-gate', type=float, default=0.5)
+    parser.add_argument('--partial-interval', type=float, default=0.5)
+    parser.add_argument('--silence-timeout', type=float, default=2.0)
+    parser.add_argument('--model-dir', default=None, help='提供时转写干净录音，比较降噪前后的识别结果')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    pad = np.zeros(int(args.pad * SAMPLE_RATE), dtype=np.float32)
+    clean = [np.concatenate((pad, read_wav(path), pad)) for path in args.wavs]
+
+    conditions = [("clean", None, clean)]
+    for snr in args.snr:
+        conditions.append((f"fan {snr:g}dB", snr, [add_noise(s, fan_noise(len(s), rng), snr) for s in clean]))
+        conditions.append((f"babble {snr:g}dB", snr, [add_noise(s, babble_noise(len(s), clean, rng), snr)
+                                                       for s in clean]))
+
+    print(f"{'条件':<14} {'推理/分钟(原始)':>16} {'推理/分钟(降噪)':>16} {'减少':>7} {'跳过块数':>8} {'降噪耗时/块':>12}")
+    results = {}
+    for name, _, signals in conditions:
+        plain = [simulate(s, args, denoise=False) for s in signals]
+        denoised = [simulate(s, args, denoise=True) for s in signals]
+        results[name] = (plain, denoised)
+        minutes = sum(len(s) for s in signals) / SAMPLE_RATE / 60
+        before = sum(r["partials"] + r["finals"] for r in plain) / minutes
+        after = sum(r["partials"] + r["finals"] for r in denoised) / minutes
+        chunks = sum(len(s) // CHUNK for s in signals)
+        per_chunk = sum(r["denoise_seconds"] for r in denoised) / max(chunks, 1) * 1e6
+        reduction = (1 - after / before) * 100 if before else 0.0
+        print(f"{name:<14} {before:>16.1f} {after:>16.1f} {reduction:>6.1f}% "
+              f"{sum(r['gated_chunks'] for r in denoised):>8} {per_chunk:>10.0f}us")
+
+    if args.model_dir:
+        from STT.batch_transcribe import SegmentTranscriber
+        transcriber = SegmentTranscriber(model_dir=args.model_dir, device="cpu", backend="torch", language="auto",
+                                         batch_size=8, max_segment=30.0, threads=None)
+        plain, denoised = results["clean"]
+        errors = total = 0
+        print("\n干净录音的识别结果（以不降噪为参照）:")
+        for path, p, d in zip(args.wavs, plain, denoised):
+            reference = transcribe(transcriber, p["audio"], p["segments"])
+            hypothesis = transcribe(transcriber, d["audio"], d["segments"])
+            distance = edit_distance(reference, hypothesis)
+            errors += distance
+            total += len(reference)
+            print(f"  {os.path.basename(path)}: 差异 {distance}/{len(reference)} 字")
+            if distance:
+                print(f"    原始: {reference}\n    降噪: {hypothesis}")
+        print(f"字错误率变化: {errors / max(total, 1):.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+对话和语音模块的导入耗时
+
+每个模块在新的解释器中用 python -X importtime 导入 --repeat 次，取累计耗时的中位数，
+并列出耗时最多的子模块，便于找出拖慢命令行启动的导入。同时检查导入是否有副作用：
+- 导入时不应该有输出（打印密钥、"已加载环境变量"等）
+- 导入时不应该退出进程（缺少API密钥时）
+检查时 ENV_FILE 指向不存在的文件并去掉API密钥相关的环境变量，模拟没有配置的机器。
+
+加 --max-ms 时任何模块超出预算则返回非零退出码，可以放在CI中防止导入耗时回退。
+
+示例:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py deepseekV3_api.chat --repeat 10 --max-ms 150
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "deepseekV3_api.config",
+    "deepseekV3_api.llm_client",
+    "deepseekV3_api.history",
+    "deepseekV3_api.response_cache",
+    "deepseekV3_api.tts_pipeline",
+    "deepseekV3_api.generate_speech",
+    "deepseekV3_api.chat",
+]
+
+
+def clean_env():
+    env = dict(os.environ)
+    for name in ("OPENAI_API_KEY", "DEEPSEEK_API_KEY", "OPENAI_BASE_URL"):
+        env.pop(name, None)
+    env["ENV_FILE"] = os.path.join(ROOT, "nonexistent.env")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 的输出，返回 {模块: (自身耗时us, 累计耗时us)}"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[0].isdigit():
+            continue
+        times[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return times
+
+
+def measure(module, env):
+    """在新的解释器中导入一次，返回 (累计耗时ms, 各子模块耗时, 标准输出, 退出码)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    times = parse_importtime(result.stderr)
+    total = times.get(module, (0, 0))[1] / 1000
+    return total, times, result.stdout, result.returncode, result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对话和语音模块的导入耗时')
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help='要测量的模块')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模块导入的次数')
+    parser.add_argument('--top', type=int, default=5, help='列出耗时最多的子模块个数')
+    parser.add_argument('--max-ms', type=float, default=None, help='导入耗时预算(毫秒)，超出时返回非零退出码')
+    args = parser.parse_args()
+
+    env = clean_env()
+    failed = False
+    print(f"{'模块':<34} {'中位数(ms)':>10} {'最小(ms)':>9}  副作用")
+    for module in args.modules:
+        totals, times, problems = [], {}, []
+        for _ in range(args.repeat):
+            total, times, stdout, code, stderr = measure(module, env)
+            if code != 0:
+                problems.append(f"退出码 {code}")
+                error = stderr.strip().splitlines()
+                if error:
+                    problems.append(error[-1])
+                break
+            if stdout.strip():
+                problems.append(f"导入时有输出: {stdout.strip().splitlines()[0]}")
+            totals.append(total)
+        problems = list(dict.fromkeys(problems))
+
+        median = statistics.median(totals) if totals else float("nan")
+        fastest = min(totals) if totals else float("nan")
+        print(f"{module:<34} {median:>10.1f} {fastest:>9.1f}  {'; '.join(problems) or '无'}")
+
+        # 最后一次导入中自身耗时最多的子模块（不含被测模块本身）
+        slowest = sorted(((own, name) for name, (own, _) in times.items() if name != module), reverse=True)
+        for own, name in slowest[:args.top]:
+            print(f"    {name:<30} {own / 1000:>8.1f}ms")
+
+        if problems or (args.max_ms is not None and not median <= args.max_ms):
+            failed = True
+
+    if args.max_ms is not None:
+        print(f"\n预算 {args.max_ms:g}ms: {'超出或有副作用' if failed else '全部通过'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
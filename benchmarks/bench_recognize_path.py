@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+对比 StreamSTT 的两种识别数据路径：
+- wav: 旧实现，写临时WAV -> sr.AudioFile 读回 -> 删除
+- memory: 新实现，直接由PCM字节构造 AudioData
+
+默认只测量数据准备开销；加 --backend 时同时调用真实识别后端。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import speech_recognition as sr
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from STT.recognizer_backends import create_backend, pcm_to_audio_data
+
+RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+def make_buffer(seconds=2.0):
+    """生成一段合成的16-bit PCM缓冲区"""
+    t = np.arange(int(RATE * seconds)) / RATE
+    samples = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * np.random.randn(t.size)
+    return (samples * 32767).astype(np.int16).tobytes()
+
+
+def via_wav(pcm, temp_dir, recognizer):
+    temp_file = Path(temp_dir) / f"temp_{time.time_ns()}.wav"
+    with wave.open(str(temp_file), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(RATE)
+        wf.writeframes(pcm)
+    with sr.AudioFile(str(temp_file)) as source:
+        audio = recognizer.record(source)
+    os.remove(temp_file)
+    return audio
+
+
+def via_memory(pcm, temp_dir, recognizer):
+    return pcm_to_audio_data(pcm, RATE, SAMPLE_WIDTH)
+
+
+def run(name, prepare, pcm, iterations, backend=None):
+    recognizer = sr.Recognizer()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            audio = prepare(pcm, temp_dir, recognizer)
+            if backend is not None:
+                try:
+                    backend.recognize(audio)
+                except (sr.UnknownValueError, sr.RequestError):
+                    pass
+        elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {elapsed / iterations * 1000:8.3f} ms/次  ({iterations} 次)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='StreamSTT 识别路径基准测试')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=2.0, help='每次识别的音频长度')
+    parser.add_argument('--backend', default=None, help='同时调用的识别后端，如 google / whisper')
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend) if args.backend else None
+    iterations = args.iterations if backend is None else min(args.iterations, 10)
+    pcm = make_buffer(args.seconds)
+
+    wav_time = run("wav", via_wav, pcm, iterations, backend)
+    mem_time = run("memory", via_memory, pcm, iterations, backend)
+    print(f"加速比: {wav_time / mem_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+对比 SenseVoiceSmall 的 torch 后端与 ONNX（fp32 / int8）后端的准确率和延迟
+
+对一组固定的WAV文件，先用 WavFrontend 提取一次特征，再分别交给各个后端推理：
+- 延迟取 --repeat 次推理的中位数
+- 准确率以字错误率(CER)衡量；提供 --refs 时与参考文本比较，否则与 torch 结果比较
+
+示例:
+    python benchmarks/compare_onnx_torch.py recordings/*.wav --threads 4 --output onnx_report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+import torch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "STT", "SenseVoice"))
+from funasr.utils.postprocess_utils import rich_transcription_postprocess
+from STT.onnx_backend import OnnxSenseVoice
+from STT.transcript_stitcher import edit_distance
+
+try:
+    from STT.SenseVoice.model import SenseVoiceSmall
+    from STT.SenseVoice.utils.frontend import WavFrontend
+except ImportError:
+    from model import SenseVoiceSmall
+    from utils.frontend import WavFrontend
+
+
+def read_wav(path):
+    """读取16kHz单声道16-bit WAV，返回[-1, 1]范围的float32数组"""
+    with wave.open(path, 'rb') as wf:
+        if wf.getframerate() != 16000 or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: 需要16kHz单声道16-bit WAV")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768
+
+
+def cer(reference, hypothesis):
+    reference = reference.replace(" ", "")
+    hypothesis = hypothesis.replace(" ", "")
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    return edit_distance(reference, hypothesis) / len(reference)
+
+
+def transcribe(model, kwargs, feat, repeat, language):
+    """返回 (文本, 延迟中位数秒)"""
+    feat_tensor = torch.from_numpy(feat).unsqueeze(0)
+    feat_len = torch.tensor([feat.shape[0]], dtype=torch.int32)
+    call_kwargs = dict(kwargs)
+    call_kwargs.update(data_type="fbank", key=["bench"])
+    timings, text = [], ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with torch.no_grad():
+            result = model.inference(data_in=feat_tensor, data_len=feat_len, language=language,
+                                     use_itn=False, ban_emo_unk=False, **call_kwargs)
+        timings.append(time.perf_counter() - start)
+        text = rich_transcription_postprocess(result[0][0]["text"]) if result and result[0] else ""
+    return text, float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='torch / ONNX 后端准确率与延迟对比')
+    parser.add_argument('wavs', nargs='+', help='固定的WAV测试文件')
+    parser.add_argument('--refs', default=None, help='参考文本JSON文件，格式为 {"文件名": "文本"}')
+    parser.add_argument('--model-dir', default="iic/SenseVoiceSmall")
+    parser.add_argument('--language', default="auto")
+    parser.add_argument('--threads', type=int, default=None, help='ONNX Runtime / torch 的算子内线程数')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=None, help='将结果写入JSON文件')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    refs = {}
+    if args.refs:
+        with open(args.refs, encoding='utf-8') as f:
+            refs = json.load(f)
+
+    torch_model, torch_kwargs = SenseVoiceSmall.from_pretrained(model=args.model_dir, device="cpu")
+    torch_model.eval()
+    backends = {"torch": (torch_model, torch_kwargs)}
+    for name, quantize in (("onnx_fp32", False), ("onnx_int8", True)):
+        model = OnnxSenseVoice(torch_kwargs["model_path"], quantize=quantize, intra_op_threads=args.threads)
+        backends[name] = (model, model.kwargs)
+
+    frontend = WavFrontend(cmvn_file=f"{torch_kwargs['model_path']}/am.mvn", fs=16000)
+
+    rows = []
+    for path in args.wavs:
+        audio = read_wav(path)
+        feat, _ = frontend.lfr_cmvn(frontend.fbank(audio))
+        feat = feat.astype(np.float32)
+        row = {"file": os.path.basename(path), "audio_seconds": len(audio) / 16000}
+        for name, (model, kwargs) in backends.items():
+            text, latency = transcribe(model, kwargs, feat, args.repeat, args.language)
+            row[name] = {"text": text, "latency_ms": latency * 1000}
+        reference = refs.get(row["file"], row["torch"]["text"])
+        for name in backends:
+            row[name]["cer"] = cer(reference, row[name]["text"])
+        rows.append(row)
+        print(f"{row['file']}: " + "  ".join(
+            f"{name} {row[name]['latency_ms']:.0f}ms CER={row[name]['cer']:.3f}" for name in backends))
+
+    summary = {}
+    for name in backends:
+        summary[name] = {
+            "mean_latency_ms": float(np.mean([r[name]["latency_ms"] for r in rows])),
+            "mean_cer": float(np.mean([r[name]["cer"] for r in rows])),
+            "rtf": float(sum(r[name]["latency_ms"] / 1000 for r in rows) / sum(r["audio_seconds"] for r in rows)),
+        }
+    print("\n汇总:")
+    for name, s in summary.items():
+        print(f"  {name:>10}: 平均延迟 {s['mean_latency_ms']:.1f}ms  RTF {s['rtf']:.3f}  平均CER {s['mean_cer']:.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"files": rows, "summary": summary}, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
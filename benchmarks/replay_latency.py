@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+不需要麦克风的识别延迟基准测试
+
+把WAV文件通过采集接口（utils.audio_capture.FileInput）按实时或更快的速度回放给
+StreamingSTT（SenseVoice）或 StreamSTT（speech_recognition 后端），记录：
+- 首个中间结果延迟：话语开始到第一个中间结果（仅 StreamingSTT）
+- 端点到最终结果延迟：话语结束到这句话的最终结果
+- 实时率(RTF)：第一块音频到达到最后一个结果的墙钟时间 / 音频时长
+- 每秒音频消耗的CPU时间（进程内所有线程，同样从第一块音频开始计算，不含模型加载）
+- 丢失音频的计数：输入溢出、环形缓冲区溢出/覆盖、订阅队列和录音写入丢弃的音频块，任何一项非零时以非零状态退出
+--speed 0 时尽快回放，由识别器的缓冲区提供背压：缓冲区快满时暂停送出音频，不会覆盖或丢弃音频
+话语的起止时间由固定阈值的VAD离线分析文件得到，结果按时间匹配到话语。
+报告为JSON；提供 --baseline 时与之前的报告对比，指标变差超过 --tolerance 时以非零状态退出。
+
+示例:
+    python benchmarks/replay_latency.py speech_files/*.wav --system streaming --speed 1 --output latency.json
+    python benchmarks/replay_latency.py speech_files/*.wav --speed 4 --baseline latency.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import wave
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "STT", "SenseVoice"))
+from utils.audio_capture import FileInput
+from utils.vad import EnergyZcrVAD
+
+SAMPLE_RATE = 16000
+
+# 用于回归对比的指标，数值越大越差
+REGRESSION_METRICS = ("first_partial_p50", "final_latency_p50", "final_latency_p90", "rtf", "cpu_per_audio_second")
+
+
+def reference_utterances(path, energy_threshold, hangover):
+    """离线分析文件中的话语，返回 [(开始秒, 结束秒)]，结束时间不含 hangover 的静音"""
+    with wave.open(path, 'rb') as wf:
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    vad = EnergyZcrVAD(sample_rate=SAMPLE_RATE, energy_threshold=energy_threshold, hangover=hangover, pre_roll=0)
+    tail = vad.hangover_frames * vad.frame_length
+    return [(start / SAMPLE_RATE, max(start, end - tail) / SAMPLE_RATE) for start, end in vad.find_segments(samples)]
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+def mark_start(capture):
+    """记录第一块音频到达时的墙钟时间和进程CPU时间；识别器的构建、模型加载和预热不计入 RTF 和 CPU 占用"""
+    start = {}
+
+    def on_chunk(data):
+        if "time" not in start:
+            start["cpu"] = time.process_time()
+            start["time"] = time.time()
+
+    capture.add_callback(on_chunk)
+    return start
+
+
+def writer_has_room(writer):
+    """录音写入队列还能放下一块音频（还没有开始录音时视为有空间）"""
+    return writer is None or writer.backlog < writer.max_queue_chunks - 1
+
+
+def replay_streaming(path, args):
+    """
+    回放给 StreamingSTT，返回 (第一块音频的到达时间, 当时的进程CPU时间, 结果列表, 丢失音频的计数)；
+    结果为 (到达时间, 类型, 话语编号, audio_end, 文本)
+    """
+    from STT.stream_stt import StreamingSTT
+    audio_input = FileInput(path, realtime=args.speed > 0, speed=args.speed or 1.0)
+    stt = StreamingSTT(model_dir=args.model_dir, backend=args.backend, energy_threshold=args.energy_threshold,
+                       audio_input=audio_input, adaptive_threshold=not args.fixed_threshold, denoise=args.denoise)
+    # 尽快回放时，写入下一块后环形缓冲区中未处理的音频仍要留出一块的余量，否则正在处理的块会被覆盖
+    ring = stt.audio_ring
+    audio_input.ready = lambda: (ring.available() <= ring.capacity - 2 * ring.block_size
+                                 and writer_has_room(stt.recording_writer))
+    start = mark_start(stt.capture)
+    stt.start_listening()
+    stt.capture.wait()
+    stt.processing_thread.join()
+    stt.stop_listening()
+
+    results = []
+    while True:
+        event = stt.get_result(timeout=0)
+        if event is None:
+            break
+        results.append((event.submitted_at + event.latency, event.kind, event.utterance_id, event.audio_end, event.text))
+    stats = stt.get_recording_stats()
+    losses = {
+        "input_overflows": stats["input_overflows"],
+        "ring_overruns": stats["ring_overruns"],
+        "overwritten_chunks": stats["overwritten_chunks"],
+        "recording_dropped_chunks": stats.get("dropped_chunks", 0),
+    }
+    return start.get("time", time.time()), start.get("cpu", time.process_time()), results, losses
+
+
+def replay_simple(path, args):
+    """回放给 StreamSTT，结果均为最终结果"""
+    from STT.simple_stt import StreamSTT
+    results = []
+    audio_input = FileInput(path, realtime=args.speed > 0, speed=args.speed or 1.0)
+    stt = StreamSTT(energy_threshold=args.energy_threshold, backend=args.recognizer, audio_input=audio_input,
+                    adaptive_threshold=not args.fixed_threshold,
+                    on_result=lambda seq, text: results.append((time.time(), "final", seq, None, text)))
+
+    def ready():
+        # 尽快回放时，识别队列满了就暂停送出，不让订阅队列丢弃最旧的音频块
+        subscription = stt.audio_subscription
+        return ((subscription is None or len(subscription) < stt.max_queue_chunks - 1)
+                and writer_has_room(stt.recording_writer))
+
+    audio_input.ready = ready
+    start = mark_start(stt.capture)
+    stt.start_listening()
+    stt.capture.wait()
+    stt.stop_listening()
+    if stt.recognize_thread is not None:
+        stt.recognize_thread.join()
+    losses = {
+        "input_overflows": stt.capture.input_overflows,
+        "dropped_chunks": stt.dropped_chunks,
+        "recording_dropped_chunks": stt.recording_writer.dropped_chunks,
+    }
+    return start.get("time", time.time()), start.get("cpu", time.process_time()), results, losses
+
+
+def analyze(path, start_time, results, chunk_seconds, args):
+    """将结果按时间匹配到话语，计算各项延迟"""
+    speed = args.speed or None
+    utterances = reference_utterances(path, args.energy_threshold, args.hangover)
+    # 第一块音频在 start_time 到达，音频位置 t 秒对应的墙钟时间（尽快回放时无法换算）
+    origin = start_time - chunk_seconds / (speed or 1.0)
+
+    def wall(t):
+        return origin + t / speed if speed else None
+
+    finals = [r for r in results if r[1] == "final"]
+    partials = [r for r in results if r[1] == "partial"]
+    rows, used = [], set()
+    for received, _, utterance_id, audio_end, text in sorted(finals):
+        # StreamingSTT 的结果带有 audio_end，取在此之前结束的最后一句话；否则按到达时间匹配
+        limit = audio_end if audio_end is not None else (received - origin) * (speed or 1.0)
+        candidates = [i for i, (_, end) in enumerate(utterances) if end <= limit and i not in used]
+        if not candidates:
+            continue
+        index = candidates[-1]
+        used.add(index)
+        start, end = utterances[index]
+        first_partial = min((r[0] for r in partials if r[2] == utterance_id), default=None)
+        rows.append({
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "text": text,
+            "first_partial_latency": (first_partial - wall(start)) if speed and first_partial else None,
+            "final_latency": (received - wall(end)) if speed else None,
+        })
+    return utterances, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回放WAV文件测量识别延迟')
+    parser.add_argument('wavs', nargs='+', help='16kHz单声道16-bit WAV文件')
+    parser.add_argument('--system', choices=['streaming', 'simple'], default='streaming',
+                        help='streaming: StreamingSTT（SenseVoice），simple: StreamSTT')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速，0 表示尽快回放（不计算延迟）')
+    parser.add_argument('--energy-threshold', type=float, default=300)
+    parser.add_argument('--hangover', type=float, default=0.8, help='参考话语划分使用的停顿时长(秒)')
+    parser.add_argument('--fixed-threshold', action='store_true', help='关闭自适应阈值')
+    parser.add_argument('--denoise', action='store_true', help='StreamingSTT 开启频谱门限降噪')
+    parser.add_argument('--model-dir', default="iic/SenseVoiceSmall")
+    parser.add_argument('--backend', default=None, help='StreamingSTT 推理后端: torch 或 onnx')
+    parser.add_argument('--recognizer', default="google", help='StreamSTT 识别后端: google / whisper / sphinx')
+    parser.add_argument('--output', default=None, help='JSON报告路径')
+    parser.add_argument('--baseline', default=None, help='用于回归对比的历史报告')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的相对变差比例')
+    args = parser.parse_args()
+
+    replay = replay_streaming if args.system == 'streaming' else replay_simple
+    chunk_seconds = (1600 if args.system == 'streaming' else 1024) / SAMPLE_RATE
+
+    files, lossy = [], []
+    for path in args.wavs:
+        with wave.open(path, 'rb') as wf:
+            audio_seconds = wf.getnframes() / wf.getframerate()
+        # 从第一块音频到达开始计时，第一个文件的模型加载和预热不影响回归对比
+        start_time, cpu_start, results, losses = replay(path, args)
+        cpu_seconds = time.process_time() - cpu_start
+        last_result = max((r[0] for r in results), default=time.time())
+        utterances, rows = analyze(path, start_time, results, chunk_seconds, args)
+
+        entry = {
+            "file": os.path.basename(path),
+            "audio_seconds": audio_seconds,
+            "utterances": len(utterances),
+            "matched": len(rows),
+            "rtf": (last_result - start_time) / audio_seconds,
+            "cpu_per_audio_second": cpu_seconds / audio_seconds,
+            "losses": losses,
+            "results": rows,
+        }
+        files.append(entry)
+        print(f"{entry['file']}: {len(rows)}/{len(utterances)} 句匹配，RTF {entry['rtf']:.3f}，"
+              f"CPU {entry['cpu_per_audio_second']:.3f}s/音频秒")
+        lost = {key: value for key, value in losses.items() if value}
+        if lost:
+            lossy.append(entry["file"])
+            print(f"  警告: 回放中丢失了音频 {lost}，该文件的结果无效")
+
+    first_partials = [r["first_partial_latency"] for f in files for r in f["results"] if r["first_partial_latency"] is not None]
+    finals = [r["final_latency"] for f in files for r in f["results"] if r["final_latency"] is not None]
+    total_audio = sum(f["audio_seconds"] for f in files)
+    summary = {
+        "first_partial_p50": percentile(first_partials, 50),
+        "first_partial_p90": percentile(first_partials, 90),
+        "final_latency_p50": percentile(finals, 50),
+        "final_latency_p90": percentile(finals, 90),
+        "rtf": sum(f["rtf"] * f["audio_seconds"] for f in files) / total_audio,
+        "cpu_per_audio_second": sum(f["cpu_per_audio_second"] * f["audio_seconds"] for f in files) / total_audio,
+    }
+    report = {
+        "system": args.system,
+        "speed": args.speed,
+        "denoise": args.denoise,
+        "backend": args.backend or os.getenv("SENSEVOICE_BACKEND", "torch"),
+        "platform": platform.platform(),
+        "timestamp": int(time.time()),
+        "summary": summary,
+        "lossy_files": lossy,
+        "files": files,
+    }
+
+    print("\n汇总:")
+    for key, value in summary.items():
+        print(f"  {key:>22}: {'-' if value is None else f'{value:.3f}'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"报告已保存: {args.output}")
+
+    if lossy:
+        print(f"\n{len(lossy)} 个文件回放中丢失了音频，RTF、CPU和延迟结果无效: {', '.join(lossy)}")
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)["summary"]
+        regressions = []
+        for key in REGRESSION_METRICS:
+            old, new = baseline.get(key), summary.get(key)
+            if old and new is not None and new > old * (1 + args.tolerance):
+                regressions.append(f"{key}: {old:.3f} -> {new:.3f}")
+        if regressions:
+            print("性能回退:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("与基线相比没有超出容差的回退")
+
+
+if __name__ == "__main__":
+    main()
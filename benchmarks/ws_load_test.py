@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+"""
+WebSocket 流式识别服务的压力测试
+
+同时打开 --connections 个连接，每个连接按实时速度回放一个WAV文件（多个文件轮流分配），
+记录每条识别结果到达的时间，统计：
+- 音频到文字延迟：结果到达时间 - 该结果对应的音频（audio_end）发送完的时间
+- 服务端推理延迟：服务端返回的 latency 字段（排队 + 推理）
+- 被拒绝的连接数和出错的连接数
+
+示例:
+    python main.py --mode stt --max-sessions 32 &
+    python benchmarks/ws_load_test.py speech_files/*.wav --connections 8 16 32
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import wave
+
+import numpy as np
+import websockets
+
+
+def read_pcm(path):
+    """读取16kHz单声道16-bit WAV的PCM字节"""
+    with wave.open(path, 'rb') as wf:
+        if wf.getframerate() != 16000 or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: 需要16kHz单声道16-bit WAV")
+        return wf.readframes(wf.getnframes())
+
+
+async def run_connection(url, pcm, chunk_ms, speed, results):
+    """回放一段音频并收集结果；audio_end 对应的发送时刻用于计算端到端延迟"""
+    chunk_bytes = int(16000 * chunk_ms / 1000) * 2
+    interval = chunk_ms / 1000 / speed
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            start = time.perf_counter()
+
+            async def sender():
+                next_time = start
+                for offset in range(0, len(pcm), chunk_bytes):
+                    await ws.send(pcm[offset:offset + chunk_bytes])
+                    next_time += interval
+                    await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+                await ws.send(json.dumps({"type": "end"}))
+
+            send_task = asyncio.create_task(sender())
+            async for message in ws:
+                event = json.loads(message)
+                now = time.perf_counter()
+                if event["type"] == "error":
+                    results["rejected"] += 1
+                    break
+                if event["type"] == "done":
+                    break
+                # audio_end 秒的音频在 start + audio_end / speed 时刻发送完
+                sent_at = start + (event.get("audio_end") or 0.0) / speed
+                results[event["type"]].append(now - sent_at)
+                results["server_" + event["type"]].append(event["latency"])
+            send_task.cancel()
+    except Exception as e:
+        results["errors"] += 1
+        print(f"连接出错: {e}")
+
+
+def percentiles(values):
+    if not values:
+        return "-"
+    ms = np.array(values) * 1000
+    return " / ".join(f"{np.percentile(ms, p):.0f}" for p in (50, 90, 99))
+
+
+async def run_load(url, pcms, connections, chunk_ms, speed):
+    results = {"partial": [], "final": [], "server_partial": [], "server_final": [], "rejected": 0, "errors": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_connection(url, pcms[i % len(pcms)], chunk_ms, speed, results)
+                           for i in range(connections)))
+    results["elapsed"] = time.perf_counter() - start
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WebSocket 流式识别服务压力测试')
+    parser.add_argument('wavs', nargs='+', help='回放的WAV文件（16kHz单声道16-bit）')
+    parser.add_argument('--url', default="ws://127.0.0.1:8000/ws/asr?language=auto")
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--chunk-ms', type=int, default=100, help='每条消息的音频时长(毫秒)')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放速度，1.0 为实时')
+    parser.add_argument('--output', default=None, help='将原始延迟数据写入JSON文件')
+    args = parser.parse_args()
+
+    pcms = [read_pcm(path) for path in args.wavs]
+    report = {}
+    print(f"{'连接数':>6} {'partial p50/p90/p99(ms)':>26} {'final p50/p90/p99(ms)':>24} "
+          f"{'服务端final(ms)':>18} {'拒绝':>5} {'错误':>5}")
+    for connections in args.connections:
+        r = asyncio.run(run_load(args.url, pcms, connections, args.chunk_ms, args.speed))
+        report[connections] = r
+        print(f"{connections:>6} {percentiles(r['partial']):>26} {percentiles(r['final']):>24} "
+              f"{percentiles(r['server_final']):>18} {r['rejected']:>5} {r['errors']:>5}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
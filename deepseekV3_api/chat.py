@@ -1,72 +1,44 @@
-from openai import OpenAI
 import os
 import sys
 import re
 from pathlib import Path
+import shutil
+import threading
 import time
-from dotenv import load_dotenv
 # 修改第8行
 from deepseekV3_api.characters import teacher, little_horse, yellow_cow, squirrel, narrator
+from deepseekV3_api import llm_client
+from deepseekV3_api.config import get_config
+from deepseekV3_api.history import get_history, summarize_with_llm
+from deepseekV3_api.response_cache import ResponseCache
+from deepseekV3_api.tts_pipeline import SegmentPlayer, SpeechPipeline, strip_parentheses
 
 # 导入文件管理模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.file_manager import cleanup_speech_files, get_directory_size
 
-# 指定.env文件的绝对路径
-dotenv_path = '/Users/xzmx/Downloads/my-project/STT_TTS/.env'
-if os.path.exists(dotenv_path):
-    load_dotenv(dotenv_path)
-    print("环境变量文件已加载")
-else:
-    print("警告: 环境变量文件不存在")
-
-# 直接从.env文件读取API密钥
-api_key = None
-try:
-    with open(dotenv_path, 'r') as f:
-        env_content = f.read()
-        for line in env_content.split('\n'):
-            if line.startswith('OPENAI_API_KEY='):
-                # 移除可能的引号和空格
-                api_key = line.split('=', 1)[1].strip().strip('"\'')
-                print("已从.env文件直接读取API密钥")
-                break
-except Exception as e:
-    print(f"读取.env文件时出错: {e}")
-
-if not api_key:
-    print("错误: 无法获取API密钥，请检查.env文件")
-    sys.exit(1)
-else:
-    # 确保API密钥没有前后空格或引号
-    api_key = api_key.strip().strip('"\'')
-    print(f"成功获取API密钥: {api_key[:5]}...{api_key[-5:]}")
-    # 验证API密钥格式
-    if not api_key.startswith("sk-"):
-        print("警告: API密钥格式可能不正确，应以'sk-'开头")
-
-# 语音文件存储目录
-speech_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / "speech_files"
-if not speech_dir.exists():
-    speech_dir.mkdir(parents=True)
-    print(f"已创建语音文件存储目录: {speech_dir}")
-
-# 用户音色信息存储目录
-user_voices_dir = Path(os.path.dirname(os.path.abspath(__file__))) / "user_voices"
-if not user_voices_dir.exists():
-    user_voices_dir.mkdir(parents=True)
-    print(f"已创建用户音色信息存储目录: {user_voices_dir}")
-
-# 初始化OpenAI客户端
-client = OpenAI(
-    api_key=api_key,  # 使用处理过的API密钥
-    base_url=os.getenv("OPENAI_BASE_URL", "https://api.siliconflow.cn/v1")
-)
-
-# 从环境变量获取模型配置
-TEXT_MODEL = os.getenv("TEXT_MODEL", "deepseek-ai/DeepSeek-V3")
-VOICE_MODEL = os.getenv("VOICE_MODEL", "FunAudioLLM/CosyVoice2-0.5B")
-DEFAULT_VOICE_ID = os.getenv("VOICE_ID", "speech:xiaoma:4on1q9y2b5:smwvoogtaqejdkgmfxpq")
+# 导入时不读取配置、不创建目录和客户端：API密钥、模型、语音目录等都在第一次使用时
+# 由 get_config() 读取，对话和语音请求共用 llm_client 中的连接池
+
+# 回复缓存：同一角色被反复问到同样的问题时直接使用缓存的回复和语音，RESPONSE_CACHE=0 关闭
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """返回共享的回复缓存（第一次使用时创建），关闭缓存时返回 None"""
+    global _response_cache
+    config = get_config()
+    if not config.response_cache_enabled:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                cache_dir=config.response_cache_dir,
+                max_entries=config.response_cache_size,
+                ttl=config.response_cache_ttl,
+                max_disk_entries=config.response_cache_disk_size
+            )
+        return _response_cache
 
 # 添加一个测试函数来验证API连接
 def test_api_connection():
@@ -74,73 +46,285 @@ def test_api_connection():
     try:
         print("正在测试API连接...")
         # 尝试一个简单的API调用
-        response = client.models.list()
+        response = llm_client.get_client().models.list()
         print("API连接测试成功！")
         return True
     except Exception as e:
         print(f"API连接测试失败: {e}")
         return False
 
-def get_response(character, user_input):
-    """获取指定角色的响应并生成语音"""
-    messages = character["messages"].copy()
-    messages.append({"role": "user", "content": user_input})
-    
+def _history(character):
+    """角色的对话历史管理器，较早的对话在后台压缩为摘要"""
+    config = get_config()
+    return get_history(character, lambda summary, turns: summarize_with_llm(summary, turns, config.text_model),
+                       config.history_token_budget)
+
+def _build_messages(character, user_input):
+    """预算内的对话历史加上本轮用户输入，以及角色的温度参数"""
+    messages = _history(character).build_messages(user_input)
     # 使用角色特定的温度参数，如果没有则使用默认值
-    temperature = character.get("temperature", 0.7)
-    
-    response = client.chat.completions.create(
-        model=TEXT_MODEL,  # 使用环境变量中的文本模型
-        messages=messages,
-        temperature=temperature,
-        max_tokens=1024,
-        stream=True
-    )
-    
-    # 存储完整响应
-    full_response = ""
-    
-    # 逐步接收并处理响应
-    print(f"\n{character['name']}的回答:")
-    for chunk in response:
-        content = chunk.choices[0].delta.content
-        if content:
-            print(content, end="", flush=True)
-            full_response += content
-    
-    # 将对话历史添加到角色的消息列表中
-    character["messages"].append({"role": "user", "content": user_input})
-    character["messages"].append({"role": "assistant", "content": full_response})
-    
+    return messages, character.get("temperature", 0.7)
+
+def _remember(character, user_input, full_response):
+    """记录本轮对话，character["messages"] 更新为下一次请求的历史"""
+    history = _history(character)
+    history.add_turn(user_input, full_response)
+    character["messages"] = history.prompt_messages()
+
+def _report_prompt_tokens(character):
+    print(f"\n（本次提示词约 {_history(character).last_prompt_tokens} tokens）")
+
+def _speech_file(character):
+    """返回 (音色ID, 语音文件路径)，并清理旧的语音文件"""
     # 使用预置音色ID
-    voice_id = character.get("voice_id", DEFAULT_VOICE_ID)
+    config = get_config()
+    voice_id = character.get("voice_id", config.default_voice_id)
     
     # 清理旧的语音文件
+    speech_dir = config.speech_dir
     cleanup_speech_files(speech_dir)
     
     # 生成唯一的文件名
     timestamp = int(time.time())
-    speech_file_path = speech_dir / f"{character['name']}_{timestamp}.mp3"
+    return voice_id, speech_dir / f"{character['name']}_{timestamp}.mp3"
+
+def _cache_settings(character):
+    """影响回复和语音的设置，作为缓存键的一部分：换了音色或模型后不会命中旧的回复和语音"""
+    config = get_config()
+    return {
+        "voice_id": character.get("voice_id", config.default_voice_id),
+        "text_model": config.text_model,
+        "voice_model": config.voice_model,
+    }
+
+def _lookup_cache(character, user_input, use_cache):
+    """返回 (缓存, 命中的条目)；history 需在加入本轮对话之前查询"""
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return None, None
+    return cache, cache.get(character, user_input, character["messages"], _cache_settings(character))
+
+def _use_cached(character, user_input, entry):
+    """使用缓存的回复：记入对话历史，语音复制为本次的语音文件，返回语音文件路径（没有缓存的语音时为 None）"""
+    print(f"\n{character['name']}的回答（缓存）:")
+    print(entry.text)
+    _remember(character, user_input, entry.text)
+    if not entry.audio_path:
+        return None
+    _, speech_file_path = _speech_file(character)
+    shutil.copyfile(entry.audio_path, speech_file_path)
+    print(f"使用缓存的语音，文件保存在: {speech_file_path}")
+    return speech_file_path
+
+def synthesize_speech(text, voice_id, path):
+    """合成语音并保存为mp3"""
+    with llm_client.get_client().audio.speech.with_streaming_response.create(
+        model=get_config().voice_model,  # 使用环境变量中的语音模型
+        voice=voice_id,
+        input=text,
+        response_format="mp3"
+    ) as response:
+        response.stream_to_file(path)
+
+async def synthesize_speech_async(text, voice_id, path):
+    """synthesize_speech 的异步版本"""
+    client = llm_client.get_async_client()
+    async with client.audio.speech.with_streaming_response.create(
+        model=get_config().voice_model,
+        voice=voice_id,
+        input=text,
+        response_format="mp3"
+    ) as response:
+        await response.stream_to_file(path)
+
+def get_response(character, user_input, pipelined=False, use_cache=True):
+    """
+    获取指定角色的响应并生成语音
+    pipelined=True 时边生成边按句合成并播放，第一句合成完就能听到声音
+    （在共享的后台事件循环中运行，已经在事件循环中的调用方应使用 get_response_async）
+    use_cache=True 时先查询回复缓存，命中时不请求 LLM 和语音合成
+    """
+    if pipelined:
+        return run_async(get_response_async(character, user_input, pipelined=True, use_cache=use_cache))
+    
+    context = list(character["messages"])
+    cache, cached = _lookup_cache(character, user_input, use_cache)
+    if cached is not None:
+        _use_cached(character, user_input, cached)
+        if cached.audio_path:
+            return cached.text
+        # 缓存中只有文本时补合成语音
+        full_response = cached.text
+    else:
+        full_response = None
+    
+    if full_response is None:
+        messages, temperature = _build_messages(character, user_input)
+        response = llm_client.get_client().chat.completions.create(
+            model=get_config().text_model,  # 使用环境变量中的文本模型
+            messages=messages,
+            temperature=temperature,
+            max_tokens=1024,
+            stream=True
+        )
+        
+        # 存储完整响应
+        full_response = ""
+        
+        # 逐步接收并处理响应
+        print(f"\n{character['name']}的回答:")
+        for chunk in response:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            if content:
+                print(content, end="", flush=True)
+                full_response += content
+        
+        _report_prompt_tokens(character)
+        _remember(character, user_input, full_response)
     
+    voice_id, speech_file_path = _speech_file(character)
     try:
         print(f"\n正在生成{character['name']}的语音...")
-        
         # 移除括号中的内容用于语音合成
-        speech_text = re.sub(r'\([^)]*\)', '', full_response)
-        
-        with client.audio.speech.with_streaming_response.create(
-            model=VOICE_MODEL,  # 使用环境变量中的语音模型
-            voice=voice_id,
-            input=speech_text,  # 使用处理后的文本
-            response_format="mp3"
-        ) as response:
-            response.stream_to_file(speech_file_path)
+        synthesize_speech(strip_parentheses(full_response), voice_id, speech_file_path)
         print(f"语音生成成功！文件保存在: {speech_file_path}")
     except Exception as e:
         print(f"生成语音时出错: {e}")
+        speech_file_path = None
+    
+    if cache is not None and full_response:
+        cache.put(character, user_input, context, full_response, speech_file_path,
+                  _cache_settings(character))
+    return full_response
+
+async def stream_chat(messages, temperature=0.7, max_tokens=1024):
+    """异步流式对话，逐块给出回复文本；等待网络时不占用线程"""
+    response = await llm_client.get_async_client().chat.completions.create(
+        model=get_config().text_model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    async for chunk in response:
+        content = chunk.choices[0].delta.content if chunk.choices else None
+        if content:
+            yield content
+
+async def generate_response(messages, stream=True, temperature=0.7, max_tokens=1024):
+    """按对话历史生成回复：stream=True 时逐块给出，否则只给出一次完整回复"""
+    if stream:
+        async for content in stream_chat(messages, temperature, max_tokens):
+            yield content
+        return
+    response = await llm_client.get_async_client().chat.completions.create(
+        model=get_config().text_model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    yield response.choices[0].message.content or ""
+
+async def get_response_async(character, user_input, speak=True, pipelined=False, use_cache=True):
+    """
+    get_response 的异步版本：多个角色、多个会话可以在同一个事件循环中并发对话，
+    对话和语音合成请求复用共享连接池中的连接
+    pipelined=True 时回复按句子切分，每句生成完立即合成，按顺序播放
+    """
+    context = list(character["messages"])
+    cache, cached = _lookup_cache(character, user_input, use_cache)
+    if cached is not None and (cached.audio_path or not speak):
+        speech_file_path = _use_cached(character, user_input, cached)
+        if speak and pipelined:
+            # 命中时直接播放缓存的语音，没有生成和合成的等待
+            import asyncio
+            await asyncio.to_thread(SegmentPlayer().play, Path(speech_file_path).read_bytes())
+        return cached.text
+    
+    if speak and pipelined and cached is None:
+        messages, temperature = _build_messages(character, user_input)
+        print(f"\n{character['name']}的回答:")
+        voice_id, speech_file_path = _speech_file(character)
+        pipeline = SpeechPipeline(voice_id, get_config().voice_model)
+        full_response = await pipeline.run(stream_chat(messages, temperature),
+                                           on_text=lambda text: print(text, end="", flush=True))
+        _report_prompt_tokens(character)
+        _remember(character, user_input, full_response)
+        if pipeline.segments:
+            pipeline.save(speech_file_path)
+            print(f"\n语音文件保存在: {speech_file_path}")
+        else:
+            speech_file_path = None
+        pipeline.report()
+        if cache is not None and full_response:
+            cache.put(character, user_input, context, full_response, speech_file_path,
+                      _cache_settings(character))
+        return full_response
     
+    if cached is not None:
+        # 缓存中只有文本时补合成语音
+        _use_cached(character, user_input, cached)
+        full_response = cached.text
+    else:
+        messages, temperature = _build_messages(character, user_input)
+        full_response = ""
+        print(f"\n{character['name']}的回答:")
+        async for content in stream_chat(messages, temperature):
+            print(content, end="", flush=True)
+            full_response += content
+        _report_prompt_tokens(character)
+        _remember(character, user_input, full_response)
+    
+    speech_file_path = None
+    if speak:
+        voice_id, speech_file_path = _speech_file(character)
+        try:
+            print(f"\n正在生成{character['name']}的语音...")
+            await synthesize_speech_async(strip_parentheses(full_response), voice_id, speech_file_path)
+            print(f"语音生成成功！文件保存在: {speech_file_path}")
+        except Exception as e:
+            print(f"生成语音时出错: {e}")
+            speech_file_path = None
+    
+    if cache is not None and full_response and (speech_file_path or cached is None):
+        cache.put(character, user_input, context, full_response, speech_file_path,
+                  _cache_settings(character))
     return full_response
 
+# 同步调用方共用的后台事件循环：异步客户端的连接池绑定事件循环，
+# 每轮对话都用 asyncio.run 新建循环会丢掉连接池，每轮都要重新建立TLS连接
+_loop = None
+_loop_lock = threading.Lock()
+
+def _event_loop():
+    """返回后台事件循环（第一次使用时在守护线程中启动）"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            import asyncio
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="chat-event-loop", daemon=True).start()
+        return _loop
+
+def run_async(coro):
+    """在后台事件循环中运行协程并等待结果，多轮对话复用同一个异步连接池"""
+    import asyncio
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+def close_event_loop():
+    """关闭后台事件循环的连接池并停止循环，在程序退出前调用"""
+    global _loop
+    with _loop_lock:
+        loop, _loop = _loop, None
+    if loop is None:
+        return
+    import asyncio
+    try:
+        asyncio.run_coroutine_threadsafe(llm_client.aclose(), loop).result(timeout=5)
+    except Exception as e:
+        print(f"关闭连接池时出错: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+
 def normalize_wake_word(text):
     """去除唤醒词中的所有符号，只保留字母和数字"""
     return re.sub(r'[^\w\s]', '', text).strip()
@@ -150,7 +334,13 @@ def get_streaming_response(character, user_input):
     # 将响应分成小块返回
     for i in range(0, len(response), 10):
         yield response[i:i+10]
-def main():
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='小马过河互动故事系统')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='边生成边按句合成并播放语音，缩短听到第一句的等待时间')
+    args = parser.parse_args(argv)
+    
     print("欢迎来到小马过河互动故事系统!")
     
     # 测试API连接
@@ -196,6 +386,15 @@ def main():
         normalized = normalize_wake_word(word)
         wake_words[normalized] = character
     
+    try:
+        _chat_loop(wake_words, args.pipelined)
+    finally:
+        # 退出时才关闭连接池，对话期间各轮请求复用已建立的连接
+        close_event_loop()
+        llm_client.close()
+
+def _chat_loop(wake_words, pipelined):
+    """读取用户输入，按唤醒词切换角色并对话"""
     current_character = None
     
     while True:
@@ -206,6 +405,11 @@ def main():
                 user_input = input(f"\n请输入您想对{current_character['name']}说的话 (或使用其他唤醒词切换角色，输入'exit'退出): ")
             
             if user_input.lower() == 'exit' or user_input == '退出系统':
+                cache = get_response_cache()
+                if cache is not None:
+                    stats = cache.stats()
+                    print(f"回复缓存: 命中 {stats['hits']} 次（磁盘 {stats['disk_hits']} 次），"
+                          f"未命中 {stats['misses']} 次，命中率 {stats['hit_rate']:.0%}")
                 print("谢谢使用，再见!")
                 break
             
@@ -229,7 +433,7 @@ def main():
                 continue
             
             # 处理用户输入
-            get_response(current_character, user_input)
+            get_response(current_character, user_input, pipelined=pipelined)
             
         except Exception as e:
             print(f"发生错误: {e}")
@@ -0,0 +1,171 @@
+"""
+对话和语音模块的配置
+
+导入本模块及 chat、generate_speech 等模块时不读取文件、不创建目录、不连接网络，
+所有配置在第一次使用时才从环境变量和 .env 文件中读取：
+- .env 默认为项目根目录下的 .env，可以用环境变量 ENV_FILE 指定其他文件
+- 已经存在的环境变量优先于 .env 中的同名设置
+- 缺少API密钥时在第一次请求时抛出 ConfigError，而不是在导入时退出进程
+- 语音文件等目录在第一次访问对应属性时创建
+"""
+
+import os
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+DEFAULT_BASE_URL = "https://api.siliconflow.cn/v1"
+DEFAULT_TEXT_MODEL = "deepseek-ai/DeepSeek-V3"
+DEFAULT_VOICE_MODEL = "FunAudioLLM/CosyVoice2-0.5B"
+DEFAULT_VOICE_ID = "speech:xiaoma:4on1q9y2b5:smwvoogtaqejdkgmfxpq"
+
+
+class ConfigError(RuntimeError):
+    """缺少必需的配置（例如API密钥）"""
+
+
+def _read_env_file(path):
+    """读取 KEY=VALUE 格式的 .env 文件（未安装 python-dotenv 时使用）"""
+    values = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            key = key.strip()
+            if key.startswith('export '):
+                key = key[len('export '):].strip()
+            values[key] = value.strip().strip('"\'')
+    return values
+
+
+class Settings:
+    """按需读取的配置，通过 get_config() 获取进程内共享的实例"""
+
+    def __init__(self, env_file=None):
+        self.env_file = Path(env_file or os.getenv("ENV_FILE") or PROJECT_ROOT / ".env")
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._warned_key_format = False
+
+    def load(self):
+        """加载 .env 文件（只在第一次调用时读取）"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.env_file.exists():
+                return
+            try:
+                from dotenv import load_dotenv
+                load_dotenv(self.env_file)
+            except ImportError:
+                for key, value in _read_env_file(self.env_file).items():
+                    os.environ.setdefault(key, value)
+            except Exception as e:
+                print(f"读取环境变量文件 {self.env_file} 时出错: {e}")
+
+    def get(self, name, default=None):
+        self.load()
+        return os.getenv(name, default)
+
+    @property
+    def api_key(self):
+        key = self.get("OPENAI_API_KEY") or self.get("DEEPSEEK_API_KEY")
+        if not key:
+            raise ConfigError(f"未找到API密钥，请在 {self.env_file} 或环境变量中设置 OPENAI_API_KEY")
+        key = key.strip().strip('"\'')
+        if not key.startswith("sk-") and not self._warned_key_format:
+            self._warned_key_format = True
+            print("警告: API密钥格式可能不正确，应以'sk-'开头")
+        return key
+
+    @property
+    def base_url(self):
+        return self.get("OPENAI_BASE_URL", DEFAULT_BASE_URL)
+
+    @property
+    def text_model(self):
+        return self.get("TEXT_MODEL", DEFAULT_TEXT_MODEL)
+
+    @property
+    def voice_model(self):
+        return self.get("VOICE_MODEL", DEFAULT_VOICE_MODEL)
+
+    @property
+    def default_voice_id(self):
+        return self.get("VOICE_ID", DEFAULT_VOICE_ID)
+
+    @property
+    def history_token_budget(self):
+        """每个角色提示词（系统提示词 + 摘要 + 最近几轮）的token预算"""
+        return int(self.get("HISTORY_TOKEN_BUDGET", "1500"))
+
+    @property
+    def response_cache_enabled(self):
+        return self.get("RESPONSE_CACHE", "1") != "0"
+
+    @property
+    def response_cache_size(self):
+        return int(self.get("RESPONSE_CACHE_SIZE", "256"))
+
+    @property
+    def response_cache_ttl(self):
+        return float(self.get("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+
+    @property
+    def response_cache_disk_size(self):
+        """磁盘缓存的条目数上限"""
+        return int(self.get("RESPONSE_CACHE_DISK_SIZE", "2000"))
+
+    @property
+    def response_cache_dir(self):
+        # 由 ResponseCache 在创建时建立目录
+        return PROJECT_ROOT / "cache" / "responses"
+
+    @property
+    def speech_dir(self):
+        """语音文件存储目录"""
+        return self._ensure_dir(PROJECT_ROOT / "speech_files")
+
+    @property
+    def user_voices_dir(self):
+        """用户音色信息存储目录"""
+        return self._ensure_dir(PACKAGE_DIR / "user_voices")
+
+    @property
+    def temp_dir(self):
+        """逐块合成的临时语音目录"""
+        return self._ensure_dir(PROJECT_ROOT / "temp")
+
+    @staticmethod
+    def _ensure_dir(path):
+        if not path.exists():
+            path.mkdir(parents=True, exist_ok=True)
+            print(f"已创建目录: {path}")
+        return path
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    """返回进程内共享的配置（第一次调用时创建，此时还不读取 .env）"""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = Settings()
+        return _config
+
+
+def reset_config(env_file=None):
+    """丢弃当前配置，下次使用时按 env_file（或 ENV_FILE）重新读取；已创建的客户端也会重建"""
+    global _config
+    with _config_lock:
+        _config = Settings(env_file) if env_file is not None else None
+    from deepseekV3_api import llm_client
+    llm_client.configure()
@@ -3,39 +3,19 @@ import os
 import json
 import shutil
 from datetime import datetime
-from dotenv import load_dotenv
 from pathlib import Path
 
-# 加载环境变量
-dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
-if os.path.exists(dotenv_path):
-    load_dotenv(dotenv_path)
-    print("环境变量文件已加载")
-else:
-    print("警告: 环境变量文件不存在")
+# API密钥和用户音色目录统一由 config 读取
+from deepseekV3_api.config import ConfigError, get_config
 
-# 从环境变量获取API密钥
-api_key = None
 try:
-    with open(dotenv_path, 'r') as f:
-        env_content = f.read()
-        for line in env_content.split('\n'):
-            if line.startswith('OPENAI_API_KEY='):
-                api_key = line.split('=', 1)[1].strip()
-                print("已从.env文件读取API密钥")
-                break
-except Exception as e:
-    print(f"读取.env文件时出错: {e}")
-
-if not api_key:
-    print("错误: 未找到API密钥，请检查.env文件")
+    api_key = get_config().api_key
+except ConfigError as e:
+    print(f"错误: {e}")
     exit(1)
 
 # 设置用户音色目录
-user_voices_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_voices")
-if not os.path.exists(user_voices_dir):
-    os.makedirs(user_voices_dir)
-    print(f"已创建用户音色目录: {user_voices_dir}")
+user_voices_dir = str(get_config().user_voices_dir)
 
 # 请用户选择音频文件
 print("请选择参考音频文件:")
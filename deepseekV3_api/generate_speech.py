@@ -1,45 +1,18 @@
-from pathlib import Path
 import os
 import time
 import shutil
 import io
 import tempfile
-from dotenv import load_dotenv
-from openai import OpenAI
-import pygame  # 用于音频播放
 import threading
 import queue
+import sys
 
-# 加载环境变量
-dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
-if os.path.exists(dotenv_path):
-    load_dotenv(dotenv_path)
-    print("环境变量文件已加载")
-else:
-    print("警告: 环境变量文件不存在")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from deepseekV3_api import llm_client
+from deepseekV3_api.config import get_config
 
-# 从环境变量获取API密钥
-api_key = None
-try:
-    with open(dotenv_path, 'r') as f:
-        env_content = f.read()
-        for line in env_content.split('\n'):
-            if line.startswith('OPENAI_API_KEY='):
-                api_key = line.split('=', 1)[1].strip()
-                print("已从.env文件读取API密钥")
-                break
-except Exception as e:
-    print(f"读取.env文件时出错: {e}")
-
-if not api_key:
-    print("错误: 未找到API密钥，请检查.env文件")
-    exit(1)
-
-# 创建语音文件存储目录
-speech_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / "speech_files"
-if not speech_dir.exists():
-    speech_dir.mkdir(parents=True)
-    print(f"已创建语音文件存储目录: {speech_dir}")
+# 导入时不读取配置、不初始化音频设备：API密钥和语音目录由 get_config() 在第一次使用时读取，
+# pygame 在第一次播放时初始化；语音请求与对话请求共用 llm_client 中的连接池
 
 # 清理旧的语音文件
 def cleanup_speech_files(directory, max_size_gb=1, target_size_mb=200):
@@ -73,8 +46,18 @@ def cleanup_speech_files(directory, max_size_gb=1, target_size_mb=200):
         
         print(f"清理完成，当前文件夹大小: {total_size/1024/1024:.2f}MB")
 
-# 初始化pygame音频系统 - 使用更高的采样率和缓冲区大小
-pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
+_pygame = None
+_mixer_lock = threading.Lock()
+
+def init_mixer():
+    """第一次播放时初始化pygame音频系统 - 使用更高的采样率和缓冲区大小"""
+    global _pygame
+    with _mixer_lock:
+        if _pygame is None:
+            import pygame  # 用于音频播放
+            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
+            _pygame = pygame
+        return _pygame
 
 # 创建一个队列用于存储音频块
 audio_queue = queue.Queue()
@@ -86,6 +69,7 @@ CHUNK_SIZE = 8192  # 增大音频块大小
 def play_audio_chunks():
     """从队列中获取音频块并播放"""
     global playing
+    pygame = init_mixer()
     
     # 创建临时文件用于存储当前音频块
     temp_dir = tempfile.mkdtemp()
@@ -152,11 +136,19 @@ def stream_and_play_speech(text, voice_id="speech:xiaoma:4on1q9y2b5:smwvoogtaqej
     """流式生成语音并同时播放"""
     global playing
     
-    # 初始化OpenAI客户端
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://api.siliconflow.cn/v1"
-    )
+    # 使用共享客户端，复用已建立的连接
+    client = llm_client.get_client()
+    
+    # 播放线程启动前初始化音频设备，失败时直接返回
+    try:
+        init_mixer()
+    except Exception as e:
+        print(f"无法初始化音频播放: {e}")
+        return None
+
+    # 在生成新语音前清理旧文件
+    speech_dir = get_config().speech_dir
+    cleanup_speech_files(speech_dir)
     
     # 生成唯一的文件名（使用时间戳）
     timestamp = int(time.time())
@@ -249,9 +241,6 @@ def preprocess_text(text):
     
     return ' '.join(processed_sentences)
 
-# 在生成新语音前清理旧文件
-cleanup_speech_files(speech_dir)
-
 if __name__ == "__main__":
     # 获取用户输入的文本
     user_input = input("请输入要转换为语音的文本: ")
@@ -273,35 +262,21 @@ def generate_speech_chunk(text, voice_id=None):
     Returns:
         str: 生成的语音文件路径
     """
-    from openai import OpenAI
-    import os
-    import time
-    from pathlib import Path
     import subprocess
     
-    # 获取API密钥
-    api_key = os.getenv("OPENAI_API_KEY") or os.getenv("DEEPSEEK_API_KEY")
-    if not api_key:
-        print("错误: 未找到API密钥")
-        return None
-    
-    # 初始化OpenAI客户端
-    client = OpenAI(
-        api_key=api_key,
-        base_url=os.getenv("OPENAI_BASE_URL", "https://api.siliconflow.cn/v1")
-    )
+    # 使用共享客户端，每个文本块不再重新建立TLS连接
+    client = llm_client.get_client()
     
     # 使用环境变量中的语音模型或默认值
-    voice_model = os.getenv("VOICE_MODEL", "FunAudioLLM/CosyVoice2-0.5B")
+    config = get_config()
+    voice_model = config.voice_model
     
     # 如果未提供voice_id，使用默认值
     if not voice_id:
-        voice_id = os.getenv("VOICE_ID", "speech:xiaoma:4on1q9y2b5:smwvoogtaqejdkgmfxpq")
+        voice_id = config.default_voice_id
     
     # 语音文件存储目录
-    speech_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / "temp"
-    if not speech_dir.exists():
-        speech_dir.mkdir(parents=True)
+    speech_dir = config.temp_dir
     
     # 生成唯一的文件名
     timestamp = int(time.time())
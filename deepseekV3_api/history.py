@@ -0,0 +1,196 @@
+"""
+按 token 预算管理角色的对话历史
+
+每个角色的提示词由三部分组成：系统提示词、较早对话的摘要、最近几轮原文。
+- 历史超过预算时，较早的几轮交给后台线程用 LLM 压缩为摘要，请求本身不等待摘要完成
+- 摘要完成之前，提示词中只放得下预算内的最近几轮，较早的几轮暂时不发送
+- 至少保留最近 keep_turns 轮原文，即使超出预算
+- 每轮对话后 character["messages"] 更新为实际发送的提示词（不含本轮问题），其他模块仍然可以直接读取
+token 数按字符估算（中文每字约1个token，其他字符约4个一个token），用于预算和统计已经足够
+"""
+
+import re
+import threading
+
+DEFAULT_TOKEN_BUDGET = 1500
+MESSAGE_OVERHEAD = 4  # 每条消息的角色、分隔符等额外token
+
+_CJK = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+SUMMARY_PROMPT = (
+    "请把下面的对话压缩成一段简洁的中文摘要，保留用户的身份、问过的问题、已经给出的结论和约定，"
+    "不要添加新内容，不超过{limit}字。"
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# 各角色的对话历史管理器，按角色名保存，不放进角色配置字典中
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """估算文本的token数"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def count_message_tokens(messages):
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+def _summary_executor():
+    """所有角色共用一个后台摘要线程"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        return _executor
+
+
+def summarize_with_llm(previous_summary, turns, model, limit=200):
+    """用 LLM 把已有摘要和若干轮对话合并为新的摘要"""
+    from deepseekV3_api import llm_client
+
+    lines = [f"之前的摘要：{previous_summary}"] if previous_summary else []
+    for user, assistant in turns:
+        lines.append(f"用户：{user}")
+        lines.append(f"助手：{assistant}")
+    response = llm_client.get_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT.format(limit=limit)},
+            {"role": "user", "content": "\n".join(lines)},
+        ],
+        temperature=0.3,
+        max_tokens=limit * 2,
+    )
+    return (response.choices[0].message.content or "").strip()
+
+
+class ConversationHistory:
+    """
+    一个角色的对话历史
+    summarize_fn(previous_summary, turns) 返回新的摘要，在后台线程中调用
+    """
+
+    def __init__(self, system_messages, summarize_fn, token_budget=DEFAULT_TOKEN_BUDGET, keep_turns=2):
+        self.system_messages = list(system_messages)
+        self.summarize_fn = summarize_fn
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+
+        self.summary = ""
+        self.turns = []  # [(用户, 助手)]，尚未压缩进摘要的对话
+        self._lock = threading.Lock()
+        self._summarizing = False
+
+        # 统计信息
+        self.requests = 0
+        self.last_prompt_tokens = 0
+        self.total_prompt_tokens = 0
+        self.summaries = 0
+
+    @classmethod
+    def from_messages(cls, messages, summarize_fn, **kwargs):
+        """由已有的消息列表创建：system 消息作为系统提示词，其余按一问一答组成轮次"""
+        history = cls([m for m in messages if m["role"] == "system"], summarize_fn, **kwargs)
+        pending = None
+        for m in messages:
+            if m["role"] == "user":
+                pending = m["content"]
+            elif m["role"] == "assistant" and pending is not None:
+                history.turns.append((pending, m["content"]))
+                pending = None
+        return history
+
+    def prompt_messages(self):
+        """当前发送给模型的历史（不含本轮问题）：系统提示词、摘要和预算内的最近几轮"""
+        with self._lock:
+            summary, turns = self.summary, list(self.turns)
+        messages = list(self.system_messages)
+        if summary:
+            messages.append({"role": "system", "content": f"之前对话的摘要：{summary}"})
+        budget = self.token_budget - count_message_tokens(messages)
+
+        # 从最近一轮往前取，直到超出预算（至少 keep_turns 轮）
+        recent = []
+        for i, (user, assistant) in enumerate(reversed(turns)):
+            pair = [{"role": "user", "content": user}, {"role": "assistant", "content": assistant}]
+            cost = count_message_tokens(pair)
+            if i >= self.keep_turns and cost > budget:
+                break
+            budget -= cost
+            recent = pair + recent
+        return messages + recent
+
+    def build_messages(self, user_input):
+        """本次请求的完整消息列表，并记录提示词的token数"""
+        messages = self.prompt_messages() + [{"role": "user", "content": user_input}]
+        tokens = count_message_tokens(messages)
+        self.requests += 1
+        self.last_prompt_tokens = tokens
+        self.total_prompt_tokens += tokens
+        return messages
+
+    def add_turn(self, user, assistant):
+        """记录一轮对话；超出预算时在后台压缩较早的几轮"""
+        with self._lock:
+            self.turns.append((user, assistant))
+            self._schedule_summary()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "mean_prompt_tokens": self.total_prompt_tokens / self.requests if self.requests else 0,
+            "summaries": self.summaries,
+            "turns": len(self.turns),
+            "summary_tokens": estimate_tokens(self.summary),
+        }
+
+    def _full_tokens(self):
+        """系统提示词、摘要和所有未压缩轮次的token数"""
+        tokens = count_message_tokens(self.system_messages) + estimate_tokens(self.summary)
+        for user, assistant in self.turns:
+            tokens += estimate_tokens(user) + estimate_tokens(assistant) + 2 * MESSAGE_OVERHEAD
+        return tokens
+
+    def _schedule_summary(self):
+        """超出预算且没有进行中的摘要时，提交压缩较早几轮的任务（调用时持有锁）"""
+        compress = len(self.turns) - self.keep_turns
+        if self._summarizing or compress <= 0 or self._full_tokens() <= self.token_budget:
+            return
+        self._summarizing = True
+        _summary_executor().submit(self._summarize, self.summary, self.turns[:compress])
+
+    def _summarize(self, summary, turns):
+        try:
+            new_summary = self.summarize_fn(summary, turns)
+        except Exception as e:
+            print(f"压缩对话历史时出错: {e}")
+            new_summary = None
+        with self._lock:
+            self._summarizing = False
+            if new_summary:
+                # 摘要进行期间只会在末尾追加新的轮次，被压缩的轮次仍在最前面
+                self.summary = new_summary
+                del self.turns[:len(turns)]
+                self.summaries += 1
+                # 摘要期间新增的轮次可能仍然超出预算
+                self._schedule_summary()
+
+
+def get_history(character, summarize_fn, token_budget=None):
+    """返回角色的对话历史管理器（第一次使用时由 character["messages"] 创建），角色中的 token_budget 优先"""
+    with _histories_lock:
+        history = _histories.get(character["name"])
+        if history is None:
+            history = ConversationHistory.from_messages(
+                character["messages"], summarize_fn,
+                token_budget=character.get("token_budget", token_budget or DEFAULT_TOKEN_BUDGET)
+            )
+            _histories[character["name"]] = history
+        return history
@@ -0,0 +1,109 @@
+"""
+共享的 LLM / 语音 API 客户端
+
+所有模块通过这里获取客户端，而不是各自创建 OpenAI 实例：
+- 同步客户端 get_client()：进程内共享一个 httpx.Client 连接池，可以在多个线程中同时使用
+- 异步客户端 get_async_client()：每个事件循环共享一个 httpx.AsyncClient 连接池，
+  多个角色、多个会话的请求在同一个事件循环中并发，不需要为每个请求占用一个线程
+- 连接保持 keep-alive，连续的对话和语音合成请求复用已建立的 TLS 连接
+httpx 的异步连接池绑定创建它的事件循环，因此异步客户端按事件循环分别缓存。
+openai、httpx 和 asyncio 在用到时才导入，导入本模块不会拖慢命令行的启动。
+"""
+
+import threading
+import weakref
+
+from deepseekV3_api.config import get_config
+
+# 连接池参数：对话流可能持续几十秒，读超时按单次读取计算，不是整个响应的时长
+POOL_LIMITS = dict(max_connections=32, max_keepalive_connections=16, keepalive_expiry=120)
+TIMEOUT = dict(connect=5.0, read=60.0, write=10.0, pool=10.0)
+MAX_RETRIES = 2
+
+_lock = threading.Lock()
+_settings = {"api_key": None, "base_url": None}
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # 事件循环 -> AsyncOpenAI
+
+
+def configure(api_key=None, base_url=None):
+    """设置API密钥和地址；已创建的客户端被丢弃，下次获取时按新的设置重建"""
+    global _client
+    with _lock:
+        if api_key is not None:
+            _settings["api_key"] = api_key.strip().strip('"\'')
+        if base_url is not None:
+            _settings["base_url"] = base_url
+        client, _client = _client, None
+        # 异步连接池只能在所属的事件循环中关闭，这里只丢弃引用
+        _async_clients.clear()
+    if client is not None:
+        client.close()
+
+
+def _credentials():
+    """configure() 的设置优先，否则使用 config 中的配置；缺少密钥时抛出 ConfigError"""
+    config = get_config()
+    api_key = _settings["api_key"] or config.api_key
+    base_url = _settings["base_url"] or config.base_url
+    return api_key, base_url
+
+
+def _http_options():
+    import httpx
+    return dict(limits=httpx.Limits(**POOL_LIMITS), timeout=httpx.Timeout(**TIMEOUT))
+
+
+def get_client():
+    """返回进程内共享的同步客户端"""
+    global _client
+    with _lock:
+        if _client is None:
+            api_key, base_url = _credentials()
+            import httpx
+            from openai import OpenAI
+            _client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=MAX_RETRIES,
+                http_client=httpx.Client(**_http_options()),
+            )
+        return _client
+
+
+def get_async_client():
+    """返回当前事件循环共享的异步客户端，必须在协程中调用"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            api_key, base_url = _credentials()
+            import httpx
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=MAX_RETRIES,
+                http_client=httpx.AsyncClient(**_http_options()),
+            )
+            _async_clients[loop] = client
+        return client
+
+
+def close():
+    """关闭同步客户端的连接池"""
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+async def aclose():
+    """关闭当前事件循环的异步客户端，在事件循环结束前调用"""
+    import asyncio
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
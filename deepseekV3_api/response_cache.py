@@ -0,0 +1,232 @@
+"""
+角色回复缓存
+
+课堂上学生会反复向同一个角色问同样的问题，每次都要一次完整的 LLM 请求和语音合成。
+缓存以 (角色, 规范化后的问题, 最近对话上下文的摘要, 音色和模型设置) 为键：
+- 内存层为 LRU，条目超过 ttl 秒后失效
+- 磁盘层为 sqlite，进程重启后仍然有效，内存未命中时查询并提升到内存层；
+  条目超过 ttl 或总数超过 max_disk_entries 时删除最旧的条目及其语音文件
+- 条目可以附带已合成的语音，语音文件复制到缓存目录中由缓存管理，
+  不会被 speech_files 目录的定期清理删除；命中时直接使用，不需要再次合成
+- 音色ID、文本模型或语音模型变化后不会命中旧的条目，不会用旧的音色播放
+- stats() 给出命中率等统计
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+
+def normalize_question(text):
+    """全角转半角、统一大小写、去掉标点和空白，"小马，你好！" 与 "小马你好" 视为同一个问题"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r'[\W_]+', '', text)
+
+
+def context_digest(messages, turns=1):
+    """系统提示词和最近 turns 轮对话的摘要；角色设定或上文变化时缓存自然失效"""
+    system = [m["content"] for m in messages if m["role"] == "system"]
+    recent = [(m["role"], m["content"]) for m in messages if m["role"] != "system"][-2 * turns:] if turns else []
+    payload = json.dumps([system, recent], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    character: str
+    question: str
+    text: str
+    audio_path: str = None
+    created: float = 0.0
+
+
+class ResponseCache:
+    """
+    两级回复缓存（内存 LRU + sqlite），可以在多个线程中同时使用
+    cache_dir 为 None 时只使用内存层
+    """
+
+    def __init__(self, cache_dir=None, max_entries=256, ttl=7 * 24 * 3600, context_turns=1,
+                 max_disk_entries=2000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.context_turns = context_turns
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._db = None
+        if self.cache_dir is not None:
+            (self.cache_dir / "audio").mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.cache_dir / "responses.db"), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, character TEXT, question TEXT, text TEXT, audio_path TEXT, created REAL)"
+            )
+            self._db.commit()
+
+        # 统计信息
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    def make_key(self, character, user_input, messages, settings=None):
+        """
+        character 为角色字典，messages 为加入本轮问题之前的对话历史
+        settings 为影响回复和语音的设置（音色ID、文本模型、语音模型等），任一项不同时视为不同的键
+        """
+        question = normalize_question(user_input)
+        digest = context_digest(messages, self.context_turns)
+        options = json.dumps(settings or {}, sort_keys=True, ensure_ascii=False)
+        raw = f"{character['name']}\x00{question}\x00{digest}\x00{options}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, character, user_input, messages, settings=None):
+        """查询缓存，未命中或已过期时返回 None"""
+        key = self.make_key(character, user_input, messages, settings)
+        with self._lock:
+            entry = self._memory.get(key)
+            from_disk = False
+            if entry is None and self._db is not None:
+                entry = self._load(key)
+                from_disk = entry is not None
+
+            if entry is not None and time.time() - entry.created > self.ttl:
+                self._remove(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry.audio_path and not os.path.exists(entry.audio_path):
+                entry.audio_path = None
+            self._remember(entry)
+            self.hits += 1
+            self.disk_hits += from_disk
+            return entry
+
+    def put(self, character, user_input, messages, text, audio_path=None, settings=None):
+        """保存回复；audio_path 指向已合成的语音时复制一份由缓存保存"""
+        key = self.make_key(character, user_input, messages, settings)
+        entry = CacheEntry(key, character["name"], user_input, text, created=time.time())
+        with self._lock:
+            entry.audio_path = self._store_audio(key, audio_path)
+            self._remember(entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, entry.character, entry.question, entry.text, entry.audio_path, entry.created)
+                )
+                self._prune_disk()
+                self._db.commit()
+        return entry
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._memory):
+                self._remove(key)
+            if self._db is not None:
+                for (audio_path,) in self._db.execute("SELECT audio_path FROM responses").fetchall():
+                    self._delete_audio(audio_path)
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, entry):
+        """放入内存层并更新LRU顺序，超出容量时淘汰最久未使用的条目（磁盘层保留）"""
+        self._memory[entry.key] = entry
+        self._memory.move_to_end(entry.key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key):
+        row = self._db.execute(
+            "SELECT key, character, question, text, audio_path, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def _remove(self, key):
+        entry = self._memory.pop(key, None)
+        if self._db is not None:
+            row = self._db.execute("SELECT audio_path FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+            self._delete_audio(row[0] if row else None)
+        elif entry is not None:
+            self._delete_audio(entry.audio_path)
+
+    def _prune_disk(self):
+        """删除磁盘层中已过期的条目，条目数超过 max_disk_entries 时再删除最旧的条目，同时删除其语音"""
+        cutoff = time.time() - self.ttl
+        rows = self._db.execute("SELECT key, audio_path FROM responses WHERE created < ?", (cutoff,)).fetchall()
+        self._delete_rows(rows)
+        self.expired += len(rows)
+
+        if self.max_disk_entries is None:
+            return
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_disk_entries:
+            rows = self._db.execute(
+                "SELECT key, audio_path FROM responses ORDER BY created LIMIT ?", (count - self.max_disk_entries,)
+            ).fetchall()
+            self._delete_rows(rows)
+            self.disk_evictions += len(rows)
+
+    def _delete_rows(self, rows):
+        """删除磁盘层中的条目（内存层中的同一条目一并删除，避免引用已删除的语音）"""
+        if not rows:
+            return
+        self._db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in rows])
+        for key, audio_path in rows:
+            self._memory.pop(key, None)
+            self._delete_audio(audio_path)
+
+    def _store_audio(self, key, audio_path):
+        if not audio_path or not os.path.exists(audio_path):
+            return None
+        if self.cache_dir is None:
+            return str(audio_path)
+        target = self.cache_dir / "audio" / f"{key}{Path(audio_path).suffix}"
+        shutil.copyfile(audio_path, target)
+        return str(target)
+
+    def _delete_audio(self, audio_path):
+        # 只删除缓存目录中的语音文件
+        if audio_path and self.cache_dir is not None and Path(audio_path).parent == self.cache_dir / "audio":
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
@@ -0,0 +1,196 @@
+"""
+对话回复的分句流水线语音合成
+
+LLM 的回复逐块到达时按句子边界切分，每得到一句就立即提交语音合成，
+合成好的音频按句子顺序播放：用户在第一句合成完成后就能听到声音，
+不必等待整段回复生成完毕、再合成整段语音。
+- 同时进行的合成请求数有上限，先到的句子先获得名额，不会因为后面的句子拖慢第一句
+- 括号中的动作、神态描写不合成语音；括号跨越句子边界时不在括号内切分
+- 过短的句子与下一句合并，减少请求次数和句间停顿
+"""
+
+import io
+import re
+import time
+
+from deepseekV3_api import llm_client
+
+# 句末标点；英文句号只在后面跟空白时视为句末，避免切开小数和缩写
+SENTENCE_END = re.compile(r'[。！？!?；;…\n]+|\.(?=\s)')
+OPEN_BRACKETS = "(（"
+CLOSE_BRACKETS = ")）"
+
+
+def strip_parentheses(text):
+    """移除括号（半角/全角）中的内容，用于语音合成"""
+    return re.sub(r'\([^)]*\)|（[^）]*）', '', text)
+
+
+class SentenceSplitter:
+    """将逐块到达的文本切分为完整的句子"""
+
+    def __init__(self, min_chars=6):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text):
+        """加入一段文本，返回新得到的完整句子列表"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            end = match.end()
+            if self._in_brackets(self._buffer[:end]):
+                continue
+            if len(self._buffer[start:end].strip()) < self.min_chars:
+                # 太短，与下一句合并
+                continue
+            sentences.append(self._buffer[start:end])
+            start = end
+        self._buffer = self._buffer[start:]
+        return [s for s in sentences if s.strip()]
+
+    def flush(self):
+        """回复结束，返回剩余的文本"""
+        rest, self._buffer = self._buffer, ""
+        return [rest] if rest.strip() else []
+
+    @staticmethod
+    def _in_brackets(text):
+        depth = 0
+        for c in text:
+            if c in OPEN_BRACKETS:
+                depth += 1
+            elif c in CLOSE_BRACKETS and depth:
+                depth -= 1
+        return depth > 0
+
+
+class SegmentPlayer:
+    """按顺序播放mp3音频段（pygame），play() 阻塞到这一段播放完"""
+
+    def __init__(self):
+        self._pygame = None
+        self.available = True
+
+    def play(self, data):
+        if not self.available:
+            return
+        if self._pygame is None:
+            try:
+                import pygame
+                pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
+            except Exception as e:
+                print(f"无法初始化音频播放，只保存语音文件: {e}")
+                self.available = False
+                return
+            self._pygame = pygame
+        pygame = self._pygame
+        pygame.mixer.music.load(io.BytesIO(data), "mp3")
+        pygame.mixer.music.play()
+        while pygame.mixer.music.get_busy():
+            pygame.time.wait(20)
+
+
+class SpeechPipeline:
+    """
+    把文本流逐句合成并按顺序播放
+    run() 结束后 timings 中记录从开始到各个阶段的耗时（秒）:
+    first_token（第一块文本）、first_sentence（第一句完整）、first_audio（第一段音频可以播放）、total
+    """
+
+    def __init__(self, voice_id, model, play=True, max_parallel=2, min_chars=6, player=None):
+        self.voice_id = voice_id
+        self.model = model
+        self.play = play
+        self.max_parallel = max_parallel
+        self.min_chars = min_chars
+        self.player = player or (SegmentPlayer() if play else None)
+        self.segments = []  # [(句子, mp3字节)]，按顺序
+        self.timings = {}
+
+    async def run(self, text_stream, on_text=None):
+        """消费异步文本流，返回完整的回复文本；on_text 对每块文本调用一次（例如打印）"""
+        import asyncio
+        start = time.perf_counter()
+        self.segments, self.timings = [], {}
+        splitter = SentenceSplitter(self.min_chars)
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        pending = asyncio.Queue()
+        parts = []
+
+        def mark(name):
+            self.timings.setdefault(name, time.perf_counter() - start)
+
+        def submit(sentence):
+            mark("first_sentence")
+            pending.put_nowait((sentence, asyncio.create_task(self._synthesize(sentence, semaphore))))
+
+        async def produce():
+            try:
+                async for text in text_stream:
+                    mark("first_token")
+                    parts.append(text)
+                    if on_text is not None:
+                        on_text(text)
+                    for sentence in splitter.feed(text):
+                        submit(sentence)
+                for sentence in splitter.flush():
+                    submit(sentence)
+            finally:
+                pending.put_nowait(None)
+
+        async def consume():
+            while True:
+                item = await pending.get()
+                if item is None:
+                    return
+                sentence, task = item
+                try:
+                    audio = await task
+                except Exception as e:
+                    print(f"\n合成语音时出错（{sentence.strip()}）: {e}")
+                    continue
+                if not audio:
+                    continue
+                mark("first_audio")
+                self.segments.append((sentence, audio))
+                if self.play and self.player is not None:
+                    # 播放在线程中进行，期间后面的句子继续生成和合成
+                    await asyncio.to_thread(self.player.play, audio)
+
+        consumer = asyncio.create_task(consume())
+        try:
+            await produce()
+            await consumer
+        finally:
+            if not consumer.done():
+                consumer.cancel()
+        self.timings["total"] = time.perf_counter() - start
+        return "".join(parts)
+
+    async def _synthesize(self, sentence, semaphore):
+        text = strip_parentheses(sentence).strip()
+        if not text:
+            return b""
+        async with semaphore:
+            client = llm_client.get_async_client()
+            async with client.audio.speech.with_streaming_response.create(
+                model=self.model,
+                voice=self.voice_id,
+                input=text,
+                response_format="mp3"
+            ) as response:
+                return await response.read()
+
+    def save(self, path):
+        """将各段音频按顺序拼接保存（mp3帧可以直接拼接）"""
+        with open(path, 'wb') as f:
+            for _, audio in self.segments:
+                f.write(audio)
+        return path
+
+    def report(self):
+        """打印首个音频的延迟等指标"""
+        names = {"first_token": "首个文本", "first_sentence": "首句完整", "first_audio": "首段音频", "total": "全部完成"}
+        print("  ".join(f"{names[k]} {self.timings[k]:.2f}s" for k in names if k in self.timings))
@@ -27,6 +27,8 @@ import pygame  # 添加pygame用于播放音频
 # 添加项目路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from deepseekV3_api.chat import get_response
+from utils.audio_capture import AudioCapture, CaptureAudioSource
+from utils.vad import AdaptiveEnergyDetector
 from deepseekV3_api.characters import teacher, little_horse, yellow_cow, squirrel, narrator
 
 # 定义 normalize_wake_word 函数
@@ -98,10 +100,17 @@ class VideoPlayer:
         
         # 初始化语音识别
         self.recognizer = sr.Recognizer()
-        self.recognizer.energy_threshold = 3000  # 降低灵敏度阈值，使其更容易检测到语音
-        self.recognizer.dynamic_energy_threshold = True
         self.recognizer.pause_threshold = 4.0  # 设置语音中断超过4秒才会停止接收
         
+        # 回调模式的麦克风采集引擎，唤醒词监听和单次语音输入共用同一个输入流
+        self.capture = AudioCapture(sample_rate=16000, chunk_size=1024)
+        
+        # 自适应语音检测：跟踪环境噪声底，识别器的能量阈值只由 _track_noise_floor 更新
+        self.recognizer.dynamic_energy_threshold = False
+        self.detector = AdaptiveEnergyDetector(sample_rate=16000, fixed_threshold=3000)
+        self.recognizer.energy_threshold = self.detector.on_threshold
+        self.capture.add_callback(self._track_noise_floor)
+        
         # 定义唤醒词映射到角色
         self.raw_wake_words = {
             "机器人机器人": teacher,
@@ -166,15 +175,15 @@ class VideoPlayer:
     
     def listen_for_wake_word(self):
         """持续监听麦克风输入，检测唤醒词"""
-        with sr.Microphone() as source:
-            # 调整麦克风环境噪音
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
+        with CaptureAudioSource(self.capture, max_chunks=200) as source:
+            # 环境噪音由 self.detector 持续跟踪，不再单独校准
             self.update_status("正在等待唤醒词...")
             
             while self.listening:
                 try:
-                    # 如果正在处理语音，则跳过
+                    # 如果正在处理语音，则跳过，并丢弃这段时间采集的音频，避免把对话内容当作唤醒词
                     if self.processing_speech:
+                        source.discard()
                         time.sleep(0.1)
                         continue
                     
@@ -183,6 +192,7 @@ class VideoPlayer:
                     
                     # 尝试识别语音
                     text = self.recognizer.recognize_google(audio, language="zh-CN")
+                    self.detector.record_result(text)
                     self.update_status(f"识别到: {text}")
                     
                     # 规范化识别文本
@@ -213,12 +223,20 @@ class VideoPlayer:
                 except sr.WaitTimeoutError:
                     continue
                 except sr.UnknownValueError:
+                    self.detector.record_result("")
                     self.update_status("未能识别语音")
                 except Exception as e:
                     self.update_status(f"错误: {str(e)}")
                 
                 time.sleep(0.1)  # 短暂暂停，减少CPU使用
     
+    def _track_noise_floor(self, data):
+        """在采集线程中调用：用每块音频更新噪声底，识别器按进入语音的阈值判断说话开始"""
+        if data is None:
+            return
+        self.detector.is_speech(data)
+        self.recognizer.energy_threshold = self.detector.on_threshold
+    
     def process_single_speech(self, character):
         """处理单次语音输入"""
         try:
@@ -242,7 +260,7 @@ class VideoPlayer:
             countdown.start()
             
             # 等待用户输入
-            with sr.Microphone() as source:
+            with CaptureAudioSource(self.capture) as source:
                 try:
                     # 设置更长的超时时间，但要求用户在3秒内开始说话
                     self.recognizer.pause_threshold = 4.0  # 设置语音中断超过4秒才会停止接收
@@ -258,6 +276,7 @@ class VideoPlayer:
                     # 识别语音
                     self.update_status("正在将语音转换为文字...")
                     text = self.recognizer.recognize_google(audio, language="zh-CN")
+                    self.detector.record_result(text)
                     self.update_status(f"识别到: {text}")
                     
                     # 处理用户输入
@@ -266,6 +285,7 @@ class VideoPlayer:
                 except sr.WaitTimeoutError:
                     self.update_status("未检测到语音输入，请重新唤醒")
                 except sr.UnknownValueError:
+                    self.detector.record_result("")
                     self.update_status("未能识别语音，请重新唤醒")
                 except Exception as e:
                     self.update_status(f"处理语音时出错: {str(e)}")
@@ -414,6 +434,11 @@ class VideoPlayer:
         """关闭窗口时的清理操作"""
         self.is_playing = False
         self.listening = False
+        # 停止采集，正在等待语音的监听会立即返回
+        self.capture.stop()
+        stats = self.detector.stats()
+        print(f"语音检测: 触发识别 {stats['triggers']} 次，误触发率 {stats['false_trigger_rate']:.1%}，"
+              f"比固定阈值少触发 {stats['suppressed_chunks']} 个音频块")
         if self.cap.isOpened():
             self.cap.release()
         
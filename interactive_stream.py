@@ -58,11 +58,9 @@ def main():
             start_time = time.time()
             
             while time.time() - start_time < timeout:
-                # 检查是否有新的识别结果
+                # 检查是否有新的识别结果，收到最终结果时结束等待
                 result = stt.get_result(timeout=0.5)
-                if result:
-                    # 有新的识别结果
-                    user_text = result
+                if result and result.is_final:
                     break
                 
                 # 如果超过5秒没有检测到语音，提示用户
@@ -100,15 +98,7 @@ def main():
             # 使用流式TTS生成并播放语音
             speech_file = stream_and_play_speech(full_response)
             
-            # 更新对话历史
-            character["messages"].append({"role": "user", "content": user_text})
-            character["messages"].append({"role": "assistant", "content": full_response})
-
-
-            # 限制对话历史长度
-            if len(character["messages"]) > 10:
-                # 保留system消息和最近的对话
-                character["messages"] = [character["messages"][0]] + character["messages"][-9:]
+            # 对话历史由 chat.get_response 记录，并按token预算把较早的对话压缩为摘要
             
         except KeyboardInterrupt:
             # 用户中断
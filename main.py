@@ -16,15 +16,19 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'deepseekV3_api'))
 
 def main():
     parser = argparse.ArgumentParser(description='STT_TTS 语音识别与合成工具')
-    parser.add_argument('--mode', choices=['stt', 'tts', 'chat', 'interactive'], default='chat',
-                        help='运行模式: stt(语音识别), tts(语音合成), chat(对话模式), interactive(交互舞台)')
-    args = parser.parse_args()
+    parser.add_argument('--mode', choices=['stt', 'tts', 'chat', 'interactive', 'batch', 'longform'], default='chat',
+                        help='运行模式: stt(流式识别服务), tts(语音合成), chat(对话模式), interactive(交互舞台), '
+                             'batch(批量转写录音), longform(长音频转写)')
+    # 其余参数交给具体模式解析，例如 batch 模式的 --input/--output/--workers、chat 模式的 --pipelined
+    args, extra_args = parser.parse_known_args()
+    if extra_args and args.mode in ('tts', 'interactive'):
+        # 这些模式没有自己的参数，多余的参数多半是拼写错误，不应被静默忽略
+        parser.error(f"{args.mode} 模式不接受参数: {' '.join(extra_args)}")
     
     if args.mode == 'stt':
-        # 导入并运行 STT 模块
-        from STT.SenseVoice.api import app as stt_app
-        import uvicorn
-        uvicorn.run(stt_app, host="0.0.0.0", port=8000)
+        # 启动 WebSocket 流式识别服务
+        from STT.stream_service import main as stt_service_main
+        stt_service_main(extra_args)
     
     elif args.mode == 'tts':
         # 导入并运行 TTS 模块
@@ -34,12 +38,22 @@ def main():
     elif args.mode == 'chat':
         # 导入并运行聊天模块
         from deepseekV3_api.chat import main as chat_main
-        chat_main()
+        chat_main(extra_args)
     
     elif args.mode == 'interactive':
         # 导入并运行交互舞台
         from interactive_stage import main as interactive_main
         interactive_main()
+    
+    elif args.mode == 'batch':
+        # 批量转写录音目录
+        from STT.batch_transcribe import main as batch_main
+        batch_main(extra_args)
+    
+    elif args.mode == 'longform':
+        # 内存映射方式转写长音频文件
+        from STT.longform import main as longform_main
+        longform_main(extra_args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -11,14 +11,17 @@ from threading import Thread
 # 导入STT模块
 from STT.SenseVoice.utils.stream_processor import StreamProcessor
 from STT.SenseVoice.utils.frontend import WavFrontend
-from STT.SenseVoice.model import SenseVoiceSmall
+from STT.model_registry import get_model
+from STT.hypothesis_stabilizer import HypothesisStabilizer
+from STT.incremental_frontend import IncrementalFrontend
 
 # 导入LLM模块
 from deepseekV3_api.chat import generate_response
 
 # 音频处理类
 class AudioProcessor:
-    def __init__(self, sample_rate=16000, chunk_size=1600):
+    def __init__(self, sample_rate=16000, chunk_size=1600, backend=None, intra_op_threads=None, inter_op_threads=1,
+                 max_utterance=20.0):
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
         
@@ -35,70 +38,108 @@ class AudioProcessor:
             buffer_size=32000  # 2秒缓冲区
         )
         
-        # 加载SenseVoice模型
+        # 从进程级注册表获取共享的SenseVoice模型（只加载和预热一次），
+        # backend 为 onnx 时使用 int8 量化的 ONNX Runtime 后端
         model_dir = "iic/SenseVoiceSmall"  # 请确保模型路径正确
-        self.model, self.kwargs = SenseVoiceSmall.from_pretrained(
-            model=model_dir, 
-            device=os.getenv("SENSEVOICE_DEVICE", "cuda:0")
-        )
-        self.model.eval()
+        backend = backend or os.getenv("SENSEVOICE_BACKEND", "torch")
+        if backend == "onnx":
+            self.model, self.kwargs = get_model(model_dir, backend="onnx", quantize=True,
+                                                intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads)
+        else:
+            self.model, self.kwargs = get_model(model_dir, backend="torch")
         
-        # 上一次识别的文本，用于增量更新
-        self.last_text = ""
+        # 中间结果只提交连续几次识别一致的前缀，模型修改前面的字时不会向下游重复或错乱地输出
+        self.stabilizer = HypothesisStabilizer(agreement=2)
+        self.unstable_text = ""  # 尚未稳定的尾部，仅供显示
         self.accumulated_text = ""
         
+        # 稳定器要求同一段话语的识别结果不断变长，因此推理使用整段话语的特征（最长 max_utterance 秒），
+        # 而不是 StreamProcessor 中滚动的2秒窗口；StreamProcessor 只用于语音检测
+        self.utterance_features = IncrementalFrontend(self.frontend, max_samples=int(max_utterance * sample_rate))
+        self.max_utterance_samples = int(max_utterance * sample_rate)
+        self.preroll_samples = 32000  # 话语开始前最多保留的静音
+        self.utterance_samples = 0
+        self.in_speech = False
+        
     def add_audio_chunk(self, chunk: np.ndarray) -> None:
         """添加音频块到处理器"""
         self.stream_processor.add_chunk(chunk)
+        self.utterance_features.accept_waveform(chunk)
+        self.utterance_samples += len(chunk)
         
     async def process_audio(self) -> Optional[str]:
         """处理音频并返回识别结果"""
-        # 检查是否有足够的音频数据
         if not self.stream_processor.is_speech_detected():
+            if self.in_speech:
+                # 语音结束：对整段话语做最终识别，提交剩余的文本
+                return self._commit(self._end_utterance())
+            if self.utterance_samples >= self.preroll_samples:
+                # 话语开始前的静音只保留最近一小段，避免推理时计算大量静音帧
+                self._reset_features()
             return None
-            
-        # 获取特征
-        feat, feat_len = self.stream_processor.get_feature_for_model()
-        if len(feat) == 0:
+        
+        self.in_speech = True
+        if self.utterance_samples >= self.max_utterance_samples:
+            # 话语过长时强制结束，保证特征覆盖整段话语
+            return self._commit(self._end_utterance())
+        
+        text = self._recognize()
+        if text is None:
             return None
-            
+        
+        # 只返回新稳定下来的文本
+        update = self.stabilizer.update(text)
+        self.unstable_text = update.unstable
+        return self._commit(update.committed)
+        
+    def _recognize(self) -> Optional[str]:
+        """对当前话语的全部特征做一次推理"""
+        feat, feat_len = self.utterance_features.get_features()
+        if not feat_len:
+            return None
+        
         # 使用模型进行推理
         with torch.no_grad():
             result = self.model.inference(
-                data_in=[feat],
+                data_in=torch.from_numpy(feat.copy()).unsqueeze(0),
+                data_len=torch.tensor([feat_len], dtype=torch.int32),
                 language="auto",  # 自动检测语言
                 use_itn=False,
                 ban_emo_unk=False,
-                key=["stream"],
-                fs=self.sample_rate,
                 **self.kwargs
             )
             
         if not result or len(result[0]) == 0:
             return None
-            
-        # 获取识别结果
-        text = result[0][0]["text"]
+        return result[0][0]["text"]
+        
+    def _end_utterance(self) -> str:
+        """话语结束：以整段话语的最终识别结果提交剩余部分，开始新的话语"""
+        committed = self.stabilizer.finalize(self._recognize())
+        self.in_speech = False
+        self.unstable_text = ""
+        self._reset_features()
+        return committed
         
-        # 如果结果与上次相同，返回None
-        if text == self.last_text:
+    def _reset_features(self):
+        """丢弃话语特征，开始新的话语"""
+        self.utterance_features.reset()
+        self.utterance_samples = 0
+        
+    def _commit(self, text: str) -> Optional[str]:
+        """累积已提交的文本"""
+        if not text:
             return None
-            
-        # 更新上次识别结果
-        new_text = text[len(self.last_text):].strip()
-        self.last_text = text
-        
-        # 累积文本
-        if new_text:
-            self.accumulated_text += new_text + " "
-            return new_text
-            
-        return None
+        self.accumulated_text += text
+        return text
         
     def reset(self):
         """重置处理器状态"""
         self.stream_processor.reset()
-        self.last_text = ""
+        self.stabilizer.reset()
+        self._reset_features()
+        self.in_speech = False
+        self.unstable_text = ""
         self.accumulated_text = ""
 
 # LLM处理类
@@ -112,12 +153,13 @@ class LLMProcessor:
         # 添加用户消息到历史
         self.history.append({"role": "user", "content": text})
         
-        # 调用DeepSeek V3 API进行流式生成
+        # 调用DeepSeek V3 API进行流式生成，同时拼出完整回复，不再为历史记录重复请求一次
+        full_response = ""
         async for chunk in generate_response(self.history, stream=True):
+            full_response += chunk
             yield chunk
             
         # 添加完整的助手回复到历史
-        full_response = "".join([msg for msg in generate_response(self.history, stream=False)])
         self.history.append({"role": "assistant", "content": full_response})
         
     def reset(self):
@@ -182,7 +224,8 @@ class StreamingAIAssistant:
             try:
                 # 非阻塞方式获取队列数据
                 text = self.stt_to_llm_queue.get_nowait()
-                accumulated_text += text + " "
+                # 已提交的片段是连续文本的一部分，直接拼接
+                accumulated_text += text
                 self.stt_to_llm_queue.task_done()
                 
                 # 更新最后处理时间
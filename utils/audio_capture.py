@@ -0,0 +1,370 @@
+import threading
+import time
+import wave
+from collections import deque
+
+import numpy as np
+import speech_recognition as sr
+
+# 采集格式: (numpy类型, 每个样本的字节数)
+SAMPLE_FORMATS = {"int16": (np.int16, 2), "float32": (np.float32, 4)}
+
+
+class AudioInput:
+    """
+    音频输入设备的基类
+    open() 之后设备在自己的线程中每采集满一块就调用 callback(data, overflow)，
+    data 为这一块的原始字节；输入结束（如文件读完）时调用 callback(None, False)
+    """
+
+    def open(self, sample_rate, chunk_size, dtype, callback):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAudioInput(AudioInput):
+    """麦克风输入，使用 PyAudio 的回调模式（stream_callback），由 PortAudio 线程推送音频块"""
+
+    def __init__(self, device_index=None):
+        self.device_index = device_index
+        self._pa = None
+        self._stream = None
+
+    def open(self, sample_rate, chunk_size, dtype, callback):
+        import pyaudio
+
+        def _callback(in_data, frame_count, time_info, status):
+            callback(in_data, bool(status & pyaudio.paInputOverflow))
+            return None, pyaudio.paContinue
+
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16 if dtype == "int16" else pyaudio.paFloat32,
+            channels=1,
+            rate=sample_rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=chunk_size,
+            stream_callback=_callback
+        )
+        self._stream.start_stream()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+
+class SyntheticInput(AudioInput):
+    """
+    用给定的样本模拟输入设备，无需声卡即可测试
+    samples 为 [-1, 1] 范围的 float32 数组；realtime=True 时按音频时长的节奏送出
+    （speed 为播放倍速，2.0 表示两倍实时速度），否则尽快送出；loop=True 时循环播放直到 close()
+    ready 为可选的 ready() -> bool，尽快送出时每块音频之前等待它返回 True，
+    由消费者提供背压（例如缓冲区还有空间），避免超过实时速度时音频被覆盖或丢弃
+    """
+
+    def __init__(self, samples, realtime=True, loop=False, speed=1.0, ready=None):
+        self.samples = np.asarray(samples, dtype=np.float32)
+        self.realtime = realtime
+        self.loop = loop
+        self.speed = speed
+        self.ready = ready
+        self._thread = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def tone(cls, seconds, frequency=440.0, amplitude=0.3, sample_rate=16000, **kwargs):
+        """正弦波输入"""
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        return cls(amplitude * np.sin(2 * np.pi * frequency * t), **kwargs)
+
+    @classmethod
+    def silence(cls, seconds, sample_rate=16000, **kwargs):
+        """静音输入"""
+        return cls(np.zeros(int(seconds * sample_rate), dtype=np.float32), **kwargs)
+
+    def open(self, sample_rate, chunk_size, dtype, callback):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(sample_rate, chunk_size, dtype, callback))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _chunks(self, chunk_size):
+        """按 chunk_size 切块，最后不足一块的部分补零"""
+        while True:
+            for start in range(0, len(self.samples), chunk_size):
+                chunk = self.samples[start:start + chunk_size]
+                if len(chunk) < chunk_size:
+                    chunk = np.pad(chunk, (0, chunk_size - len(chunk)))
+                yield chunk
+            if not self.loop or len(self.samples) == 0:
+                return
+
+    def _run(self, sample_rate, chunk_size, dtype, callback):
+        interval = chunk_size / sample_rate / self.speed
+        next_time = time.perf_counter()
+        for chunk in self._chunks(chunk_size):
+            if self.realtime:
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                # close() 时立即从等待中返回
+                if delay > 0 and self._stop.wait(delay):
+                    return
+            elif self.ready is not None:
+                while not self.ready():
+                    if self._stop.wait(0.001):
+                        return
+            if self._stop.is_set():
+                return
+            if dtype == "int16":
+                data = np.clip(chunk * 32768.0, -32768, 32767).astype(np.int16).tobytes()
+            else:
+                data = chunk.astype(np.float32).tobytes()
+            callback(data, False)
+        callback(None, False)
+
+
+class FileInput(SyntheticInput):
+    """从WAV文件读取音频模拟输入设备（需要16-bit，多声道取平均）"""
+
+    def __init__(self, path, realtime=True, loop=False, speed=1.0, ready=None):
+        self.path = str(path)
+        with wave.open(self.path, 'rb') as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: 需要16-bit WAV")
+            self.sample_rate = wf.getframerate()
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            if wf.getnchannels() > 1:
+                samples = samples.reshape(-1, wf.getnchannels()).mean(axis=1)
+        super().__init__(samples.astype(np.float32) / 32768.0, realtime=realtime, loop=loop, speed=speed,
+                         ready=ready)
+
+    def open(self, sample_rate, chunk_size, dtype, callback):
+        if sample_rate != self.sample_rate:
+            raise ValueError(f"{self.path}: 采样率为 {self.sample_rate}Hz，采集需要 {sample_rate}Hz")
+        super().open(sample_rate, chunk_size, dtype, callback)
+
+
+class CaptureSubscription:
+    """
+    一个消费者的音频块队列
+    - 新音频块到达时通过条件变量立即唤醒 read()，消费者不需要带超时轮询
+    - max_chunks 限制队列长度，满时丢弃最旧的音频块并计入 dropped_chunks
+    - 采集停止后 read() 先返回剩余的数据，读完后返回 None
+    """
+
+    def __init__(self, max_chunks=None):
+        self.max_chunks = max_chunks
+        self.dropped_chunks = 0
+        self.closed = False
+        self._chunks = deque()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __iter__(self):
+        while True:
+            data = self.read()
+            if data is None:
+                return
+            yield data
+
+    def push(self, data):
+        with self._cond:
+            if self.closed:
+                return
+            if self.max_chunks and len(self._chunks) >= self.max_chunks:
+                self._chunks.popleft()
+                self.dropped_chunks += 1
+            self._chunks.append(data)
+            self._cond.notify()
+
+    def read(self, timeout=None):
+        """取出下一块音频；采集已停止且队列为空，或等待超时时返回 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._chunks or self.closed, timeout):
+                return None
+            return self._chunks.popleft() if self._chunks else None
+
+    def discard(self):
+        """丢弃队列中尚未读取的音频"""
+        with self._cond:
+            self._chunks.clear()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class AudioCapture:
+    """
+    回调驱动的音频采集引擎
+    - 输入设备（麦克风/文件/合成信号）在自己的线程中推送音频块，没有阻塞式的 read 循环
+    - subscribe() 返回有界队列，消费者通过就绪通知读取；add_callback() 注册的函数
+      直接在采集线程中调用，必须足够快（例如写入环形缓冲区）
+    - stop() 或输入结束时关闭所有订阅，阻塞在 read() 中的消费者立即返回
+    """
+
+    def __init__(self, audio_input=None, sample_rate=16000, chunk_size=1024, dtype="int16"):
+        if dtype not in SAMPLE_FORMATS:
+            raise ValueError(f"不支持的采样格式: {dtype}，可选: {', '.join(SAMPLE_FORMATS)}")
+        self.audio_input = audio_input or PyAudioInput()
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+        self.running = False
+
+        # 订阅者和回调以元组保存，采集线程遍历时不需要加锁
+        self._lock = threading.Lock()
+        self._subscriptions = ()
+        self._callbacks = ()
+        self._finished = threading.Event()
+
+        self.chunks = 0
+        self.input_overflows = 0  # 驱动报告输入溢出（数据被丢弃）的次数
+
+    @property
+    def sample_width(self):
+        return SAMPLE_FORMATS[self.dtype][1]
+
+    def subscribe(self, max_chunks=None):
+        subscription = CaptureSubscription(max_chunks)
+        with self._lock:
+            self._subscriptions += (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+        subscription.close()
+
+    def add_callback(self, callback):
+        """注册 callback(data)，每块音频在采集线程中调用一次，输入结束时以 None 调用"""
+        with self._lock:
+            self._callbacks += (callback,)
+
+    def remove_callback(self, callback):
+        with self._lock:
+            self._callbacks = tuple(c for c in self._callbacks if c is not callback)
+
+    def start(self):
+        """启动采集；已经在采集时直接返回"""
+        with self._lock:
+            if self.running:
+                return self
+            self.running = True
+        self._finished.clear()
+        self.audio_input.open(self.sample_rate, self.chunk_size, self.dtype, self._on_audio)
+        return self
+
+    def stop(self):
+        """停止采集并唤醒所有消费者"""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+        self.audio_input.close()
+        self._finish()
+
+    def wait(self, timeout=None):
+        """等待采集结束（stop() 或输入读完），结束时返回 True"""
+        return self._finished.wait(timeout)
+
+    def _on_audio(self, data, overflow):
+        if data is None:
+            # 输入结束
+            self.running = False
+            self._finish()
+            return
+        self.chunks += 1
+        if overflow:
+            self.input_overflows += 1
+        for callback in self._callbacks:
+            callback(data)
+        for subscription in self._subscriptions:
+            subscription.push(data)
+
+    def _finish(self):
+        if self._finished.is_set():
+            return
+        for callback in self._callbacks:
+            callback(None)
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, ()
+        for subscription in subscriptions:
+            subscription.close()
+        self._finished.set()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _SubscriptionStream:
+    """按 speech_recognition 期望的 stream.read(frames) 接口读取订阅队列"""
+
+    def __init__(self, subscription, sample_width):
+        self.subscription = subscription
+        self.sample_width = sample_width
+        self._pending = b''
+
+    def read(self, frames):
+        size = frames * self.sample_width
+        while len(self._pending) < size:
+            data = self.subscription.read()
+            if data is None:
+                break
+            self._pending += data
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+class CaptureAudioSource(sr.AudioSource):
+    """
+    将 AudioCapture 包装为 speech_recognition 的音频源，可以直接交给 Recognizer.listen
+    多个音频源可以同时使用同一个采集引擎：进入 with 时订阅（必要时启动采集），退出时取消订阅；
+    采集停止后 listen 立即返回，不需要等待下一块音频
+    """
+
+    def __init__(self, capture, max_chunks=None):
+        if capture.dtype != "int16":
+            raise ValueError("speech_recognition 需要16-bit采集格式")
+        self.capture = capture
+        self.max_chunks = max_chunks
+        self.SAMPLE_RATE = capture.sample_rate
+        self.SAMPLE_WIDTH = capture.sample_width
+        self.CHUNK = capture.chunk_size
+        self.stream = None
+
+    def __enter__(self):
+        subscription = self.capture.subscribe(self.max_chunks)
+        self.capture.start()
+        self.stream = _SubscriptionStream(subscription, self.SAMPLE_WIDTH)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.capture.unsubscribe(self.stream.subscription)
+        self.stream = None
+
+    def discard(self):
+        """丢弃已采集但尚未读取的音频"""
+        if self.stream is not None:
+            self.stream.subscription.discard()
+            self.stream._pending = b''
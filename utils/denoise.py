@@ -0,0 +1,121 @@
+from collections import deque
+
+import numpy as np
+
+
+class SpectralGateDenoiser:
+    """
+    流式频谱门限降噪
+    - STFT 使用50%重叠的平方根汉宁窗，分析窗和合成窗相乘后重叠相加可以完美重建，
+      整块音频的分帧、FFT、增益和重叠相加都是向量化的
+    - 噪声谱按最小值统计估计：功率谱先在时间上递归平滑、在频率上3点平滑，
+      取最近 noise_window 秒内每个频点的最小值乘以 noise_bias；
+      风扇等稳态噪声变化后几秒内跟上，不需要单独的"纯噪声"校准阶段
+    - 增益为 1 - over_subtraction * 噪声/功率，下限为 -reduction_db，避免完全置零带来的"音乐噪声"
+    - speech_probability 由语音频带（300-3400Hz）的信噪比经 sigmoid 得到，
+      调用方据此跳过对非语音音频的推理
+    输入输出均为 [-1, 1] 范围的float32；输出比输入延迟 hop_length 个样本，
+    输入长度是 hop_length 的整数倍时每次输出与输入等长
+    """
+
+    def __init__(self, sample_rate=16000, hop_length=160, noise_window=1.5, noise_bias=1.7, smoothing=0.85,
+                 over_subtraction=2.0, reduction_db=12.0, speech_snr_db=6.0, speech_band=(300, 3400)):
+        self.sample_rate = sample_rate
+        self.hop_length = hop_length
+        self.frame_length = 2 * hop_length
+        self.noise_bias = noise_bias
+        self.smoothing = smoothing
+        self.over_subtraction = over_subtraction
+        self.gain_floor = 10 ** (-reduction_db / 20)
+        self.speech_snr_db = speech_snr_db
+        self.noise_window_frames = int(noise_window * sample_rate / hop_length)
+
+        # 周期平方根汉宁窗：50%重叠时 window² 的重叠相加恒为1
+        n = np.arange(self.frame_length)
+        self.window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * n / self.frame_length)).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.frame_length, 1.0 / sample_rate)
+        self.speech_bins = (freqs >= speech_band[0]) & (freqs <= speech_band[1])
+
+        self.speech_probability = 0.0
+        self.chunks = 0
+        self.speech_chunks = 0
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(self.frame_length - self.hop_length, dtype=np.float32)
+        self._pending = np.empty(0, dtype=np.float32)
+        self._overlap = np.zeros(self.hop_length, dtype=np.float32)
+        self._minima = deque()  # (帧数, 每个频点的最小功率)
+        self._minima_frames = 0
+        self._smoothed = None
+        self.noise_psd = None
+        self.speech_probability = 0.0
+
+    def process(self, samples):
+        """降噪一块音频，返回已完成重叠相加的输出样本"""
+        samples = np.asarray(samples, dtype=np.float32)
+        data = np.concatenate((self._history, self._pending, samples))
+        hop = self.hop_length
+        n_frames = (len(data) - self.frame_length) // hop + 1
+        if n_frames <= 0:
+            self._history, self._pending = data[:len(self._history)], data[len(self._history):]
+            return np.empty(0, dtype=np.float32)
+
+        # 分帧（视图）并加分析窗
+        frames = np.lib.stride_tricks.sliding_window_view(data, self.frame_length)[::hop][:n_frames] * self.window
+        spectrum = np.fft.rfft(frames, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+
+        self._update_noise(power)
+        noise = self.noise_psd
+        gain = np.maximum(1.0 - self.over_subtraction * noise / np.maximum(power, 1e-12), self.gain_floor)
+        self._update_speech_probability(power, noise)
+
+        # 逆变换、加合成窗，50%重叠时第 i 个输出块 = 第 i 帧前半 + 第 i-1 帧后半
+        frames = np.fft.irfft(spectrum * gain, n=self.frame_length, axis=1).astype(np.float32) * self.window
+        tails = np.concatenate((self._overlap[None, :], frames[:-1, hop:]))
+        output = (frames[:, :hop] + tails).reshape(-1)
+        self._overlap = frames[-1, hop:].copy()
+
+        consumed = n_frames * hop
+        self._history = data[consumed:consumed + self.frame_length - hop].copy()
+        self._pending = data[consumed + self.frame_length - hop:].copy()
+        return output
+
+    def is_speech(self, threshold=0.5):
+        return self.speech_probability >= threshold
+
+    def stats(self):
+        return {
+            "chunks": self.chunks,
+            "speech_chunks": self.speech_chunks,
+            "noise_level_db": None if self.noise_psd is None else float(10 * np.log10(np.mean(self.noise_psd) + 1e-12)),
+        }
+
+    def _update_noise(self, power):
+        """最小值统计：保留最近 noise_window 秒每块平滑功率谱的逐频点最小值"""
+        # 频率方向3点平滑是向量化的；时间方向的递归平滑每帧只有一次长度为频点数的运算
+        padded = np.pad(power, ((0, 0), (1, 1)), mode='edge')
+        power = (padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]) / 3
+        smoothed = np.empty_like(power)
+        state = power[0] if self._smoothed is None else self._smoothed
+        for i, frame in enumerate(power):
+            state = self.smoothing * state + (1 - self.smoothing) * frame
+            smoothed[i] = state
+        self._smoothed = state
+
+        self._minima.append((len(power), smoothed.min(axis=0)))
+        self._minima_frames += len(power)
+        while len(self._minima) > 1 and self._minima_frames - self._minima[0][0] >= self.noise_window_frames:
+            self._minima_frames -= self._minima.popleft()[0]
+        self.noise_psd = self.noise_bias * np.min([m for _, m in self._minima], axis=0)
+
+    def _update_speech_probability(self, power, noise):
+        """这一块中信噪比最高的帧决定语音概率"""
+        band_power = power[:, self.speech_bins].sum(axis=1)
+        band_noise = noise[self.speech_bins].sum() + 1e-12
+        snr_db = 10 * np.log10(band_power.max() / band_noise + 1e-12)
+        self.speech_probability = float(1.0 / (1.0 + np.exp(-(snr_db - self.speech_snr_db) / 2.0)))
+        self.chunks += 1
+        if self.speech_probability >= 0.5:
+            self.speech_chunks += 1
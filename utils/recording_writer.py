@@ -0,0 +1,219 @@
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+
+
+def build_wav_header(data_size, channels=1, sample_width=2, sample_rate=16000):
+    """构造标准PCM WAV文件头"""
+    byte_rate = sample_rate * channels * sample_width
+    block_align = channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, byte_rate, block_align, sample_width * 8,
+        b'data', data_size
+    )
+
+
+def to_pcm16(data):
+    """将音频块转换为16-bit PCM字节；float32数组按[-1, 1]缩放，字节原样返回"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    data = np.asarray(data)
+    if data.dtype.kind == 'f':
+        data = (np.clip(data, -1.0, 1.0) * 32767).astype(np.int16)
+    return data.astype(np.int16, copy=False).tobytes()
+
+
+class BackgroundRecordingWriter:
+    """
+    后台线程写入录音的基类
+    - 音频块通过有界队列交给写入线程，采集线程不会被磁盘阻塞
+    - 格式转换（float32 -> int16、压缩编码）都在写入线程完成
+    - 队列满时丢弃音频块并计数，backlog / max_backlog 反映磁盘跟不上的程度
+    子类实现 _open / _write / _flush / _close
+    """
+
+    def __init__(self, path, channels=1, sample_width=2, sample_rate=16000,
+                 max_queue_chunks=512, flush_interval=1.0):
+        self.path = str(path)
+        self.channels = channels
+        self.sample_width = sample_width
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.max_queue_chunks = max_queue_chunks
+
+        self._queue = queue.Queue(maxsize=max_queue_chunks)
+        self._thread = None
+        # float32 -> int16 转换用的预分配缓冲区，按需增长
+        self._scratch_f32 = np.empty(0, dtype=np.float32)
+        self._scratch_i16 = np.empty(0, dtype=np.int16)
+        self.data_size = 0
+        self.dropped_chunks = 0
+        self.max_backlog = 0
+
+    def start(self):
+        """打开文件并启动写入线程"""
+        self._open()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def write(self, data):
+        """提交一个音频块（字节或numpy数组），队列满时丢弃并计数，不阻塞调用方"""
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self.dropped_chunks += 1
+        backlog = self._queue.qsize()
+        if backlog > self.max_backlog:
+            self.max_backlog = backlog
+
+    def close(self):
+        """写完队列中剩余数据并关闭文件"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._close()
+
+    @property
+    def backlog(self):
+        """等待写入的音频块数"""
+        return self._queue.qsize()
+
+    @property
+    def duration(self):
+        """已写入音频的时长（秒）"""
+        return self.data_size / (self.sample_rate * self.channels * self.sample_width)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "seconds": self.duration,
+            "backlog": self.backlog,
+            "max_backlog": self.max_backlog,
+            "dropped_chunks": self.dropped_chunks,
+        }
+
+    def _run(self):
+        last_flush = time.time()
+        while True:
+            data = self._queue.get()
+            if data is None:
+                break
+            pcm = self._convert(data)
+            self._write(pcm)
+            self.data_size += len(pcm)
+
+            if time.time() - last_flush > self.flush_interval:
+                self._flush()
+                last_flush = time.time()
+
+    def _convert(self, data):
+        """转换为16-bit PCM；float32数组在预分配的缓冲区中转换，不产生新的数组"""
+        if isinstance(data, np.ndarray) and data.dtype == np.float32:
+            n = len(data)
+            if len(self._scratch_f32) < n:
+                self._scratch_f32 = np.empty(n, dtype=np.float32)
+                self._scratch_i16 = np.empty(n, dtype=np.int16)
+            f32, i16 = self._scratch_f32[:n], self._scratch_i16[:n]
+            np.clip(data, -1.0, 1.0, out=f32)
+            np.multiply(f32, 32767, out=f32)
+            np.copyto(i16, f32, casting='unsafe')
+            return memoryview(i16).cast('B')
+        return to_pcm16(data)
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write(self, pcm):
+        raise NotImplementedError
+
+    def _flush(self):
+        pass
+
+    def _close(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class WavStreamWriter(BackgroundRecordingWriter):
+    """
+    后台线程增量写入WAV文件
+    先写入占位文件头，定期以及关闭时回填数据长度，
+    程序崩溃时已写入的部分仍然是可播放的WAV
+    """
+
+    def __init__(self, path, channels=1, sample_width=2, sample_rate=16000,
+                 max_queue_chunks=512, header_interval=1.0):
+        super().__init__(path, channels, sample_width, sample_rate, max_queue_chunks, header_interval)
+        self._file = None
+
+    def _open(self):
+        self._file = open(self.path, 'wb')
+        self._file.write(build_wav_header(0, self.channels, self.sample_width, self.sample_rate))
+
+    def _write(self, pcm):
+        self._file.write(pcm)
+
+    def _flush(self):
+        """回填RIFF和data块长度，然后回到文件末尾继续追加"""
+        self._file.seek(0)
+        self._file.write(build_wav_header(self.data_size, self.channels, self.sample_width, self.sample_rate))
+        self._file.seek(0, os.SEEK_END)
+        self._file.flush()
+
+    def _close(self):
+        self._flush()
+        self._file.close()
+
+
+class FlacStreamWriter(BackgroundRecordingWriter):
+    """后台线程写入FLAC无损压缩录音（需要soundfile），磁盘占用约为WAV的1/2~1/3"""
+
+    def __init__(self, path, channels=1, sample_width=2, sample_rate=16000,
+                 max_queue_chunks=512, flush_interval=1.0):
+        super().__init__(path, channels, sample_width, sample_rate, max_queue_chunks, flush_interval)
+        self._file = None
+
+    def _open(self):
+        import soundfile as sf
+        self._file = sf.SoundFile(self.path, 'w', samplerate=self.sample_rate, channels=self.channels,
+                                  format='FLAC', subtype='PCM_16')
+
+    def _write(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels)
+        self._file.write(samples)
+
+    def _flush(self):
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+RECORDING_WRITERS = {"wav": WavStreamWriter, "flac": FlacStreamWriter}
+
+
+def create_recording_writer(path, format="wav", **kwargs):
+    """按格式创建录音写入器，path 的扩展名会替换为对应格式"""
+    if format not in RECORDING_WRITERS:
+        raise ValueError(f"不支持的录音格式: {format}，可选: {', '.join(RECORDING_WRITERS)}")
+    path = os.path.splitext(str(path))[0] + "." + format
+    return RECORDING_WRITERS[format](path, **kwargs)
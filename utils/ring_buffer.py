@@ -0,0 +1,156 @@
+import threading
+
+import numpy as np
+
+
+class ByteRingBuffer:
+    """
+    固定容量、预分配的字节环形缓冲区
+    写满后覆盖最旧的数据，内存占用不随录音时长增长
+    """
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于0")
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._total = 0  # 累计写入的字节数
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """当前缓冲区中有效数据的字节数"""
+        return min(self._total, self.capacity)
+
+    @property
+    def total_written(self):
+        """自创建（或清空）以来累计写入的字节数"""
+        return self._total
+
+    def write(self, data):
+        """写入数据，超出容量时覆盖最旧的数据"""
+        data = memoryview(data).cast('B')
+        with self._lock:
+            n = len(data)
+            if n >= self.capacity:
+                # 只需保留最后 capacity 个字节
+                skipped = n - self.capacity
+                data = data[skipped:]
+                self._total += skipped
+                n = self.capacity
+            start = self._total % self.capacity
+            first = min(n, self.capacity - start)
+            self._view[start:start + first] = data[:first]
+            if first < n:
+                self._view[:n - first] = data[first:]
+            self._total += n
+
+    def read_latest(self, nbytes=None):
+        """按时间顺序返回最近 nbytes 字节（默认全部有效数据）的副本"""
+        with self._lock:
+            size = min(self._total, self.capacity)
+            if nbytes is None or nbytes > size:
+                nbytes = size
+            end = self._total % self.capacity
+            start = (end - nbytes) % self.capacity
+            if nbytes == 0:
+                return b''
+            if start < end:
+                return bytes(self._view[start:end])
+            return bytes(self._view[start:]) + bytes(self._view[:end])
+
+    def clear(self):
+        """清空缓冲区（不释放预分配的内存）"""
+        with self._lock:
+            self._total = 0
+
+
+class FloatRingBuffer:
+    """
+    预分配的单生产者/单消费者 float32 环形缓冲区
+    - 生产者只修改写位置，消费者只修改读位置，两者都是单个整数赋值，不需要加锁
+    - 消费者通过 peek() 直接拿到缓冲区的 numpy 视图，读取过程不复制、不分配内存
+    - 容量为 block_size 的整数倍且生产者每次写入 block_size 个样本时，
+      按 block_size 读取的视图不会跨越缓冲区末尾
+    - 消费者落后超过容量时最旧的数据被覆盖，丢失的样本数计入 overruns；
+      此时 peek() 返回的视图也可能在读取过程中被覆盖，见 overwritten()
+    """
+
+    def __init__(self, capacity, block_size=None):
+        if block_size:
+            capacity = -(-capacity // block_size) * block_size
+        self.capacity = capacity
+        self.block_size = block_size or 0
+        self._buf = np.zeros(capacity, dtype=np.float32)
+        self._write_pos = 0  # 累计写入的样本数（仅生产者修改）
+        self._read_pos = 0   # 累计读取的样本数（仅消费者修改）
+        self._data_ready = threading.Event()
+        self.overruns = 0
+
+    def write(self, samples):
+        """生产者写入一块样本（numpy数组或float32字节）"""
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.float32)
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self._write_pos += n - self.capacity
+            n = self.capacity
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = samples[:first]
+        if first < n:
+            self._buf[:n - first] = samples[first:]
+        self._write_pos += n
+        self._data_ready.set()
+
+    def available(self):
+        """可读取的样本数"""
+        return min(self._write_pos - self._read_pos, self.capacity)
+
+    def wait(self, min_samples=1, timeout=None):
+        """等待至少 min_samples 个样本可读；数据已足够时立即返回 True，超时或被 notify() 唤醒时返回当前是否足够"""
+        if self._write_pos - self._read_pos >= min_samples:
+            return True
+        self._data_ready.clear()
+        # 清除事件后再检查一次，避免错过刚好在此期间写入的数据
+        if self._write_pos - self._read_pos >= min_samples:
+            return True
+        self._data_ready.wait(timeout)
+        return self._write_pos - self._read_pos >= min_samples
+
+    def notify(self):
+        """唤醒正在 wait() 的消费者（例如停止时）"""
+        self._data_ready.set()
+
+    def peek(self, n):
+        """
+        返回最旧的 n 个未读样本的视图 (first, second)，跨越缓冲区末尾时 second 非空
+        视图指向缓冲区本身：生产者没有超过消费者一整圈时，视图在 advance() 之前保持不变；
+        消费者落后超过容量（overrun）时生产者会直接覆盖视图中的数据，
+        处理完后用 overwritten() 检查，需要完整数据的消费者应丢弃这一块
+        """
+        lag = self._write_pos - self._read_pos
+        if lag > self.capacity:
+            # 生产者已经覆盖了未读数据，跳到仍然有效的最旧位置
+            self.overruns += lag - self.capacity
+            self._read_pos = self._write_pos - self.capacity
+        n = min(n, self._write_pos - self._read_pos)
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        return self._buf[start:start + first], self._buf[:n - first]
+
+    def overwritten(self):
+        """
+        最近一次 peek() 得到的视图是否可能已被生产者覆盖（在 advance() 之前调用）
+        按 block_size 留出一块正在写入的余量，生产者写到一半时也判为已覆盖
+        """
+        return self._write_pos - self._read_pos > self.capacity - self.block_size
+
+    def advance(self, n):
+        """消费者标记 n 个样本已读"""
+        self._read_pos += n
+
+    def reset(self):
+        """丢弃所有未读数据（由消费者调用）"""
+        self._read_pos = self._write_pos
@@ -0,0 +1,339 @@
+from collections import deque
+
+import numpy as np
+
+
+def to_int16(pcm):
+    """将字节或数组形式的音频统一转换为int16数组（float输入按[-1, 1]缩放）"""
+    if isinstance(pcm, (bytes, bytearray, memoryview)):
+        return np.frombuffer(pcm, dtype=np.int16)
+    pcm = np.asarray(pcm)
+    if pcm.dtype.kind == 'f':
+        return (np.clip(pcm, -1.0, 1.0) * 32767).astype(np.int16)
+    return pcm.astype(np.int16, copy=False)
+
+
+def frame_energy_zcr(samples, frame_length):
+    """
+    按不重叠的帧计算RMS能量与过零率（向量化）
+    返回 (energy, zcr)，不足一帧的尾部样本被忽略
+    """
+    n_frames = len(samples) // frame_length
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+    frames = samples[:n_frames * frame_length].reshape(n_frames, frame_length).astype(np.float32)
+    energy = np.sqrt(np.mean(frames * frames, axis=1))
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy, zcr
+
+
+def hysteresis(energy, on_threshold, off_threshold, initial=False):
+    """
+    滞回判决（向量化）：能量高于 on_threshold 进入语音，低于 off_threshold 退出语音，
+    介于两者之间的帧保持上一帧的状态；initial 为第一帧之前的状态
+    """
+    on = energy > on_threshold
+    decided = on | (energy < off_threshold)
+    # 每一帧之前（含自身）最近一个能做出判决的帧
+    last = np.maximum.accumulate(np.where(decided, np.arange(len(energy)), -1))
+    return np.where(last >= 0, on[np.maximum(last, 0)], initial)
+
+
+class AdaptiveEnergyDetector:
+    """
+    跟踪噪声底的自适应语音检测器
+    - 噪声底取最近 window_seconds 内帧能量的 percentile 分位数，环境噪声变化后几秒内自动跟上
+    - 进入语音的阈值为噪声底的 on_ratio 倍，退出阈值为 off_ratio 倍，两者之间保持上一帧的判决（滞回）
+    - 阈值不低于 min_threshold，安静环境里不会把极小的噪声当成语音
+    - 统计每块音频的判决，并与固定阈值 fixed_threshold 的判决对比，得到少触发的推理次数；
+      record_result() 记录触发推理后的识别结果，识别为空的触发计为误触发
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, window_seconds=5.0, percentile=20,
+                 on_ratio=3.0, off_ratio=2.0, min_threshold=100, fixed_threshold=None):
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.percentile = percentile
+        self.on_ratio = on_ratio
+        self.off_ratio = off_ratio
+        self.min_threshold = min_threshold
+        self.fixed_threshold = fixed_threshold
+        # 最近帧能量的环形缓冲区
+        self._history = np.zeros(max(1, int(window_seconds * 1000 / frame_ms)), dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """清空噪声底和统计信息"""
+        self._history_len = 0
+        self._history_pos = 0
+        self._active = False
+        self.noise_floor = None
+        self.chunks = 0
+        self.speech_chunks = 0
+        self.fixed_speech_chunks = 0
+        self.triggers = 0
+        self.false_triggers = 0
+
+    @property
+    def on_threshold(self):
+        if self.noise_floor is None:
+            return self.fixed_threshold or self.min_threshold
+        return max(self.min_threshold, self.noise_floor * self.on_ratio)
+
+    @property
+    def off_threshold(self):
+        if self.noise_floor is None:
+            return self.on_threshold * self.off_ratio / self.on_ratio
+        return max(self.min_threshold * self.off_ratio / self.on_ratio, self.noise_floor * self.off_ratio)
+
+    def classify(self, energy, fixed=None):
+        """
+        逐帧判决（向量化），先用当前阈值判决这一块，再用这一块的能量更新噪声底
+        fixed 为固定阈值方案对这一块的判决，不提供时按 fixed_threshold 计算
+        """
+        speech = hysteresis(energy, self.on_threshold, self.off_threshold, self._active)
+        if len(speech):
+            self._active = bool(speech[-1])
+        self._update_floor(energy)
+
+        self.chunks += 1
+        if np.any(speech):
+            self.speech_chunks += 1
+        if fixed is None and self.fixed_threshold is not None:
+            fixed = bool(np.any(energy > self.fixed_threshold))
+        if fixed:
+            self.fixed_speech_chunks += 1
+        return speech
+
+    def decide(self, energy, initial=False):
+        """
+        只用当前阈值逐帧判决，不更新噪声底、滞回状态和统计
+        用于对已经经过 classify() 的音频再做检查（例如识别前确认整个窗口中有语音）
+        """
+        return hysteresis(energy, self.on_threshold, self.off_threshold, initial)
+
+    def is_speech(self, pcm, fixed=None):
+        """判断一块音频中是否含有语音帧"""
+        energy, _ = frame_energy_zcr(to_int16(pcm), self.frame_length)
+        return bool(np.any(self.classify(energy, fixed)))
+
+    def record_result(self, text):
+        """记录一次由语音判决触发的识别结果，结果为空视为误触发"""
+        self.triggers += 1
+        if not text or not text.strip():
+            self.false_triggers += 1
+
+    def stats(self):
+        return {
+            "noise_floor": None if self.noise_floor is None else float(self.noise_floor),
+            "on_threshold": float(self.on_threshold),
+            "chunks": self.chunks,
+            "speech_chunks": self.speech_chunks,
+            "fixed_speech_chunks": self.fixed_speech_chunks,
+            "suppressed_chunks": max(0, self.fixed_speech_chunks - self.speech_chunks),
+            "triggers": self.triggers,
+            "false_triggers": self.false_triggers,
+            "false_trigger_rate": self.false_triggers / self.triggers if self.triggers else 0.0,
+        }
+
+    def _update_floor(self, energy):
+        n = len(energy)
+        if n == 0:
+            return
+        size = len(self._history)
+        if n >= size:
+            self._history[:] = energy[-size:]
+            self._history_pos, self._history_len = 0, size
+        else:
+            first = min(n, size - self._history_pos)
+            self._history[self._history_pos:self._history_pos + first] = energy[:first]
+            self._history[:n - first] = energy[first:]
+            self._history_pos = (self._history_pos + n) % size
+            self._history_len = min(size, self._history_len + n)
+        self.noise_floor = float(np.percentile(self._history[:self._history_len], self.percentile))
+
+
+class EnergyZcrVAD:
+    """
+    基于帧能量和过零率的语音活动检测器
+    - 能量高于阈值的帧判为语音；能量稍低但过零率高的帧（清辅音）也判为语音
+    - 语音后连续静音超过 hangover 时长才结束一段话，避免字词被切断
+    - process() 只在语音边界返回完整的话语片段，纯静音不会产生任何片段
+    - 传入 detector（AdaptiveEnergyDetector）时能量阈值随噪声底自适应，energy_threshold 仅作为对比基准
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, energy_threshold=300, weak_energy_ratio=0.5,
+                 zcr_threshold=0.25, hangover=0.8, min_speech=0.2, pre_roll=0.2, max_segment=15.0,
+                 detector=None):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.energy_threshold = energy_threshold
+        self.detector = detector
+        self.weak_energy_ratio = weak_energy_ratio
+        self.zcr_threshold = zcr_threshold
+
+        frame_seconds = self.frame_length / sample_rate
+        self.hangover_frames = max(1, int(round(hangover / frame_seconds)))
+        self.min_speech_frames = max(1, int(round(min_speech / frame_seconds)))
+        self.max_segment_frames = int(max_segment / frame_seconds)
+        self.pre_roll_frames = int(round(pre_roll / frame_seconds))
+
+        self.reset()
+
+    def reset(self):
+        """清空内部状态"""
+        self._pending = np.empty(0, dtype=np.int16)
+        self._pre_roll = deque(maxlen=max(1, self.pre_roll_frames))
+        self._segment = []
+        self._in_speech = False
+        self._speech_frames = 0
+        self._silence_frames = 0
+
+    @property
+    def in_speech(self):
+        """当前是否处于一段话语中"""
+        return self._in_speech
+
+    def classify(self, energy, zcr, update=True):
+        """
+        逐帧判断是否为语音（向量化）
+        update=False 时只读取自适应检测器的当前阈值，不更新它的噪声底和统计
+        """
+        if self.detector is not None:
+            strong = self.detector.classify(energy) if update else self.detector.decide(energy)
+            threshold = self.detector.off_threshold
+        else:
+            strong = energy > self.energy_threshold
+            threshold = self.energy_threshold
+        weak = (energy > threshold * self.weak_energy_ratio) & (zcr > self.zcr_threshold)
+        return strong | weak
+
+    def contains_speech(self, pcm):
+        """判断一段音频中是否含有语音帧；只做检查，不影响流式状态和自适应检测器"""
+        energy, zcr = frame_energy_zcr(to_int16(pcm), self.frame_length)
+        return bool(np.any(self.classify(energy, zcr, update=False)))
+
+    def process(self, pcm):
+        """输入一块音频，返回本次检测到结束的话语片段列表（PCM字节）"""
+        samples = to_int16(pcm)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        n_frames = len(samples) // self.frame_length
+        self._pending = samples[n_frames * self.frame_length:].copy()
+        if n_frames == 0:
+            return []
+
+        frames = samples[:n_frames * self.frame_length].reshape(n_frames, self.frame_length)
+        energy, zcr = frame_energy_zcr(samples, self.frame_length)
+        is_speech = self.classify(energy, zcr)
+
+        segments = []
+        for frame, speech in zip(frames, is_speech):
+            if not self._in_speech:
+                if speech:
+                    # 语音开始，带上少量前导音频以免丢失起始音
+                    self._in_speech = True
+                    self._segment = list(self._pre_roll)
+                    self._pre_roll.clear()
+                    self._segment.append(frame.tobytes())
+                    self._speech_frames = 1
+                    self._silence_frames = 0
+                elif self.pre_roll_frames:
+                    self._pre_roll.append(frame.tobytes())
+                continue
+
+            self._segment.append(frame.tobytes())
+            if speech:
+                self._speech_frames += 1
+                self._silence_frames = 0
+            else:
+                self._silence_frames += 1
+
+            if self._silence_frames >= self.hangover_frames:
+                segment = self._end_segment()
+                if segment:
+                    segments.append(segment)
+            elif len(self._segment) >= self.max_segment_frames:
+                # 话语过长时强制切分，保证延迟有上限
+                segments.append(self._end_segment(force=True))
+        return segments
+
+    def find_segments(self, pcm):
+        """
+        离线切分一整段音频，返回话语的样本区间列表 [(start, end), ...]
+        规则与 process() 相同（前导音频、hangover、最短语音、最长片段），不影响流式状态和自适应检测器
+        按块扫描长音频时使用 SegmentScan，结果与这里一次性切分相同
+        """
+        scan = SegmentScan(self)
+        return scan.feed(pcm) + scan.finish()
+
+    def flush(self):
+        """结束输入，返回尚未结束的话语片段（没有则返回None）"""
+        segment = self._end_segment() if self._in_speech else None
+        self.reset()
+        return segment
+
+    def _end_segment(self, force=False):
+        segment = b''.join(self._segment)
+        enough = force or self._speech_frames >= self.min_speech_frames
+        self._segment = []
+        self._in_speech = False
+        self._speech_frames = 0
+        self._silence_frames = 0
+        return segment if enough else None
+
+
+class SegmentScan:
+    """
+    可以按块续接的 EnergyZcrVAD.find_segments
+    当前片段的起点、语音/静音帧数和上一片段的终点在块之间延续，按块输入的结果与一次性输入整段音频相同，
+    跨越块边界的话语不会被切断，也不需要重新分析
+    除最后一块外，每块的样本数应为 vad.frame_length 的整数倍（不足一帧的尾部样本被忽略）
+    """
+
+    def __init__(self, vad):
+        self.vad = vad
+        self.frames = 0  # 已扫描的帧数
+        self.start = None  # 当前片段的起始帧
+        self.last_end = 0  # 上一片段的结束帧，前导音频不会与上一段重叠
+        self.speech_frames = 0
+        self.silence_frames = 0
+
+    def feed(self, pcm):
+        """输入下一块音频，返回在这一块中结束的片段 [(start, end)]，位置为整段音频中的样本序号"""
+        vad = self.vad
+        energy, zcr = frame_energy_zcr(to_int16(pcm), vad.frame_length)
+        is_speech = vad.classify(energy, zcr, update=False)
+
+        spans = []
+        for i, speech in enumerate(is_speech, self.frames):
+            if self.start is None:
+                if speech:
+                    self.start = max(self.last_end, i - vad.pre_roll_frames)
+                    self.speech_frames, self.silence_frames = 1, 0
+                continue
+
+            if speech:
+                self.speech_frames += 1
+                self.silence_frames = 0
+            else:
+                self.silence_frames += 1
+
+            if self.silence_frames >= vad.hangover_frames:
+                if self.speech_frames >= vad.min_speech_frames:
+                    spans.append((self.start, i + 1))
+                self.start, self.last_end = None, i + 1
+            elif i + 1 - self.start >= vad.max_segment_frames:
+                # 话语过长时强制切分
+                spans.append((self.start, i + 1))
+                self.start, self.last_end = None, i + 1
+        self.frames += len(is_speech)
+        return [(s * vad.frame_length, e * vad.frame_length) for s, e in spans]
+
+    def finish(self):
+        """输入结束，返回尚未结束的片段"""
+        spans = []
+        if self.start is not None and self.speech_frames >= self.vad.min_speech_frames:
+            spans.append((self.start * self.vad.frame_length, self.frames * self.vad.frame_length))
+        self.start = None
+        return spans